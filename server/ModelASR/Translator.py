@@ -2,39 +2,89 @@ import os
 import re
 from pythainlp.tokenize import word_tokenize, Tokenizer
 from pythainlp.corpus import thai_words
-from collections import defaultdict
+from collections import namedtuple
 import logging
-from functools import lru_cache
-from collections import Counter
+import unicodedata
 import sys
+from types import MappingProxyType
+from ModelASR.phrase_trie import PhraseTrie, CompiledPhraseMatcher
+from ModelASR.translation_cache import TranslationCache
+from ModelASR.space_saving import SpaceSaving
+from ModelASR.fuzzy_index import SymSpellIndex
+from ModelASR.compiled_dictionary import (
+    CompiledDictionary, CompiledTable, parse_dictionary_file, parse_phrase_file, parse_vocabulary_file
+)
+
+# token ที่ได้จากการตัดคำ พร้อมตำแหน่ง [start, end) ในประโยคต้นฉบับ (ใช้ทำ highlight ได้)
+Token = namedtuple('Token', ['text', 'start', 'end'])
+
+WHITESPACE_PATTERN = re.compile(r'\s*')
+# ข้อความไทย/คำเมืองแทบไม่ใช้จุด ช่องว่างและการขึ้นบรรทัดใหม่คือขอบเขตวลี/ประโยค
+SEGMENT_PATTERN = re.compile(r'(\s+)')
 
 class Translator:
-    def __init__(self, vocab_path=None, dictionary_path=None, phrase_path=None, is_thai=False):
+    def __init__(self, vocab_path=None, dictionary_path=None, phrase_path=None, is_thai=False, compiled_path=None, version=None,
+                 language_pair=None, cache=None, unknown_words_capacity=1000,
+                 fuzzy_mode='off', fuzzy_max_distance=1, fuzzy_time_limit=0.002):
         self.custom_tokenizer = None
         self.word_translation = None
-        self.phrases = {}
+        self.phrases = MappingProxyType({})
         self.is_thai = is_thai
+        # เวอร์ชันของไฟล์พจนานุกรมที่ใช้สร้าง instance นี้ (ส่งกลับไปกับผลแปล)
+        self.version = version
+        # แคชผลแปลใช้ร่วมกันได้หลาย Translator (key มีคู่ภาษาและเวอร์ชันอยู่แล้ว)
+        self.language_pair = tuple(language_pair) if language_pair else (None, None)
+        self.cache = cache if cache is not None else TranslationCache(max_size=1000)
+        self.logger = self.setup_logger()
+
+        # ใช้ไฟล์คอมไพล์ (mmap) ถ้ามีและใหม่กว่าไฟล์ต้นฉบับ ไม่เช่นนั้นอ่านจากไฟล์ข้อความ
+        compiled = self.load_compiled(compiled_path, [vocab_path, dictionary_path, phrase_path])
         
+        # พจนานุกรมและ tokenizer เป็นแบบอ่านอย่างเดียว แชร์ใช้ได้ทั้ง REST และ Socket.IO
         if vocab_path:
-            self.vocab = self.load_vocabulary(vocab_path)
+            vocab = compiled.table('vocab') if compiled else None
+            self.vocab = vocab if vocab is not None else frozenset(self.load_vocabulary(vocab_path))
         else:
             self.vocab = None
 
         if dictionary_path:
-            self.word_translation = self.load_dictionary(dictionary_path)
+            # section ที่ไม่มีในไฟล์คอมไพล์ (table() คืน None) ถือเป็นตารางว่าง
+            if compiled:
+                self.word_translation = compiled.table('dictionary') or MappingProxyType({})
+            else:
+                self.word_translation = MappingProxyType(self.load_dictionary(dictionary_path))
             # สร้าง custom dictionary สำหรับการตัดคำ
             custom_words = set(self.word_translation.keys()) | thai_words()
             self.custom_tokenizer = Tokenizer(custom_dict=custom_words, engine='newmm')
         
         if phrase_path:
-            self.phrases = self.load_phrases(phrase_path)
+            if compiled:
+                self.phrases = compiled.table('phrases') or MappingProxyType({})
+            else:
+                self.phrases = MappingProxyType(self.load_phrases(phrase_path))
 
-        self.logger = self.setup_logger()
-        self.unknown_words = Counter()
+        # ตารางคอมไพล์ค้นวลีจาก mmap ได้เลย ส่วนพจนานุกรมจากไฟล์ข้อความคอมไพล์เป็น trie ครั้งเดียวตอนโหลด
+        self.phrase_trie = self.build_matcher(self.phrases)
+        self.dictionary_trie = self.build_matcher(self.word_translation)
+        # คำที่อยู่ติดกันใน entry หลายคำ (เช่น "วันขึ้น 15 คํ่า") ห้ามตัด segment ตรงช่องว่างระหว่างคู่นี้
+        self.multiword_pairs = self.build_multiword_pairs()
+
+        # ดัชนีคำใกล้เคียงสำหรับคำที่สะกดต่างจากพจนานุกรมเล็กน้อย (เช่นผลถอดเสียงจาก ASR)
+        # 'suggest' = เสนอคำแก้ให้ผู้ใช้, 'auto' = ใช้คำแปลของคำที่ใกล้ที่สุดเมื่อมีตัวเลือกเดียว
+        self.fuzzy_mode = fuzzy_mode
+        self.fuzzy_time_limit = fuzzy_time_limit
+        self.fuzzy_index = None
+        if fuzzy_mode in ('suggest', 'auto') and self.word_translation:
+            self.fuzzy_index = SymSpellIndex(self.word_translation.keys(), max_distance=fuzzy_max_distance)
+
+        # นับคำที่ไม่รู้จักด้วยหน่วยความจำคงที่ (flush ลงฐานข้อมูลเป็นระยะโดย unknown_words_service)
+        self.unknown_words = SpaceSaving(capacity=unknown_words_capacity)
 
     def setup_logger(self):
         logger = logging.getLogger('TranslatorLogger')
         logger.setLevel(logging.INFO)
+        if logger.handlers:  # ตั้งค่าแล้วจาก instance ก่อนหน้า ไม่ต้องเพิ่ม handler ซ้ำ
+            return logger
         
         # ตั้งค่า StreamHandler สำหรับแสดงล็อกบนคอนโซล
         console_handler = logging.StreamHandler(sys.stdout)
@@ -52,11 +102,23 @@ class Translator:
         
         return logger
 
+    def load_compiled(self, compiled_path, source_paths):
+        if not compiled_path or not os.path.exists(compiled_path):
+            return None
+        compiled_mtime = os.path.getmtime(compiled_path)
+        stale = [path for path in source_paths if path and os.path.exists(path) and os.path.getmtime(path) > compiled_mtime]
+        if stale:
+            self.logger.warning(f"ไฟล์พจนานุกรมคอมไพล์เก่ากว่าไฟล์ต้นฉบับ ({', '.join(stale)}) ใช้ไฟล์ข้อความแทน")
+            return None
+        try:
+            return CompiledDictionary(compiled_path)
+        except Exception as e:
+            self.logger.error(f"เกิดข้อผิดพลาดในการเปิดพจนานุกรมคอมไพล์: {e}")
+            return None
+
     def load_vocabulary(self, file_path):
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                vocab = [line.strip() for line in f.readlines()]
-            return set(vocab)
+            return parse_vocabulary_file(file_path)
         except FileNotFoundError:
             self.logger.error(f"ไม่พบไฟล์ vocabulary: {file_path}")
             return set()
@@ -65,100 +127,162 @@ class Translator:
             return set()
 
     def load_dictionary(self, file_path):
-        word_translation = defaultdict(lambda: None)
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                for line in file:
-                    try:
-                        source_word, target_word = line.strip().split(',')
-                        word_translation[source_word.lower()] = target_word
-                    except ValueError:
-                        self.logger.warning(f"รูปแบบไม่ถูกต้องในบรรทัด: {line}")
+            word_translation, errors = parse_dictionary_file(file_path)
+            for line_number, line in errors:
+                self.logger.warning(f"รูปแบบไม่ถูกต้องในบรรทัด {line_number}: {line}")
+            return word_translation
         except FileNotFoundError:
             self.logger.error(f"ไม่พบไฟล์พจนานุกรม: {file_path}")
         except Exception as e:
             self.logger.error(f"เกิดข้อผิดพลาดในการโหลดพจนานุกรม: {e}")
-        return word_translation
+        return {}
 
     def load_phrases(self, file_path):
-        phrases = {}
-        if file_path:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    for line in file:
-                        source, target = line.strip().split('\t')
-                        phrases[source.lower()] = target
-            except FileNotFoundError:
-                self.logger.error(f"ไม่พบไฟล์วลี: {file_path}")
-            except Exception as e:
-                self.logger.error(f"เกิดข้อผิดพลาดในการโหลดวลี: {e}")
-        return phrases
+        try:
+            phrases, errors = parse_phrase_file(file_path)
+            for line_number, line in errors:
+                self.logger.warning(f"รูปแบบวลีไม่ถูกต้องในบรรทัด {line_number}: {line}")
+            return phrases
+        except FileNotFoundError:
+            self.logger.error(f"ไม่พบไฟล์วลี: {file_path}")
+        except Exception as e:
+            self.logger.error(f"เกิดข้อผิดพลาดในการโหลดวลี: {e}")
+        return {}
 
-    def tokenize(self, sentence):
+    @staticmethod
+    def build_matcher(table):
+        if isinstance(table, CompiledTable):
+            return CompiledPhraseMatcher(table)
+        return PhraseTrie(table.items() if table else None)
+
+    def build_multiword_pairs(self):
+        keys = list(self.phrases.keys())
+        if self.word_translation:
+            keys.extend(self.word_translation.keys())
+        pairs = set()
+        for key in keys:
+            words = key.split()
+            pairs.update(zip(words, words[1:]))
+        return frozenset(pairs)
+
+    def joins_across(self, left, right):
+        # key ในพจนานุกรมเป็นตัวพิมพ์เล็กแล้ว (normalize_key) เทียบทั้งคำ ไม่ใช่แค่ส่วนท้าย/ส่วนต้น
+        return (left.split()[-1].lower(), right.split()[0].lower()) in self.multiword_pairs
+
+    def segment_text(self, text):
+        """แบ่งข้อความเป็น [(segment, ช่องว่างที่ตามหลัง)] ที่ช่องว่าง/ขึ้นบรรทัดใหม่
+
+        ต่อ segment ที่อยู่ในวลีหรือคำหลายคำเดียวกันกลับเข้าด้วยกัน
+        ต่อ segment กับช่องว่างตามลำดับจะได้ข้อความเดิมทุกตัวอักษร
+        """
+        parts = SEGMENT_PATTERN.split(text)
+        segments = []
+        for i in range(0, len(parts), 2):
+            chunk = parts[i]
+            separator = parts[i + 1] if i + 1 < len(parts) else ''
+            if segments and segments[-1][0] and chunk and self.joins_across(segments[-1][0], chunk):
+                previous, previous_separator = segments.pop()
+                chunk = previous + previous_separator + chunk
+            segments.append((chunk, separator))
+        return segments
+
+    def tokenize_spans(self, sentence):
         if self.is_thai:
             words = word_tokenize(sentence, engine='newmm')
         else:
             words = self.custom_tokenizer.word_tokenize(sentence) if self.custom_tokenizer else sentence.split()
-        
-        # แยกคำและช่องว่าง
-        tokens = []
-        current_space = ''
-        for i, word in enumerate(words):
-            if i > 0:
-                space = re.match(r'\s*', sentence[sentence.index(word):]).group()
-                if space:
-                    tokens.append(space)
-                    current_space = ''
-                elif current_space:
-                    tokens.append(current_space)
-                    current_space = ''
-            tokens.append(word)
-            if i == len(words) - 1:
-                current_space = re.search(r'\s*$', sentence).group()
-                if current_space:
-                    tokens.append(current_space)
-        return tokens
+
+        # ไล่ตำแหน่งไปพร้อมกับคำที่ตัดได้ครั้งเดียว (linear) แยกคำและช่องว่างออกเป็น token
+        spans = []
+
+        def add_space(start, end):
+            if start >= end:
+                return
+            if spans and spans[-1].end == start and spans[-1].text.isspace():
+                previous = spans.pop()
+                start = previous.start
+            spans.append(Token(sentence[start:end], start, end))
+
+        offset = 0
+        for word in words:
+            if not word:
+                continue
+            if word.isspace():
+                space_end = WHITESPACE_PATTERN.match(sentence, offset).end()
+                add_space(offset, space_end)
+                offset = space_end
+                continue
+
+            start = WHITESPACE_PATTERN.match(sentence, offset).end()
+            if not sentence.startswith(word, start):
+                # tokenizer คืนคำที่ไม่ตรงกับต้นฉบับ (ไม่ควรเกิด) ให้ค้นหาต่อจากตำแหน่งปัจจุบัน
+                start = sentence.find(word, offset)
+                if start < 0:
+                    continue
+            add_space(offset, start)
+            spans.append(Token(word, start, start + len(word)))
+            offset = start + len(word)
+
+        add_space(offset, len(sentence))
+        return spans
+
+    def tokenize(self, sentence):
+        return [token.text for token in self.tokenize_spans(sentence)]
 
     def handle_unknown_word(self, word):
-        self.unknown_words[word.lower()] += 1
+        self.unknown_words.add(word.lower())
         return word  # Return the original word
 
-    @lru_cache(maxsize=1000)
-    def translate_sentence(self, sentence):
+    def cache_key(self, sentence):
+        return (*self.language_pair, self.version, sentence)
+
+    def translate_sentence(self, sentence, unknown_words=None):
+        """แปลประโยค ถ้าส่ง list มาใน ``unknown_words`` จะเติมคำที่ไม่รู้จักของประโยคนี้ลงไป"""
+        sentence = unicodedata.normalize('NFC', sentence)
+        key = self.cache_key(sentence)
+        cached = self.cache.get(key)
+        if cached is not None:
+            translation, words = cached
+            # นับคำที่ไม่รู้จักซ้ำ เพื่อให้สถิติไม่เพี้ยนเมื่อประโยคมาจากแคช
+            for word in words:
+                self.handle_unknown_word(word)
+        else:
+            translation, words = self.translate_uncached(sentence)
+            self.cache.put(key, (translation, tuple(words)))
+
+        if unknown_words is not None:
+            unknown_words.extend(words)
+        return translation
+
+    def translate_uncached(self, sentence):
         # Step 1: Tokenize the sentence
         tokens = self.tokenize(sentence)
         print(f"Tokenized words: {tokens}")  # Debug: แสดงผลการตัดคำ
         
-        # Step 2: Translate phrases and individual words
+        # Step 2: Translate phrases and individual words (greedy longest match, วลีมาก่อนคำในพจนานุกรม)
+        lowered = [token.lower() for token in tokens]
         translated_tokens = []
+        unknown_words = []
         i = 0
         while i < len(tokens):
             if tokens[i].strip():  # ถ้าเป็นคำ (ไม่ใช่ช่องว่าง)
-                # Try to match phrases first
-                phrase_found = False
-                for phrase, translation in sorted(self.phrases.items(), key=lambda x: len(x[0].split()), reverse=True):
-                    phrase_words = phrase.lower().split()
-                    if i + len(phrase_words) <= len(tokens) and [w.lower() for w in tokens[i:i+len(phrase_words)] if w.strip()] == phrase_words:
-                        translated_tokens.append(translation)
-                        i += len(phrase_words)
-                        phrase_found = True
-                        break
-                
-                if not phrase_found:
-                    # Try to match multi-word dictionary entries
-                    for j in range(min(5, len(tokens) - i), 0, -1):  # Try up to 5-word phrases
-                        multi_word = ' '.join([w for w in tokens[i:i+j] if w.strip()]).lower()
-                        if multi_word in self.word_translation:
-                            translated_tokens.append(self.word_translation[multi_word])
-                            i += j
-                            break
-                    else:
-                        # If no phrase or multi-word match, translate single word
-                        word = tokens[i].lower()
-                        translated = self.word_translation.get(word, self.handle_unknown_word(tokens[i]))
-                        print(f"Word: {word}, Translated: {translated}")  # Debug: แสดงการแปลทีละคำ
-                        translated_tokens.append(translated)
-                        i += 1
+                match = self.phrase_trie.longest_match(lowered, i) or self.dictionary_trie.longest_match(lowered, i)
+                correction = None
+                if not match and self.fuzzy_mode == 'auto':
+                    correction = self.auto_correct(lowered[i])
+                if match:
+                    i, translation = match
+                    translated_tokens.append(translation)
+                elif correction is not None:
+                    translated_tokens.append(correction)
+                    i += 1
+                else:
+                    translated = self.handle_unknown_word(tokens[i])
+                    unknown_words.append(tokens[i])
+                    print(f"Word: {lowered[i]}, Translated: {translated}")  # Debug: แสดงการแปลทีละคำ
+                    translated_tokens.append(translated)
+                    i += 1
             else:  # ถ้าเป็นช่องว่าง
                 translated_tokens.append(tokens[i])
                 i += 1
@@ -167,51 +291,69 @@ class Translator:
         translated_sentence = self.post_process(translated_tokens)
         
         self.logger.info(f"Translated: {sentence} -> {translated_sentence}")
-        return translated_sentence
+        return translated_sentence, unknown_words
+
+    def find_corrections(self, word):
+        """คืน (คำในพจนานุกรมที่ใกล้ที่สุด [(คำ, ระยะ)], ค้นครบภายในเวลาที่กำหนดหรือไม่)"""
+        if self.fuzzy_index is None or not any(char.isalpha() for char in word):
+            return [], True
+        return self.fuzzy_index.lookup(word.lower(), time_limit=self.fuzzy_time_limit)
+
+    def auto_correct(self, word):
+        # ใช้เฉพาะเมื่อค้นครบและมีคำที่ใกล้ที่สุดเพียงคำเดียว กันการแปลผิดจากตัวเลือกที่กำกวม
+        matches, complete = self.find_corrections(word)
+        if complete and len(matches) == 1:
+            return self.word_translation[matches[0][0]]
+        return None
+
+    def suggest_corrections(self, words):
+        suggestions = {}
+        for word in dict.fromkeys(word.lower() for word in words):
+            matches, _ = self.find_corrections(word)
+            if matches:
+                suggestions[word] = [
+                    {'word': match, 'translation': self.word_translation[match], 'distance': distance}
+                    for match, distance in matches
+                ]
+        return suggestions
 
     def post_process(self, translated_tokens):
         # รวมคำและช่องว่างกลับเป็นประโยค
         return ''.join(translated_tokens)
 
     def get_unknown_word_report(self, top_n=10):
-        return self.unknown_words.most_common(top_n)
+        return [(word, count) for word, count, _ in self.unknown_words.top(top_n)]
     
     def reset_unknown_word_counter(self):
         self.unknown_words.clear()
 
     def save_unknown_word_report(self, file_path):
         with open(file_path, 'w', encoding='utf-8') as f:
-            for word, count in self.unknown_words.items():
+            for word, count, _ in self.unknown_words.items():
                 f.write(f"{word},{count}\n")
         self.logger.info(f"Unknown word report saved to {file_path}")
 
-    def translate_text(self, text):
-        sentences = re.split(r'(?<=\.)\s*', text)  # แยกประโยคโดยรักษาช่องว่างระหว่างประโยค
-        translated_sentences = [self.translate_sentence(sentence) for sentence in sentences if sentence.strip()]
-        return ''.join(translated_sentences)
+    def translate_text(self, text, unknown_words=None):
+        # แปลทีละ segment (แคชแยกกัน วลีที่ซ้ำข้าม request จึงมาจากแคช) แล้วประกอบกลับด้วยช่องว่างเดิม
+        return ''.join(
+            (self.translate_sentence(segment, unknown_words) if segment else '') + separator
+            for segment, separator in self.segment_text(text)
+        )
 
     def clear_cache(self):
-        self.translate_sentence.cache_clear()
-
-# Usage
-base_dir = os.path.dirname(os.path.abspath(__file__))
-thai_dictionary_path = os.path.join(base_dir, 'data', 'THtoKM.txt')
-thai_phrase_path = os.path.join(base_dir, 'data', 'THtoKM_phrases.txt')
-thai_translator = Translator(dictionary_path=thai_dictionary_path, phrase_path=thai_phrase_path, is_thai=True)
-
-km_vocab_path = os.path.join(base_dir, 'data', 'KMcutting.txt')
-km_dictionary_path = os.path.join(base_dir, 'data', 'KMtoTH.txt')
-km_phrase_path = os.path.join(base_dir, 'data', 'KMtoTH_phrases.txt')
-km_translator = Translator(vocab_path=km_vocab_path, dictionary_path=km_dictionary_path, phrase_path=km_phrase_path)
-
-# Example usage
-km_text = "ป้อ   ไป  ไหน  มา"
-thai_translation = km_translator.translate_text(km_text)
-print(f"Kam Muang: {km_text}")
-print(f"Thai: {thai_translation}")
-
-# Additional test
-thai_text = "พ่อ   ไป  ไหน  มา"
-km_translation = thai_translator.translate_text(thai_text)
-print(f"Thai: {thai_text}")
-print(f"Kam Muang: {km_translation}")
\ No newline at end of file
+        self.cache.invalidate(*self.language_pair, self.version)
+
+if __name__ == '__main__':
+    from ModelASR.translator_registry import get_translator
+
+    # Example usage
+    km_text = "ป้อ   ไป  ไหน  มา"
+    thai_translation = get_translator('km', 'th').translate_text(km_text)
+    print(f"Kam Muang: {km_text}")
+    print(f"Thai: {thai_translation}")
+
+    # Additional test
+    thai_text = "พ่อ   ไป  ไหน  มา"
+    km_translation = get_translator('th', 'km').translate_text(thai_text)
+    print(f"Thai: {thai_text}")
+    print(f"Kam Muang: {km_translation}")
@@ -0,0 +1,278 @@
+import io
+import math
+import subprocess
+import threading
+import logging
+import numpy as np
+import soundfile as sf
+import torch
+import torchaudio.functional as AF
+from config import Config
+
+try:
+    import av  # PyAV: ถอด webm/opus ได้ใน process เดียวกัน ไม่ต้องเรียก ffmpeg
+except ImportError:
+    av = None
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+
+# container ที่ libsndfile อ่านไม่ได้: ถ้าไม่มี PyAV ต้องใช้ ffmpeg อยู่แล้ว จึงเริ่มถอดระหว่างอัปโหลดได้
+# และได้ผลเหมือนถอดหลังอัปโหลดเสร็จทุกประการ (hash ของเสียงที่ normalize แล้วจึงไม่เปลี่ยน)
+STREAMING_DECODE_EXTENSIONS = {'webm', 'weba', 'm4a', 'mp4', 'aac'}
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+class FFmpegDecoderPool:
+    """ใช้ ffmpeg เป็นทางสำรองเมื่อถอดไฟล์ใน process ไม่ได้
+
+    ส่งข้อมูลเข้า/ออกทาง stdin/stdout (ไม่มีไฟล์ชั่วคราว) และจำกัดจำนวน ffmpeg
+    ที่รันพร้อมกันด้วย semaphore เพื่อไม่ให้คำขอจำนวนมาก spawn process ล้นเครื่อง
+    """
+
+    def __init__(self, ffmpeg_path, max_workers=2, timeout=60):
+        self.ffmpeg_path = ffmpeg_path
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_workers)
+
+    def _command(self):
+        return [
+            self.ffmpeg_path, '-nostdin', '-hide_banner', '-loglevel', 'error',
+            '-i', 'pipe:0',
+            '-f', 'f32le', '-acodec', 'pcm_f32le',
+            '-ac', '1', '-ar', str(TARGET_SAMPLE_RATE),
+            'pipe:1'
+        ]
+
+    def decode(self, data):
+        with self.slots:
+            try:
+                result = subprocess.run(self._command(), input=data, capture_output=True, timeout=self.timeout)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                raise AudioDecodeError(f"ffmpeg failed: {e}")
+        if result.returncode != 0:
+            raise AudioDecodeError(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return np.frombuffer(result.stdout, dtype=np.float32).copy()
+
+    def open_stream(self):
+        """เริ่ม ffmpeg ที่รับข้อมูลทีละก้อนระหว่างอัปโหลด
+
+        คืน None ถ้าไม่มี slot ว่าง (ไม่รอ เพราะ client ที่อัปโหลดช้าจะยึด slot ไว้นาน)
+        """
+        if not self.slots.acquire(blocking=False):
+            return None
+        try:
+            process = subprocess.Popen(
+                self._command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0
+            )
+        except OSError as e:
+            self.slots.release()
+            logger.warning(f"Cannot start streaming ffmpeg decode: {e}")
+            return None
+        return FFmpegStreamDecoder(process, self.slots, self.timeout)
+
+
+class FFmpegStreamDecoder:
+    """ffmpeg หนึ่ง process ที่ถอดเสียงไปพร้อมกับรับข้อมูล: ``feed`` ทีละก้อน แล้ว ``finish`` หรือ ``abort``"""
+
+    def __init__(self, process, slots, timeout):
+        self.process = process
+        self.slots = slots
+        self.timeout = timeout
+        self.output = []
+        self.errors = []
+        self.failed = False
+        self.closed = False
+        # อ่าน stdout/stderr ตลอดเวลา ไม่ให้ ffmpeg ค้างเพราะ pipe เต็มขณะที่เรายังเขียน stdin อยู่
+        self.readers = [
+            threading.Thread(target=self._drain, args=(process.stdout, self.output), daemon=True),
+            threading.Thread(target=self._drain, args=(process.stderr, self.errors), daemon=True)
+        ]
+        for reader in self.readers:
+            reader.start()
+
+    @staticmethod
+    def _drain(pipe, chunks):
+        for chunk in iter(lambda: pipe.read(65536), b''):
+            chunks.append(chunk)
+
+    def feed(self, data):
+        if self.failed or self.closed:
+            return
+        try:
+            self.process.stdin.write(data)
+        except OSError:
+            # ffmpeg ออกไปก่อน (ไฟล์เสีย) finish จะ raise และผู้เรียกถอดแบบปกติแทน
+            self.failed = True
+
+    def finish(self):
+        if self.closed:
+            raise AudioDecodeError("Streaming decode already closed")
+        try:
+            self.process.stdin.close()
+        except OSError:
+            self.failed = True
+        try:
+            self.process.wait(self.timeout)
+        except subprocess.TimeoutExpired:
+            self.abort()
+            raise AudioDecodeError("ffmpeg failed: timed out")
+        for reader in self.readers:
+            reader.join()
+        self._release()
+
+        if self.failed or self.process.returncode != 0:
+            message = b''.join(self.errors).decode('utf-8', 'replace').strip()
+            raise AudioDecodeError(f"ffmpeg failed: {message}")
+        return np.frombuffer(b''.join(self.output), dtype=np.float32).copy()
+
+    def abort(self):
+        if self.closed:
+            return
+        self.process.kill()
+        self.process.wait()
+        self._release()
+
+    def _release(self):
+        if not self.closed:
+            self.closed = True
+            self.slots.release()
+
+
+ffmpeg_pool = FFmpegDecoderPool(Config.FFMPEG_PATH, max_workers=Config.FFMPEG_MAX_WORKERS)
+
+
+def resample(samples, sample_rate, target_rate):
+    """เปลี่ยน sample rate โดยคงจำนวน channel (``samples`` เป็น (frames,) หรือ (frames, channels))"""
+    samples = np.asarray(samples, dtype=np.float32)
+    if sample_rate == target_rate or not len(samples):
+        return samples
+    # AF.resample ทำงานบนมิติสุดท้าย จึงสลับเป็น (channels, frames) ก่อน
+    resampled = AF.resample(torch.from_numpy(np.ascontiguousarray(samples.T)), sample_rate, target_rate)
+    return resampled.numpy().T
+
+
+def to_mono_16k(samples, sample_rate):
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if sample_rate != TARGET_SAMPLE_RATE and len(samples):
+        samples = AF.resample(torch.from_numpy(samples), sample_rate, TARGET_SAMPLE_RATE).numpy()
+    return samples
+
+
+class StreamingResampler:
+    """แปลง sample rate ของเสียงที่มาเป็นเฟรมต่อเนื่องเป็น 16 kHz โดยได้ผลเท่ากับแปลงทั้งก้อนครั้งเดียว
+
+    การ resample ทีละเฟรมแยกกันทำให้เกิดรอยต่อที่ขอบเฟรม (filter มองไม่เห็น sample ข้างเคียง)
+    จึงเก็บ sample ดิบท้ายสุดไว้เป็น context และรอ lookahead ก่อนคืนผล
+    ประมวลผลทีละ block ที่ความยาวเป็นจำนวนเต็มเท่าของอัตราส่วน เพื่อให้ตำแหน่ง output ตรงกันพอดี
+    """
+
+    def __init__(self, sample_rate, margin=256):
+        self.sample_rate = int(sample_rate)
+        divisor = math.gcd(self.sample_rate, TARGET_SAMPLE_RATE)
+        self.step_in = self.sample_rate // divisor
+        self.step_out = TARGET_SAMPLE_RATE // divisor
+        # context/lookahead ต้องยาวกว่าครึ่งหนึ่งของ filter และเป็นจำนวนเต็มเท่าของ step_in
+        self.margin = self.step_in * math.ceil(margin / self.step_in)
+        self.context = np.zeros(0, dtype=np.float32)
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.consumed = 0
+        self.emitted = 0
+
+    def _resample(self, samples):
+        return AF.resample(torch.from_numpy(samples), self.sample_rate, TARGET_SAMPLE_RATE).numpy()
+
+    def _convert(self, length, final=False):
+        buffer = np.concatenate([self.context, self.pending])
+        if final:
+            output = self._resample(buffer)[len(self.context) // self.step_in * self.step_out:]
+            # ความยาวรวมเท่ากับการ resample ทั้งก้อน
+            total = math.ceil((self.consumed + len(self.pending)) * self.step_out / self.step_in)
+            output = output[:total - self.emitted]
+        else:
+            end = len(self.context) + length
+            output = self._resample(buffer[:end + self.margin])
+            start = len(self.context) // self.step_in * self.step_out
+            output = output[start:start + length // self.step_in * self.step_out]
+            self.context = buffer[max(end - self.margin, 0):end]
+            self.pending = buffer[end:]
+            self.consumed += length
+        self.emitted += len(output)
+        return output.astype(np.float32, copy=False)
+
+    def feed(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)
+        if self.sample_rate == TARGET_SAMPLE_RATE:
+            return samples
+        self.pending = np.concatenate([self.pending, samples])
+        blocks = (len(self.pending) - self.margin) // self.step_in
+        if blocks <= 0:
+            return np.zeros(0, dtype=np.float32)
+        return self._convert(blocks * self.step_in)
+
+    def flush(self):
+        """คืน sample ที่เหลือทั้งหมดเมื่อจบสตรีม"""
+        if self.sample_rate == TARGET_SAMPLE_RATE or not len(self.pending):
+            return np.zeros(0, dtype=np.float32)
+        output = self._convert(len(self.pending), final=True)
+        self.pending = np.zeros(0, dtype=np.float32)
+        return output
+
+
+def _decode_with_soundfile(data):
+    samples, sample_rate = sf.read(io.BytesIO(data), dtype='float32', always_2d=False)
+    return to_mono_16k(samples, sample_rate)
+
+
+def _decode_with_av(data):
+    resampler = av.AudioResampler(format='flt', layout='mono', rate=TARGET_SAMPLE_RATE)
+    chunks = []
+    with av.open(io.BytesIO(data)) as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks).astype(np.float32, copy=False)
+
+
+def decode_audio_bytes(data):
+    """ถอดไฟล์เสียง (wav/mp3/webm/...) จาก bytes เป็น float32 mono 16 kHz"""
+    if not data:
+        raise AudioDecodeError("Audio file is empty")
+
+    # 1) libsndfile: wav/flac/ogg (และ mp3 ตั้งแต่ libsndfile 1.1)
+    try:
+        return _decode_with_soundfile(data)
+    except Exception:
+        pass
+
+    # 2) PyAV (ถ้าติดตั้ง): webm/opus และ container อื่น ๆ
+    if av is not None:
+        try:
+            return _decode_with_av(data)
+        except Exception as e:
+            logger.warning(f"In-process decode failed, falling back to ffmpeg: {e}")
+
+    # 3) ffmpeg ผ่าน pipe
+    return ffmpeg_pool.decode(data)
+
+
+def prefers_streaming_decode(filename):
+    if av is not None or not filename or '.' not in filename:
+        return False
+    return filename.rsplit('.', 1)[1].lower() in STREAMING_DECODE_EXTENSIONS
+
+
+def encode_wav(samples, sample_rate=TARGET_SAMPLE_RATE):
+    wav_file = io.BytesIO()
+    sf.write(wav_file, np.asarray(samples, dtype=np.float32), sample_rate, format='WAV', subtype='PCM_16')
+    return wav_file.getvalue()
@@ -0,0 +1,77 @@
+import threading
+import time
+import logging
+from collections import defaultdict, deque
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class BatchTranscriptionQueue:
+    """รวมคำขอถอดเสียงที่เข้ามาใกล้ ๆ กันของภาษาเดียวกันให้เป็น batch เดียว
+
+    แต่ละภาษามี worker thread ของตัวเอง ซึ่งจะรอคำขอแรก แล้วเก็บคำขอเพิ่ม
+    จนครบ ``window_ms`` หรือครบ ``max_batch_size`` รายการ จากนั้นส่งเข้า
+    ``transcriber.transcribe_waveforms`` ครั้งเดียว และกระจายผลกลับไปยัง
+    คำขอที่รออยู่ผ่าน ``Future``
+    """
+
+    def __init__(self, transcriber, window_ms=30, max_batch_size=8):
+        self.transcriber = transcriber
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.pending = defaultdict(deque)
+        self.workers = {}
+        self.condition = threading.Condition()
+
+    def submit(self, waveform, language):
+        language = language.lower()
+        future = Future()
+        with self.condition:
+            self.pending[language].append((time.monotonic(), waveform, future))
+            if language not in self.workers:
+                worker = threading.Thread(
+                    target=self._run, args=(language,),
+                    name=f"asr-batch-{language}", daemon=True
+                )
+                self.workers[language] = worker
+                worker.start()
+            self.condition.notify_all()
+        return future
+
+    def transcribe(self, waveform, language, timeout=None):
+        return self.submit(waveform, language).result(timeout=timeout)
+
+    def _next_batch(self, language):
+        queue = self.pending[language]
+        with self.condition:
+            while not queue:
+                self.condition.wait()
+
+            # รอจนหมดหน้าต่างเวลานับจากคำขอแรก หรือจนได้ครบ batch
+            deadline = queue[0][0] + self.window
+            while len(queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+
+            batch_size = min(len(queue), self.max_batch_size)
+            return [queue.popleft() for _ in range(batch_size)]
+
+    def _run(self, language):
+        while True:
+            batch = self._next_batch(language)
+            futures = [future for _, _, future in batch]
+            try:
+                transcripts = self.transcriber.transcribe_waveforms(
+                    [waveform for _, waveform, _ in batch], language
+                )
+            except Exception as e:
+                logger.error(f"Batch transcription error ({language}, {len(batch)} items): {e}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, transcript in zip(futures, transcripts):
+                future.set_result(transcript)
@@ -0,0 +1,124 @@
+"""เปรียบเทียบความแม่นยำ/ความเร็วของโมเดล ASR แบบ fp32 กับ int8
+
+ตัวอย่าง (รันจากโฟลเดอร์ server):
+
+    python -m ModelASR.compare_precision path/to/wavs --language km
+
+ถ้ามีไฟล์ ``<ชื่อไฟล์>.txt`` คู่กับ ``<ชื่อไฟล์>.wav`` จะใช้เป็นคำตอบอ้างอิง
+และรายงาน CER ของทั้งสองโหมด ไม่เช่นนั้นจะรายงาน CER ของ int8 เทียบกับ fp32
+"""
+import argparse
+import glob
+import os
+import time
+from functools import partial
+
+from ModelASR.model_registry import ModelRegistry
+from ModelASR.modelWav import ASR_MODELS, AudioTranscriber, load_model_and_processor
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(reference, hypothesis):
+    # ไม่นับช่องว่าง เพราะผลถอดเสียงถูกต่อคำกันโดยไม่เว้นวรรค
+    reference = ''.join(reference.split())
+    hypothesis = ''.join(hypothesis.split())
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    return edit_distance(reference, hypothesis) / len(reference)
+
+
+def run_mode(precision, files, language, cache_dir=None):
+    registry = ModelRegistry(
+        ASR_MODELS,
+        loader=partial(load_model_and_processor, precision=precision, cache_dir=cache_dir)
+    )
+    transcriber = AudioTranscriber(registry=registry)
+
+    started = time.perf_counter()
+    registry.get(language)
+    load_time = time.perf_counter() - started
+
+    results = {}
+    for path in files:
+        waveform = transcriber.load_waveform(path)
+        started = time.perf_counter()
+        text = transcriber.transcribe_waveform(waveform, language)
+        results[path] = (text, time.perf_counter() - started, len(waveform) / 16000)
+
+    registry.evict(language)
+    return load_time, results
+
+
+def read_reference(path):
+    reference_path = os.path.splitext(path)[0] + '.txt'
+    if not os.path.exists(reference_path):
+        return None
+    with open(reference_path, 'r', encoding='utf-8') as f:
+        return f.read().strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fp32 and int8 ASR accuracy and latency")
+    parser.add_argument('wav_dir', help="Directory containing .wav files (and optional .txt references)")
+    parser.add_argument('--language', default='th', choices=sorted(ASR_MODELS))
+    parser.add_argument('--cache-dir', default=None, help="Directory for cached int8 weights")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.wav_dir, '*.wav')))
+    if not files:
+        parser.error(f"No .wav files found in {args.wav_dir}")
+
+    fp32_load, fp32 = run_mode('fp32', files, args.language)
+    int8_load, int8 = run_mode('int8', files, args.language, args.cache_dir)
+
+    rows = []
+    for path in files:
+        fp32_text, fp32_time, duration = fp32[path]
+        int8_text, int8_time, _ = int8[path]
+        reference = read_reference(path)
+        baseline = reference if reference is not None else fp32_text
+        rows.append({
+            'file': os.path.basename(path),
+            'duration': duration,
+            'fp32_time': fp32_time,
+            'int8_time': int8_time,
+            'fp32_cer': character_error_rate(baseline, fp32_text),
+            'int8_cer': character_error_rate(baseline, int8_text),
+            'has_reference': reference is not None,
+        })
+
+    print(f"{'file':<40} {'sec':>6} {'fp32 s':>8} {'int8 s':>8} {'fp32 CER':>9} {'int8 CER':>9}")
+    for row in rows:
+        print(f"{row['file']:<40} {row['duration']:>6.1f} {row['fp32_time']:>8.3f} {row['int8_time']:>8.3f} "
+              f"{row['fp32_cer']:>9.3f} {row['int8_cer']:>9.3f}")
+
+    total_fp32 = sum(row['fp32_time'] for row in rows)
+    total_int8 = sum(row['int8_time'] for row in rows)
+    mean_fp32_cer = sum(row['fp32_cer'] for row in rows) / len(rows)
+    mean_int8_cer = sum(row['int8_cer'] for row in rows) / len(rows)
+    referenced = sum(row['has_reference'] for row in rows)
+
+    print()
+    print(f"Model load time: fp32 {fp32_load:.1f}s, int8 {int8_load:.1f}s")
+    print(f"Inference time:  fp32 {total_fp32:.2f}s, int8 {total_int8:.2f}s "
+          f"(speedup x{total_fp32 / total_int8 if total_int8 else 0:.2f})")
+    print(f"CER baseline:    {referenced}/{len(rows)} files with reference text, others compared against fp32")
+    print(f"Mean CER:        fp32 {mean_fp32_cer:.4f}, int8 {mean_int8_cer:.4f}, "
+          f"delta {mean_int8_cer - mean_fp32_cer:+.4f}")
+
+
+if __name__ == '__main__':
+    main()
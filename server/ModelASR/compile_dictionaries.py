@@ -0,0 +1,32 @@
+"""คอมไพล์พจนานุกรม THtoKM/KMtoTH เป็นไฟล์ .kmdict สำหรับเปิดด้วย mmap
+
+ใช้งาน (จากโฟลเดอร์ server):
+
+    python -m ModelASR.compile_dictionaries
+
+ถ้าไฟล์ต้นฉบับมีบรรทัดที่รูปแบบไม่ถูกต้อง จะแสดงรายการแล้วจบด้วย exit code 1
+โดยไม่เขียนไฟล์คอมไพล์
+"""
+import sys
+from ModelASR.compiled_dictionary import build_sections, write_compiled_dictionary
+from ModelASR.translator_registry import LANGUAGE_PAIRS
+
+
+def compile_all():
+    failed = False
+    for (source_lang, target_lang), paths in LANGUAGE_PAIRS.items():
+        sections, errors = build_sections(paths)
+        if errors:
+            failed = True
+            for path, line_number, line in errors:
+                print(f"{path}:{line_number}: invalid entry: {line}", file=sys.stderr)
+            continue
+
+        write_compiled_dictionary(paths['compiled_path'], sections)
+        counts = ', '.join(f"{name}={len(entries)}" for name, entries in sections.items())
+        print(f"{source_lang}->{target_lang}: {paths['compiled_path']} ({counts})")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(compile_all())
@@ -0,0 +1,247 @@
+"""พจนานุกรมแบบคอมไพล์ (sorted string table) ที่เปิดด้วย mmap
+
+รูปแบบไฟล์ (little-endian):
+
+    header   : MAGIC (8 bytes), จำนวน section (uint32), reserved (uint32)
+    sections : ต่อ section -> ชื่อ (16 bytes, เติม \\0), offset (uint64), length (uint64)
+
+แต่ละ section เป็นตารางสตริงที่เรียง key ตาม byte แล้ว:
+
+    count (uint32), reserved (uint32),
+    key offsets (count + 1 x uint32), value offsets (count + 1 x uint32),
+    key blob (utf-8), value blob (utf-8)
+
+ทุก worker ที่เปิดไฟล์เดียวกันใช้ page cache ร่วมกัน ไม่ต้อง parse ใหม่และไม่มี dict ต่อ process
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+MAGIC = b'KMDICT1\0'
+HEADER = struct.Struct('<8sII')
+SECTION = struct.Struct('<16sQQ')
+TABLE_HEADER = struct.Struct('<II')
+
+# บรรทัดหัวตารางในไฟล์ CSV (เช่น "คำเมือง, คำไทย") ไม่ใช่คำศัพท์
+DICTIONARY_HEADERS = {('คำเมือง', 'คำไทย'), ('คำไทย', 'คำเมือง')}
+
+
+class DictionaryFormatError(Exception):
+    pass
+
+
+def normalize_key(key):
+    # ตัวพิมพ์เล็กและคั่นคำด้วยช่องว่างเดียว ให้ตรงกับ token ที่ใช้ค้นใน trie/ตารางคอมไพล์
+    return ' '.join(key.lower().split())
+
+
+def parse_dictionary_file(file_path):
+    """อ่าน THtoKM.txt/KMtoTH.txt คืน (entries, errors) โดย errors เป็น [(เลขบรรทัด, บรรทัด)]"""
+    entries = {}
+    errors = []
+    with open(file_path, 'r', encoding='utf-8-sig') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            parts = [part.strip() for part in line.split(',')]
+            if len(parts) != 2 or not parts[0] or not parts[1]:
+                errors.append((line_number, line))
+                continue
+            if line_number == 1 and tuple(parts) in DICTIONARY_HEADERS:
+                continue
+            entries[normalize_key(parts[0])] = parts[1]
+    return entries, errors
+
+
+def parse_phrase_file(file_path):
+    entries = {}
+    errors = []
+    with open(file_path, 'r', encoding='utf-8-sig') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            parts = line.split('\t')
+            if len(parts) != 2 or not parts[0].strip():
+                errors.append((line_number, line))
+                continue
+            entries[normalize_key(parts[0])] = parts[1].strip()
+    return entries, errors
+
+
+def parse_vocabulary_file(file_path):
+    with open(file_path, 'r', encoding='utf-8-sig') as file:
+        return {line.strip() for line in file if line.strip()}
+
+
+def build_sections(paths):
+    """อ่านไฟล์ต้นฉบับของคู่ภาษาหนึ่ง (dictionary_path/phrase_path/vocab_path)
+
+    คืน (sections, errors) โดย errors เป็น [(ไฟล์, เลขบรรทัด, บรรทัด)]
+    """
+    sections = {}
+    errors = []
+
+    dictionary_path = paths.get('dictionary_path')
+    if dictionary_path:
+        entries, bad_lines = parse_dictionary_file(dictionary_path)
+        sections['dictionary'] = entries
+        errors.extend((dictionary_path, line_number, line) for line_number, line in bad_lines)
+
+    phrase_path = paths.get('phrase_path')
+    if phrase_path and os.path.exists(phrase_path):
+        entries, bad_lines = parse_phrase_file(phrase_path)
+        sections['phrases'] = entries
+        errors.extend((phrase_path, line_number, line) for line_number, line in bad_lines)
+
+    vocab_path = paths.get('vocab_path')
+    if vocab_path:
+        sections['vocab'] = {word: '' for word in parse_vocabulary_file(vocab_path)}
+
+    return sections, errors
+
+
+def _encode_table(entries):
+    items = sorted((key.encode('utf-8'), value.encode('utf-8')) for key, value in entries.items())
+    key_offsets = array('I', [0])
+    value_offsets = array('I', [0])
+    for key, value in items:
+        key_offsets.append(key_offsets[-1] + len(key))
+        value_offsets.append(value_offsets[-1] + len(value))
+    if sys.byteorder != 'little':
+        key_offsets.byteswap()
+        value_offsets.byteswap()
+    return b''.join([
+        TABLE_HEADER.pack(len(items), 0),
+        key_offsets.tobytes(),
+        value_offsets.tobytes(),
+        b''.join(key for key, _ in items),
+        b''.join(value for _, value in items),
+    ])
+
+
+def write_compiled_dictionary(output_path, sections):
+    """sections: {ชื่อ: dict ของ key -> value} (vocabulary ใช้ value เป็นสตริงว่าง)"""
+    tables = [(name, _encode_table(entries)) for name, entries in sections.items()]
+    offset = HEADER.size + SECTION.size * len(tables)
+    directory = []
+    for name, blob in tables:
+        directory.append(SECTION.pack(name.encode('ascii'), offset, len(blob)))
+        offset += len(blob)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(tables), 0))
+        for entry in directory:
+            f.write(entry)
+        for _, blob in tables:
+            f.write(blob)
+    # แทนที่ไฟล์เดิมแบบ atomic worker ที่ mmap ไฟล์เก่าอยู่ยังอ่านต่อได้
+    os.replace(temp_path, output_path)
+
+
+class CompiledTable(Mapping):
+    """Mapping แบบอ่านอย่างเดียวบน section หนึ่งของไฟล์ที่ mmap ไว้ (ค้นด้วย binary search)"""
+
+    def __init__(self, buffer, offset, length):
+        self.buffer = buffer
+        count, _ = TABLE_HEADER.unpack_from(buffer, offset)
+        self.count = count
+        start = offset + TABLE_HEADER.size
+        offsets_size = (count + 1) * 4
+        self.key_offsets = self._offsets(buffer, start, count + 1)
+        self.value_offsets = self._offsets(buffer, start + offsets_size, count + 1)
+        self.keys_start = start + 2 * offsets_size
+        self.values_start = self.keys_start + self.key_offsets[count]
+        if self.values_start + self.value_offsets[count] > offset + length:
+            raise DictionaryFormatError("Compiled dictionary section is truncated")
+
+    @staticmethod
+    def _offsets(buffer, start, count):
+        view = buffer[start:start + count * 4]
+        if sys.byteorder == 'little':
+            return view.cast('I')
+        offsets = array('I', bytes(view))
+        offsets.byteswap()
+        return offsets
+
+    def _key_bytes(self, index):
+        return bytes(self.buffer[self.keys_start + self.key_offsets[index]:self.keys_start + self.key_offsets[index + 1]])
+
+    def _value(self, index):
+        raw = self.buffer[self.values_start + self.value_offsets[index]:self.values_start + self.value_offsets[index + 1]]
+        return bytes(raw).decode('utf-8')
+
+    def _lower_bound(self, target):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_bytes(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find(self, key):
+        target = key.encode('utf-8')
+        index = self._lower_bound(target)
+        if index < self.count and self._key_bytes(index) == target:
+            return index
+        return -1
+
+    def lookup_prefix(self, key):
+        """คืน (มี key ที่ขึ้นต้นด้วย ``key`` หรือไม่, ค่าของ ``key`` หรือ None) ด้วย binary search ครั้งเดียว"""
+        target = key.encode('utf-8')
+        index = self._lower_bound(target)
+        if index >= self.count:
+            return False, None
+        found = self._key_bytes(index)
+        if found == target:
+            return True, self._value(index)
+        return found.startswith(target), None
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+        index = self._find(key)
+        if index < 0:
+            raise KeyError(key)
+        return self._value(index)
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self._key_bytes(index).decode('utf-8')
+
+    def items(self):
+        return [(self._key_bytes(index).decode('utf-8'), self._value(index)) for index in range(self.count)]
+
+
+class CompiledDictionary:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self.mmap)
+
+        magic, section_count, _ = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise DictionaryFormatError(f"Not a compiled dictionary: {path}")
+
+        self.sections = {}
+        for index in range(section_count):
+            name, offset, length = SECTION.unpack_from(buffer, HEADER.size + index * SECTION.size)
+            self.sections[name.rstrip(b'\0').decode('ascii')] = CompiledTable(buffer, offset, length)
+
+    def table(self, name):
+        return self.sections.get(name)
@@ -0,0 +1,113 @@
+"""แปลเอกสารยาวบน process pool เพื่อไม่ให้ยึด GIL ของ worker ที่รับ request อื่นอยู่
+
+แต่ละ process โหลด Translator (พจนานุกรมคอมไพล์แบบ mmap ใช้ page cache ร่วมกัน) ครั้งเดียวใน
+initializer แล้วรับงานเป็นก้อนข้อความที่ตัดตรงขอบ segment
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from ModelASR.space_saving import SpaceSaving
+from ModelASR.translator_registry import (
+    get_translator, loaded_translators, sync_translator, translation_cache, warm_translators
+)
+
+
+def _init_worker():
+    translation_cache.reset_after_fork()
+    # ยอดนับคำที่ไม่รู้จักที่ติดมาจาก process หลักยังอยู่ที่ process หลัก ไม่ส่งกลับไปนับซ้ำ
+    for translator in loaded_translators():
+        translator.unknown_words = SpaceSaving(capacity=translator.unknown_words.capacity)
+    warm_translators()
+
+
+def translate_chunk(source_lang, target_lang, version, text):
+    """คืน (ผลแปล, คำที่ไม่รู้จัก [(word, count, error)]) ให้ process หลักรวมเข้า sketch ของตัวเอง
+
+    flusher ทำงานเฉพาะใน process หลัก ยอดนับใน worker จึงต้องส่งกลับไปพร้อมผลแปลทุกก้อน
+    """
+    # process หลักโหลดพจนานุกรมเวอร์ชันใหม่แล้ว ให้ worker นี้ตามไปด้วย (ใช้ไฟล์คอมไพล์ที่ process หลักเขียนไว้)
+    translator = sync_translator(source_lang, target_lang, version)
+    return translator.translate_text(text), translator.unknown_words.drain()
+
+
+def split_chunks(segments, chunk_chars):
+    """รวม segment (จาก Translator.segment_text) เป็นก้อนละประมาณ chunk_chars ตัวอักษร
+
+    ตัดเฉพาะหลังช่องว่างของ segment ผลแปลของแต่ละก้อนต่อกันจึงเท่ากับแปลทั้งเอกสารครั้งเดียว
+    """
+    chunk = []
+    size = 0
+    for segment, separator in segments:
+        chunk.append(segment + separator)
+        size += len(segment) + len(separator)
+        if size >= chunk_chars:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+class DocumentTranslationPool:
+    def __init__(self, max_workers=None, chunk_chars=4000):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_chars = chunk_chars
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """สร้าง worker process ทันที ควรเรียกตอนเปิดเซิร์ฟเวอร์ก่อนเริ่ม thread อื่น
+
+        ใช้ fork (ถ้ามี) worker จึงได้โมดูลที่ import แล้วโดยไม่ต้องรัน main.py ซ้ำ
+        ProcessPoolExecutor แบบ fork สร้าง process ครบตั้งแต่งานแรก จึงไม่ fork อีกหลังมี thread
+        """
+        return self._get_executor()
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(method),
+                    initializer=_init_worker
+                )
+                self.executor.submit(os.getpid)
+            return self.executor
+
+    def _reset(self, executor):
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def translate(self, translator, text):
+        """generator คืนผลแปลทีละก้อนตามลำดับ ``translator`` ใช้ตัดข้อความและกำหนดเวอร์ชันพจนานุกรม"""
+        source_lang, target_lang = translator.language_pair
+        executor = self._get_executor()
+        futures = [
+            executor.submit(translate_chunk, source_lang, target_lang, translator.version, chunk)
+            for chunk in split_chunks(translator.segment_text(text), self.chunk_chars)
+        ]
+        try:
+            for future in futures:
+                translation, unknown_words = future.result()
+                if unknown_words:
+                    # รวมเข้าตัวที่ลงทะเบียนอยู่ขณะนี้ (อาจถูก reload แทน ``translator`` ไปแล้ว)
+                    get_translator(source_lang, target_lang).unknown_words.merge(unknown_words)
+                yield translation
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+        finally:
+            # client ตัดการเชื่อมต่อกลางทาง ไม่ต้องแปลก้อนที่เหลือ
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
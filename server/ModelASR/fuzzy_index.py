@@ -0,0 +1,85 @@
+import time
+
+
+def edit_distance(source, target, max_distance):
+    """Damerau-Levenshtein (optimal string alignment) หยุดทันทีเมื่อเกิน max_distance
+
+    คืน max_distance + 1 ถ้าระยะเกินงบที่กำหนด
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        row_minimum = i
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_minimum = min(row_minimum, value)
+        if row_minimum > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SymSpellIndex:
+    """ดัชนีค้นคำใกล้เคียงแบบ symmetric delete (SymSpell)
+
+    ตอนสร้างเก็บทุกรูปที่ลบตัวอักษรออกไม่เกิน ``max_distance`` ตัวของคำในพจนานุกรม
+    ตอนค้นจึงสร้างรูปลบของคำที่ค้นแล้ว lookup ใน dict ตรง ๆ ไม่ต้องไล่เทียบกับทุกคำ
+    ผู้สมัครที่ได้จะตรวจระยะจริงอีกครั้งด้วย edit_distance
+    """
+
+    def __init__(self, words, max_distance=1, min_length=3):
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.deletes = {}
+        for word in words:
+            if len(word) < min_length:
+                continue
+            for variant in self._variants(word):
+                self.deletes.setdefault(variant, []).append(word)
+
+    def _variants(self, word):
+        variants = {word}
+        frontier = {word}
+        for _ in range(self.max_distance):
+            frontier = {
+                variant[:index] + variant[index + 1:]
+                for variant in frontier if len(variant) > 1
+                for index in range(len(variant))
+            }
+            variants |= frontier
+        return variants
+
+    def lookup(self, word, time_limit=None):
+        """คืน (รายการ (คำในพจนานุกรม, ระยะ) ที่ระยะน้อยที่สุด, ค้นครบหรือไม่)
+
+        ``time_limit`` (วินาที) จำกัดเวลาต่อการค้นหนึ่งครั้ง ถ้าหมดเวลาจะคืนผลเท่าที่ได้พร้อม False
+        """
+        if len(word) < self.min_length:
+            return [], True
+        deadline = time.perf_counter() + time_limit if time_limit else None
+
+        best_distance = self.max_distance + 1
+        matches = []
+        checked = set()
+        for variant in self._variants(word):
+            for candidate in self.deletes.get(variant, ()):
+                if candidate in checked or candidate == word:
+                    continue
+                checked.add(candidate)
+                distance = edit_distance(word, candidate, min(best_distance, self.max_distance))
+                if distance < best_distance:
+                    best_distance = distance
+                    matches = [candidate]
+                elif distance == best_distance and distance <= self.max_distance:
+                    matches.append(candidate)
+            if deadline is not None and time.perf_counter() > deadline:
+                return [(match, best_distance) for match in sorted(matches)], False
+        return [(match, best_distance) for match in sorted(matches)], True
@@ -2,72 +2,167 @@ from datetime import time
 import numpy as np
 import soundfile as sf
 import os
-import subprocess
 from torchaudio.transforms import Resample
 from transformers import Wav2Vec2Processor, Wav2Vec2ForCTC
 from pythainlp.tokenize import word_tokenize
 import torch
-from datetime import datetime
-from models import db, AudioRecord 
-from flask import current_app
-from werkzeug.utils import secure_filename
+from functools import partial
+from config import Config
+from ModelASR.model_registry import ModelRegistry
+from ModelASR.quantization import SUPPORTED_PRECISIONS, load_quantized_model
+from ModelASR.streaming import ChunkedCTCDecoder
 
-# Path to ffmpeg
-ffmpeg_path = "C:/ffmpeg/bin/ffmpeg.exe"
+def load_model_and_processor(model_name, precision='fp32', cache_dir=None):
+    if precision not in SUPPORTED_PRECISIONS:
+        raise ValueError(f"Unsupported ASR precision: {precision}. Use one of {SUPPORTED_PRECISIONS}.")
 
-def load_model_and_processor(model_name):
     processor = Wav2Vec2Processor.from_pretrained(model_name)
-    model = Wav2Vec2ForCTC.from_pretrained(model_name)
+    if precision == 'int8':
+        model = load_quantized_model(model_name, cache_dir or Config.ASR_QUANTIZED_CACHE_DIR)
+    else:
+        model = Wav2Vec2ForCTC.from_pretrained(model_name)
     return processor, model
 
-# Load processors and models
-KMprocessor, KMmodel = load_model_and_processor("BlackHand13/Wav2Vec2-large-xlsr-53-km")
-THprocessor, THmodel = load_model_and_processor("airesearch/wav2vec2-large-xlsr-53-th")
+ASR_MODELS = {
+    'km': "BlackHand13/Wav2Vec2-large-xlsr-53-km",
+    'th': "airesearch/wav2vec2-large-xlsr-53-th",
+}
+
+# โหลดโมเดลเมื่อถูกใช้งานครั้งแรกเท่านั้น (ไม่โหลดตอน import)
+model_registry = ModelRegistry(
+    ASR_MODELS,
+    loader=partial(load_model_and_processor, precision=Config.ASR_PRECISION),
+    idle_timeout=Config.ASR_MODEL_IDLE_SECONDS
+)
+
+def get_model_version(language):
+    # ใช้เป็นส่วนหนึ่งของ key แคชผลถอดเสียง: เปลี่ยนโมเดลหรือ precision แล้วแคชเดิมจะไม่ถูกใช้
+    model_name = ASR_MODELS.get(language.lower())
+    if model_name is None:
+        raise ValueError("Unsupported language. Use 'km' for Khmer or 'th' for Thai.")
+    return f"{model_name}@{Config.ASR_PRECISION}"
 
 class AudioTranscriber:
-    def __init__(self):
-        self.KMprocessor = KMprocessor
-        self.KMmodel = KMmodel
-        self.THprocessor = THprocessor
-        self.THmodel = THmodel
+    def __init__(self, batch_queue=None, registry=None, chunk_seconds=None, stride_seconds=None):
+        self.registry = registry or model_registry
+        self.batch_queue = batch_queue
+        self.chunk_seconds = chunk_seconds or Config.ASR_CHUNK_SECONDS
+        self.stride_seconds = stride_seconds or Config.ASR_CHUNK_STRIDE_SECONDS
 
-    def transcribe_audio(self, audio_path, language):
+    def get_processor_and_model(self, language):
+        return self.registry.get(language)
+
+    def load_waveform(self, audio_path):
         # Load audio file
-        waveform, sample_rate = sf.read(audio_path)
-        waveform = torch.from_numpy(waveform).float().unsqueeze(0)
+        waveform, sample_rate = sf.read(audio_path, dtype='float32')
+        if waveform.ndim > 1:
+            waveform = waveform.mean(axis=1)
+        waveform = torch.from_numpy(waveform).unsqueeze(0)
 
         # Resample to 16,000 Hz
-        resampler = Resample(orig_freq=sample_rate, new_freq=16000)
-        waveform_resampled = resampler(waveform)
-
-        # Select appropriate processor and model
-        if language.lower() == 'km':
-            processor = self.KMprocessor
-            model = self.KMmodel
-        elif language.lower() == 'th':
-            processor = self.THprocessor
-            model = self.THmodel
-        else:
-            raise ValueError("Unsupported language. Use 'km' for Khmer or 'th' for Thai.")
+        if sample_rate != 16000:
+            resampler = Resample(orig_freq=sample_rate, new_freq=16000)
+            waveform = resampler(waveform)
+        return waveform[0]
 
-        # Convert audio to numbers
-        inputs = processor(waveform_resampled[0], sampling_rate=16000, return_tensors="pt", padding=True)
+    def transcribe_audio(self, audio_path, language):
+        # ไฟล์ยาวเกินหนึ่งหน้าต่างให้ถอดเสียงแบบ chunk เพื่อไม่ให้หน่วยความจำโตตามความยาวไฟล์
+        if sf.info(audio_path).duration > self.chunk_seconds:
+            transcript = ''
+            for transcript in self.transcribe_audio_chunked(audio_path, language):
+                pass
+            return transcript
+
+        waveform = self.load_waveform(audio_path)
+        return self.transcribe_waveform(waveform, language)
+
+    def create_chunked_decoder(self, language):
+        processor, model = self.get_processor_and_model(language)
+        return ChunkedCTCDecoder(
+            processor, model,
+            chunk_seconds=self.chunk_seconds,
+            stride_seconds=self.stride_seconds
+        )
+
+    def transcribe_audio_chunked(self, audio_path, language):
+        """Generator: อ่านไฟล์ทีละบล็อกและ yield ข้อความที่ถอดได้ถึงตอนนั้นทุกครั้งที่ถอดเสร็จหนึ่งหน้าต่าง"""
+        decoder = self.create_chunked_decoder(language)
+        sample_rate = sf.info(audio_path).samplerate
+        resampler = Resample(orig_freq=sample_rate, new_freq=16000) if sample_rate != 16000 else None
+
+        for block in sf.blocks(audio_path, blocksize=sample_rate * 5, dtype='float32'):
+            if block.ndim > 1:
+                block = block.mean(axis=1)
+            if resampler is not None:
+                block = resampler(torch.from_numpy(block).unsqueeze(0))[0].numpy()
+            if decoder.feed(block):
+                yield self.clean_transcription(decoder.text())
+
+        yield self.clean_transcription(decoder.finish())
+
+    def transcribe_waveform_chunked(self, waveform, language):
+        """เหมือน transcribe_audio_chunked แต่รับ waveform 16 kHz ที่อยู่ในหน่วยความจำแล้ว"""
+        decoder = self.create_chunked_decoder(language)
+        waveform = np.asarray(waveform, dtype=np.float32)
+        block_size = decoder.step
+        for start in range(0, len(waveform), block_size):
+            if decoder.feed(waveform[start:start + block_size]):
+                yield self.clean_transcription(decoder.text())
+
+        yield self.clean_transcription(decoder.finish())
+
+    def transcribe_waveform(self, waveform, language):
+        if len(waveform) > self.chunk_seconds * 16000:
+            transcript = ''
+            for transcript in self.transcribe_waveform_chunked(waveform, language):
+                pass
+            return transcript
+
+        # ถ้ามี batch queue ให้รวมกับคำขออื่นก่อนส่งเข้าโมเดล
+        if self.batch_queue is not None:
+            return self.batch_queue.transcribe(waveform, language)
+        return self.transcribe_waveforms([waveform], language)[0]
+
+    def transcribe_waveforms(self, waveforms, language):
+        processor, model = self.get_processor_and_model(language)
+
+        # Convert audio to numbers (pad every utterance to the longest one)
+        inputs = processor(
+            [np.asarray(waveform, dtype=np.float32) for waveform in waveforms],
+            sampling_rate=16000,
+            return_tensors="pt",
+            padding=True,
+            return_attention_mask=True
+        )
+        attention_mask = inputs.get('attention_mask')
 
         # Predict transcription using Wav2Vec2 model
         with torch.no_grad():
-            logits = model(input_values=inputs.input_values).logits
+            logits = model(input_values=inputs.input_values, attention_mask=attention_mask).logits
 
-        # Decode predicted transcription
+        # Decode predicted transcription, ignoring frames that only cover padding
         predicted_ids = torch.argmax(logits, dim=-1)
-        transcriptions = processor.batch_decode(predicted_ids)
-        transcribed_text = word_tokenize(transcriptions[0])
-        transcribe_sentence = ''.join(word for word in transcribed_text if word.strip())
+        if attention_mask is not None:
+            output_lengths = model._get_feat_extract_output_lengths(attention_mask.sum(-1)).tolist()
+        else:
+            output_lengths = [predicted_ids.shape[-1]] * len(waveforms)
+
+        transcriptions = [
+            processor.decode(ids[:int(length)])
+            for ids, length in zip(predicted_ids, output_lengths)
+        ]
+        return [self.clean_transcription(transcription) for transcription in transcriptions]
 
-        return transcribe_sentence
+    def clean_transcription(self, transcription):
+        transcribed_text = word_tokenize(transcription)
+        return ''.join(word for word in transcribed_text if word.strip())
 
 
 class AudioTranscriberMic(AudioTranscriber):
+    last_error = None
+
     def transcribe_audio_from_microphone(self, file_path, language):
+        self.last_error = None
         try:
             print(f"Audio file saved to {file_path}")
 
@@ -78,170 +173,34 @@ class AudioTranscriberMic(AudioTranscriber):
             
         except ValueError as ve:
             print(f"Value error: {ve}")
+            self.last_error = ve
             return f"Value error: {ve}"
         except IOError as ioe:
             print(f"IO error: {ioe}")
+            self.last_error = ioe
             return f"IO error: {ioe}"
         except Exception as e:
             print(f"Unexpected error: {e}")
+            self.last_error = e
             return f"Unexpected error: {e}"
 
-def convert_to_mono_and_16000hz(audio_data):
-    input_audio_path = 'input.wav'
-    output_audio_path = 'output.wav'
-    
-    # บันทึกข้อมูลเสียงที่รับเข้ามาเป็นไฟล์ชั่วคราว
-    with open(input_audio_path, 'wb') as f:
-        f.write(audio_data)
-    
-    # ใช้ ffmpeg แปลงไฟล์เสียงเป็น mono และ 16,000 Hz
-    subprocess.run([
-        ffmpeg_path, '-i', input_audio_path,
-        '-ar', '16000', '-ac', '1', 
-        output_audio_path
-    ], check=True)
-    
-    # อ่านข้อมูลเสียงที่แปลงแล้ว
-    with open(output_audio_path, 'rb') as f:
-        converted_audio = f.read()
-    
-    # ลบไฟล์ชั่วคราว
-    os.remove(input_audio_path)
-    os.remove(output_audio_path)
-    
-    return converted_audio
-    
-def convert_to_wav(file_path):
-    try:
-        # Extract file extension
-        file_extension = os.path.splitext(file_path)[1].lower()
-        
-        # Construct the output file path
-        output_file_path = os.path.splitext(file_path)[0] + '.wav'
-
-        # If the output file already exists, remove it
-        if os.path.exists(output_file_path):
-            os.remove(output_file_path)
-            print(f"Removed existing file: {output_file_path}")
-
-        # If it's already a WAV file, no need to convert
-        if file_extension == '.wav':
-            return file_path
-
-        # Construct the ffmpeg command
-        command = [
-            ffmpeg_path,
-            "-i", file_path,
-            "-ar", "16000",  # Sample rate
-            "-ac", "1",      # Number of channels (mono)
-            output_file_path
-        ]
+    def transcribe_waveform_from_microphone(self, waveform, language):
+        self.last_error = None
+        try:
+            if len(waveform) == 0:
+                raise ValueError("Audio file is empty")
 
-        # Run the command using subprocess
-        subprocess.run(command, check=True)
-
-        print(f"Converted audio file to WAV: {output_file_path}")
-        return output_file_path
-    except subprocess.CalledProcessError as e:
-        print(f"Error converting audio to WAV: {e}")
-        raise
-    except Exception as e:
-        print(f"Unexpected error: {e}")
-        raise
-
-def process_audio(audio_data, language):
-    audio_data = convert_to_mono_and_16000hz(audio_data)
-    
-    # แปลงข้อมูลเสียงเป็น numpy array และสร้าง tensor
-    audio_array = np.frombuffer(audio_data, dtype=np.int16)
-    audio_tensor = torch.tensor(audio_array).float().unsqueeze(0)
-    
-    transcriber = AudioTranscriber()
-    transcription = transcriber.transcribe_audio(audio_tensor, language)
-    
-    return transcription
-
-def process_and_save_audio(audio_file, language, user_id):
-    try:
-        # แปลงไฟล์เป็น WAV
-        wav_file_path = convert_to_wav(audio_file.filename)
-        
-        # ถอดความเสียง
-        transcriber = AudioTranscriber()
-        transcription = transcriber.transcribe_audio(wav_file_path, language)
-        
-        # คำนวณระยะเวลาของไฟล์เสียง
-        with sf.SoundFile(wav_file_path) as sound_file:
-            duration = len(sound_file) / sound_file.samplerate
-        
-        # สร้าง URL สำหรับไฟล์เสียง (ปรับตามโครงสร้างของเซิร์ฟเวอร์)
-        audio_url = f"/uploads/audio/{os.path.basename(wav_file_path)}"
-        
-        # สร้างรายการใหม่ในฐานข้อมูล
-        new_record = AudioRecord(
-            user_id=user_id,
-            audio_url=audio_url,
-            transcription=transcription,
-            time=datetime.now(),
-            duration=int(duration),
-            language=language
-        )
-        
-        # บันทึกลงฐานข้อมูล
-        db.session.add(new_record)
-        db.session.commit()
-        
-        return {"message": "Audio processed and saved successfully", "record_id": new_record.id}
-    except Exception as e:
-        db.session.rollback()
-        return {"error": str(e)}
-    finally:
-        # ลบไฟล์ชั่วคราว
-        if os.path.exists(wav_file_path):
-            os.remove(wav_file_path)
-
-def convert_and_save_audio_file(audio_file, user_type, file_id):
-    try:
-        # สร้างชื่อไฟล์ใหม่
-        filename = f"audio-{datetime.now().year}-{user_type}{file_id:06d}.wav"
-        
-        # กำหนด path สำหรับบันทึกไฟล์
-        upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'audio')
-        if not os.path.exists(upload_folder):
-            os.makedirs(upload_folder)
-        
-        output_file_path = os.path.join(upload_folder, filename)
-        
-        # บันทึกไฟล์ที่อัปโหลดมาชั่วคราว
-        temp_file_path = os.path.join(upload_folder, secure_filename(audio_file.filename))
-        audio_file.save(temp_file_path)
-        
-        # ตรวจสอบนามสกุลไฟล์
-        file_extension = os.path.splitext(temp_file_path)[1].lower()
-        
-        if file_extension != '.wav':
-            # แปลงไฟล์เป็น WAV ถ้าไม่ใช่ไฟล์ WAV
-            command = [
-                ffmpeg_path,
-                "-i", temp_file_path,
-                "-ar", "16000",  # Sample rate
-                "-ac", "1",      # Number of channels (mono)
-                output_file_path
-            ]
-            subprocess.run(command, check=True)
-            os.remove(temp_file_path)  # ลบไฟล์ชั่วคราว
-        else:
-            # ถ้าเป็นไฟล์ WAV อยู่แล้ว ให้เปลี่ยนชื่อไฟล์
-            os.rename(temp_file_path, output_file_path)
-        
-        return output_file_path
-    except subprocess.CalledProcessError as e:
-        current_app.logger.error(f"Error converting audio to WAV: {e}")
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-        raise
-    except Exception as e:
-        current_app.logger.error(f"Unexpected error in convert_and_save_audio_file: {e}")
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-        raise
\ No newline at end of file
+            return self.transcribe_waveform(waveform, language)
+
+        except ValueError as ve:
+            print(f"Value error: {ve}")
+            self.last_error = ve
+            return f"Value error: {ve}"
+        except IOError as ioe:
+            print(f"IO error: {ioe}")
+            self.last_error = ioe
+            return f"IO error: {ioe}"
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+            self.last_error = e
+            return f"Unexpected error: {e}"
@@ -0,0 +1,116 @@
+import threading
+import time
+import logging
+import gc
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """โหลด processor/model ของแต่ละภาษาเมื่อถูกใช้งานครั้งแรก
+
+    - ``prewarm`` โหลดล่วงหน้าใน background thread ได้ (ไม่บล็อกการเปิดเซิร์ฟเวอร์)
+    - ถ้ากำหนด ``idle_timeout`` (วินาที) มากกว่า 0 โมเดลที่ไม่ได้ใช้นานเกินกำหนด
+      จะถูกปลดออกจากหน่วยความจำ และจะโหลดใหม่อีกครั้งเมื่อมีคำขอ
+    """
+
+    def __init__(self, model_names, loader, idle_timeout=0, check_interval=60):
+        self.model_names = dict(model_names)
+        self.loader = loader
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.entries = {}
+        self.last_used = {}
+        self.lock = threading.Lock()
+        self.load_locks = {language: threading.Lock() for language in self.model_names}
+        self.evictor = None
+
+    def get(self, language):
+        language = language.lower()
+        if language not in self.model_names:
+            raise ValueError("Unsupported language. Use 'km' for Khmer or 'th' for Thai.")
+
+        entry = self.entries.get(language)
+        if entry is None:
+            # แต่ละภาษามี lock ของตัวเอง โหลด km อยู่ก็ยังใช้ th ได้
+            with self.load_locks[language]:
+                entry = self.entries.get(language)
+                if entry is None:
+                    entry = self._load(language)
+
+        self.last_used[language] = time.monotonic()
+        return entry
+
+    def _load(self, language):
+        model_name = self.model_names[language]
+        logger.info(f"Loading ASR model for '{language}': {model_name}")
+        started = time.monotonic()
+        entry = self.loader(model_name)
+        with self.lock:
+            self.entries[language] = entry
+            self.last_used[language] = time.monotonic()
+        logger.info(f"Loaded ASR model for '{language}' in {time.monotonic() - started:.1f}s")
+        self._start_evictor()
+        return entry
+
+    def is_loaded(self, language):
+        return language.lower() in self.entries
+
+    def loaded_languages(self):
+        return list(self.entries)
+
+    def prewarm(self, languages=None, background=True):
+        languages = [language for language in (languages or self.model_names) if language]
+
+        def warm():
+            for language in languages:
+                try:
+                    self.get(language)
+                except Exception as e:
+                    logger.error(f"Prewarm failed for '{language}': {e}")
+
+        if not background:
+            warm()
+            return None
+        thread = threading.Thread(target=warm, name="asr-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def evict(self, language):
+        language = language.lower()
+        with self.load_locks[language]:
+            with self.lock:
+                entry = self.entries.pop(language, None)
+                self.last_used.pop(language, None)
+        if entry is not None:
+            # คำขอที่กำลังใช้โมเดลอยู่ยังถือ reference ไว้ หน่วยความจำจะคืนเมื่อใช้เสร็จ
+            del entry
+            gc.collect()
+            logger.info(f"Evicted idle ASR model for '{language}'")
+            return True
+        return False
+
+    def evict_idle(self):
+        if not self.idle_timeout or self.idle_timeout <= 0:
+            return []
+        now = time.monotonic()
+        idle = [
+            language for language, last_used in list(self.last_used.items())
+            if now - last_used > self.idle_timeout
+        ]
+        return [language for language in idle if self.evict(language)]
+
+    def _start_evictor(self):
+        if not self.idle_timeout or self.idle_timeout <= 0 or self.evictor is not None:
+            return
+        with self.lock:
+            if self.evictor is not None:
+                return
+
+            def run():
+                while True:
+                    time.sleep(min(self.check_interval, self.idle_timeout))
+                    self.evict_idle()
+
+            self.evictor = threading.Thread(target=run, name="asr-evictor", daemon=True)
+            self.evictor.start()
@@ -0,0 +1,91 @@
+_VALUE = None  # key ของค่าคำแปลในแต่ละ node (token จริงเป็น str เสมอ จึงไม่ชนกัน)
+
+
+class PhraseTrie:
+    """Trie ระดับ token สำหรับหาวลี/คำหลายคำที่ยาวที่สุดที่เริ่มจากตำแหน่งหนึ่ง
+
+    สร้างครั้งเดียวตอนโหลดพจนานุกรม แล้วใช้ ``longest_match`` ไล่ทีละตำแหน่ง
+    ทำให้การแปลเป็นเชิงเส้นตามจำนวน token ไม่ขึ้นกับจำนวนวลีในพจนานุกรม
+    """
+
+    def __init__(self, entries=None):
+        self.root = {}
+        self.size = 0
+        if entries:
+            for source, target in entries:
+                self.add(source, target)
+
+    def add(self, source, target):
+        words = source.lower().split()
+        if not words:
+            return
+        node = self.root
+        for word in words:
+            node = node.setdefault(word, {})
+        if _VALUE not in node:
+            self.size += 1
+        node[_VALUE] = target
+
+    def __len__(self):
+        return self.size
+
+    def longest_match(self, tokens, start):
+        """คืน (ตำแหน่งถัดจาก token สุดท้ายที่ match, คำแปล) หรือ None
+
+        ``tokens`` ต้องเป็นตัวพิมพ์เล็กแล้ว token ที่เป็นช่องว่างระหว่างคำจะถูกข้าม
+        """
+        node = self.root
+        match = None
+        i = start
+        while i < len(tokens):
+            token = tokens[i]
+            if not token.strip():
+                if i == start:
+                    return None
+                i += 1
+                continue
+            # tokenizer อาจคืนคำหลายคำที่มีในพจนานุกรมเป็น token เดียว (เช่น "วันแรม 15 คํ่า")
+            for word in token.split():
+                node = node.get(word)
+                if node is None:
+                    break
+            if node is None:
+                break
+            i += 1
+            if _VALUE in node:
+                match = (i, node[_VALUE])
+        return match
+
+
+class CompiledPhraseMatcher:
+    """``longest_match`` แบบเดียวกับ PhraseTrie แต่ค้นใน CompiledTable ที่ mmap ไว้โดยตรง
+
+    ไม่ต้องสร้าง trie ของทั้งพจนานุกรมในหน่วยความจำของแต่ละ process (key ในตารางเป็นตัวพิมพ์เล็ก
+    และคั่นคำด้วยช่องว่างเดียวแล้ว) ขยายวลีทีละ token ตราบที่ยังมี key ที่ขึ้นต้นด้วยวลีนั้น
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def longest_match(self, tokens, start):
+        match = None
+        key = None
+        i = start
+        while i < len(tokens):
+            token = tokens[i]
+            if not token.strip():
+                if i == start:
+                    return None
+                i += 1
+                continue
+            key = token if key is None else f"{key} {token}"
+            has_prefix, value = self.table.lookup_prefix(key)
+            if not has_prefix:
+                break
+            i += 1
+            if value is not None:
+                match = (i, value)
+        return match
@@ -0,0 +1,53 @@
+import os
+import logging
+import torch
+from transformers import Wav2Vec2Config, Wav2Vec2ForCTC
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_PRECISIONS = ('fp32', 'int8')
+
+# ชนิดที่ state_dict ของ Linear แบบ dynamic int8 ต้องใช้ตอน unpickle (packed params เป็น qint8 tensor)
+# อนุญาตเฉพาะชนิดเหล่านี้ ไฟล์ในโฟลเดอร์แคชจึงรันโค้ดอื่นระหว่างโหลดไม่ได้
+QUANTIZED_SAFE_GLOBALS = [torch._utils._rebuild_qtensor, torch.qint8, torch.per_tensor_affine]
+if hasattr(torch.serialization, 'add_safe_globals'):
+    torch.serialization.add_safe_globals(QUANTIZED_SAFE_GLOBALS)
+
+
+def quantize_model(model):
+    # Dynamic int8: น้ำหนักของ Linear ถูกเก็บเป็น int8, activation ถูก quantize ตอนรัน
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantized_cache_path(model_name, cache_dir):
+    # ผูกกับเวอร์ชันของ torch เพราะรูปแบบ packed params เปลี่ยนได้ระหว่างเวอร์ชัน
+    filename = f"{model_name.replace('/', '__')}-int8-torch{torch.__version__.split('+')[0]}.pt"
+    return os.path.join(cache_dir, filename)
+
+
+def load_quantized_model(model_name, cache_dir):
+    cache_path = quantized_cache_path(model_name, cache_dir)
+
+    if os.path.exists(cache_path):
+        try:
+            # สร้างโครงโมเดลจาก config อย่างเดียว ไม่ต้องโหลดน้ำหนัก fp32 ทั้งก้อน
+            model = Wav2Vec2ForCTC(Wav2Vec2Config.from_pretrained(model_name))
+            model.eval()
+            model = quantize_model(model)
+            model.load_state_dict(torch.load(cache_path, map_location='cpu', weights_only=True))
+            logger.info(f"Loaded cached int8 model: {cache_path}")
+            return model
+        except Exception as e:
+            logger.warning(f"Cached int8 model is unusable, re-quantizing ({cache_path}): {e}")
+
+    model = Wav2Vec2ForCTC.from_pretrained(model_name)
+    model.eval()
+    quantized_model = quantize_model(model)
+    del model
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    torch.save(quantized_model.state_dict(), temp_path)
+    os.replace(temp_path, cache_path)
+    logger.info(f"Saved int8 model to cache: {cache_path}")
+    return quantized_model
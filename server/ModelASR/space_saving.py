@@ -0,0 +1,76 @@
+import heapq
+import threading
+
+
+class SpaceSaving:
+    """นับคำที่พบบ่อยที่สุดด้วยหน่วยความจำคงที่ (อัลกอริทึม Space-Saving)
+
+    เก็บได้ไม่เกิน ``capacity`` คำ เมื่อเต็มแล้วพบคำใหม่ จะแทนที่คำที่นับได้น้อยที่สุด
+    โดยเริ่มนับต่อจากค่านั้น (ค่า ``error`` คือจำนวนที่อาจนับเกินจริงของคำนั้น)
+    คำใดที่พบมากกว่า N / capacity ครั้งจะอยู่ในรายการเสมอ
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counters = {}  # word -> [count, error]
+        # min-heap ของ (count, word) แบบ lazy: entry ที่ count ไม่ตรงกับ counters แล้วจะถูกข้าม
+        self.heap = []
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def add(self, word, count=1):
+        with self.lock:
+            self._add(word, count, 0)
+
+    def _add(self, word, count, error):
+        self.total += count
+        counter = self.counters.get(word)
+        if counter is not None:
+            counter[0] += count
+            counter[1] += error
+        elif len(self.counters) < self.capacity:
+            counter = self.counters[word] = [count, error]
+        else:
+            minimum, evicted = self._pop_min()
+            del self.counters[evicted]
+            counter = self.counters[word] = [minimum + count, minimum + error]
+
+        heapq.heappush(self.heap, (counter[0], word))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(value[0], key) for key, value in self.counters.items()]
+            heapq.heapify(self.heap)
+
+    def _pop_min(self):
+        while True:
+            count, word = heapq.heappop(self.heap)
+            counter = self.counters.get(word)
+            if counter is not None and counter[0] == count:
+                return count, word
+
+    def merge(self, items):
+        """รวม (word, count, error) จาก sketch อื่น หรือคืนค่าที่ drain ไปแล้วแต่ flush ไม่สำเร็จ"""
+        with self.lock:
+            for word, count, error in items:
+                self._add(word, count, error)
+
+    def items(self):
+        with self.lock:
+            return [(word, counter[0], counter[1]) for word, counter in self.counters.items()]
+
+    def top(self, n=10):
+        return sorted(self.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def drain(self):
+        """คืนทุกคำแล้วล้างค่า (ใช้ตอน flush ลงฐานข้อมูล)"""
+        with self.lock:
+            items = [(word, counter[0], counter[1]) for word, counter in self.counters.items()]
+            self.counters = {}
+            self.heap = []
+            self.total = 0
+        return items
+
+    def clear(self):
+        self.drain()
+
+    def __len__(self):
+        return len(self.counters)
@@ -0,0 +1,87 @@
+import numpy as np
+import torch
+
+
+class ChunkedCTCDecoder:
+    """ถอดเสียงทีละหน้าต่าง (chunk) ที่ซ้อนทับกัน แล้วต่อผล CTC ตรงรอยต่อ
+
+    หน้าต่างยาว ``chunk_seconds`` และเลื่อนทีละ ``chunk - 2 * stride`` วินาที
+    logits ในช่วง ``stride_seconds`` ที่ขอบซ้าย/ขวาของแต่ละหน้าต่างถูกใช้เป็น
+    context เท่านั้น (ยกเว้นขอบซ้ายของหน้าต่างแรกและขอบขวาของหน้าต่างสุดท้าย)
+    ส่วนที่เหลือของแต่ละหน้าต่างต่อกันพอดีจึงไม่มีคำซ้ำหรือตกหล่นตรงรอยต่อ
+
+    หน่วยความจำที่ใช้คงที่ตามความยาวหน้าต่าง ไม่ขึ้นกับความยาวไฟล์
+    """
+
+    def __init__(self, processor, model, chunk_seconds=20, stride_seconds=2.5, sampling_rate=16000):
+        if chunk_seconds <= 2 * stride_seconds:
+            raise ValueError("chunk_seconds must be longer than twice stride_seconds")
+        self.processor = processor
+        self.model = model
+        self.sampling_rate = sampling_rate
+        self.chunk_length = int(chunk_seconds * sampling_rate)
+        self.stride_length = int(stride_seconds * sampling_rate)
+        self.step = self.chunk_length - 2 * self.stride_length
+
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_start = 0      # ตำแหน่ง sample (นับจากต้นไฟล์) ของ buffer[0]
+        self.committed_until = 0   # sample ก่อนตำแหน่งนี้ถูกถอดเสียงเสร็จแล้ว
+        self.committed_ids = []
+
+    def feed(self, samples):
+        """เติมเสียงเข้า buffer และคืนจำนวนหน้าต่างที่ถอดเสียงเสร็จในรอบนี้"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        self.buffer = np.concatenate([self.buffer, samples])
+
+        processed = 0
+        while len(self.buffer) >= self.chunk_length:
+            valid_end = self.buffer_start + self.chunk_length - self.stride_length
+            self._decode_window(self.buffer[:self.chunk_length], valid_end)
+            self.buffer = self.buffer[self.step:]
+            self.buffer_start += self.step
+            processed += 1
+        return processed
+
+    def finish(self):
+        """ถอดเสียงส่วนที่เหลือใน buffer (หน้าต่างสุดท้ายไม่มี stride ด้านขวา)"""
+        end = self.buffer_start + len(self.buffer)
+        if end > self.committed_until:
+            self._decode_window(self.buffer, end)
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_start = end
+        return self.text()
+
+    def _logits(self, window):
+        inputs = self.processor(window, sampling_rate=self.sampling_rate, return_tensors="pt")
+        with torch.no_grad():
+            return self.model(input_values=inputs.input_values).logits[0]
+
+    def _window_ids(self, window, valid_end):
+        # สั้นกว่า receptive field ของ feature encoder (400 samples) จะไม่ได้ frame ออกมา
+        if len(window) < 400:
+            return []
+        logits = self._logits(window)
+        frames_per_sample = logits.shape[0] / len(window)
+
+        first = int(round((self.committed_until - self.buffer_start) * frames_per_sample))
+        last = int(round((valid_end - self.buffer_start) * frames_per_sample))
+        return torch.argmax(logits[first:last], dim=-1).tolist()
+
+    def _decode_window(self, window, valid_end):
+        self.committed_ids.extend(self._window_ids(window, valid_end))
+        self.committed_until = valid_end
+
+    def partial_text(self):
+        """ข้อความชั่วคราว: ส่วนที่ commit แล้ว + ผลถอดของ buffer ที่ยังไม่ครบหน้าต่าง
+
+        ส่วนท้ายอาจเปลี่ยนได้เมื่อมีเสียงเข้ามาเพิ่ม เพราะยังไม่มี context ด้านขวา
+        """
+        end = self.buffer_start + len(self.buffer)
+        if end <= self.committed_until:
+            return self.text()
+        tentative_ids = self._window_ids(self.buffer, end)
+        return self.processor.decode(self.committed_ids + tentative_ids)
+
+    def text(self):
+        # CTC decode รวม token ซ้ำที่ติดกันและตัด blank ให้เอง รวมถึงตรงรอยต่อหน้าต่าง
+        return self.processor.decode(self.committed_ids)
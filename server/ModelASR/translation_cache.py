@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationCache:
+    """แคชผลแปลประโยคที่ใช้ร่วมกันทุก Translator ใน process
+
+    key คือ (source_lang, target_lang, dictionary version, ประโยค) เมื่อโหลดพจนานุกรมใหม่
+    entry ของเวอร์ชันเก่าจะไม่ถูกใช้อีก ค่าที่เก็บคือ (คำแปล, คำที่ไม่รู้จัก) เพื่อให้นับ
+    unknown words ซ้ำได้ตอน cache hit
+
+    ถ้าระบุ ``sqlite_path`` จะมีชั้นที่สองเป็นไฟล์ SQLite (WAL) ให้ worker ทุก process ใช้ร่วมกัน
+    """
+
+    def __init__(self, max_size=10000, ttl=0, sqlite_path=None, sqlite_cleanup_every=1000):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.sqlite_path = sqlite_path
+        self.sqlite_cleanup_every = sqlite_cleanup_every
+        self.local = threading.local()
+        self.sqlite_puts = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+        if sqlite_path:
+            self._connection()
+
+    def reset_after_fork(self):
+        # process ลูกที่ fork มาห้ามใช้ connection SQLite ของ process แม่ต่อ ให้เปิดใหม่เมื่อใช้ครั้งแรก
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def _expires_at(self):
+        return time.time() + self.ttl if self.ttl > 0 else None
+
+    def _connection(self):
+        # sqlite3 connection ใช้ข้าม thread ไม่ได้ จึงเปิดหนึ่งตัวต่อ thread
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.sqlite_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.sqlite_path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS translation_cache ('
+                'source_lang TEXT, target_lang TEXT, version TEXT, sentence TEXT, '
+                'translation TEXT, unknown_words TEXT, expires_at REAL, '
+                'PRIMARY KEY (source_lang, target_lang, version, sentence))'
+            )
+            self.local.connection = connection
+        return connection
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.expirations += 1
+
+        value = self._shared_get(key, now)
+        if value is not None:
+            with self.lock:
+                self.shared_hits += 1
+            self._put_local(key, value)
+            return value
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._put_local(key, value)
+        self._shared_put(key, value)
+
+    def _put_local(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, self._expires_at())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def _shared_get(self, key, now):
+        if not self.sqlite_path:
+            return None
+        try:
+            row = self._connection().execute(
+                'SELECT translation, unknown_words FROM translation_cache '
+                'WHERE source_lang IS ? AND target_lang IS ? AND version IS ? AND sentence = ? '
+                'AND (expires_at IS NULL OR expires_at > ?)',
+                (*key, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._shared_error(e)
+            return None
+        if row is None:
+            return None
+        return row[0], tuple(json.loads(row[1]))
+
+    def _shared_put(self, key, value):
+        if not self.sqlite_path:
+            return
+        translation, unknown_words = value
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO translation_cache VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (*key, translation, json.dumps(list(unknown_words), ensure_ascii=False), self._expires_at())
+                )
+                self.sqlite_puts += 1
+                if self.sqlite_puts % self.sqlite_cleanup_every == 0:
+                    connection.execute(
+                        'DELETE FROM translation_cache WHERE expires_at IS NOT NULL AND expires_at <= ?',
+                        (time.time(),)
+                    )
+        except sqlite3.Error as e:
+            self._shared_error(e)
+
+    def _shared_error(self, error):
+        with self.lock:
+            self.errors += 1
+        logger.warning(f"Translation cache SQLite tier error: {str(error)}")
+
+    def invalidate(self, source_lang, target_lang, version=None):
+        """ลบ entry ของคู่ภาษานี้ (เฉพาะ version ที่ระบุ หรือทุก version)"""
+        def matches(key):
+            return key[0] == source_lang and key[1] == target_lang and (version is None or key[2] == version)
+
+        with self.lock:
+            for key in [key for key in self.entries if matches(key)]:
+                del self.entries[key]
+
+        if self.sqlite_path:
+            try:
+                connection = self._connection()
+                with connection:
+                    if version is None:
+                        connection.execute(
+                            'DELETE FROM translation_cache WHERE source_lang IS ? AND target_lang IS ?',
+                            (source_lang, target_lang)
+                        )
+                    else:
+                        connection.execute(
+                            'DELETE FROM translation_cache WHERE source_lang IS ? AND target_lang IS ? AND version IS ?',
+                            (source_lang, target_lang, version)
+                        )
+            except sqlite3.Error as e:
+                self._shared_error(e)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'shared_tier': bool(self.sqlite_path),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'errors': self.errors
+            }
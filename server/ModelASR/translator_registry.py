@@ -0,0 +1,272 @@
+import hashlib
+import logging
+import os
+import threading
+from config import Config
+from ModelASR.Translator import Translator
+from ModelASR.translation_cache import TranslationCache
+from ModelASR.compiled_dictionary import (
+    build_sections, write_compiled_dictionary, parse_dictionary_file, parse_phrase_file, parse_vocabulary_file
+)
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+COMPILED_DIR = os.path.join(DATA_DIR, 'compiled')
+
+# คู่ภาษาที่รองรับ -> ไฟล์ที่ใช้สร้าง Translator
+LANGUAGE_PAIRS = {
+    ('th', 'km'): {
+        'dictionary_path': os.path.join(DATA_DIR, 'THtoKM.txt'),
+        'phrase_path': os.path.join(DATA_DIR, 'THtoKM_phrases.txt'),
+        'compiled_path': os.path.join(COMPILED_DIR, 'THtoKM.kmdict'),
+    },
+    ('km', 'th'): {
+        'vocab_path': os.path.join(DATA_DIR, 'KMcutting.txt'),
+        'dictionary_path': os.path.join(DATA_DIR, 'KMtoTH.txt'),
+        'phrase_path': os.path.join(DATA_DIR, 'KMtoTH_phrases.txt'),
+        'compiled_path': os.path.join(COMPILED_DIR, 'KMtoTH.kmdict'),
+    },
+}
+
+# ชนิดไฟล์ที่อัปโหลดแทนได้ -> (key ใน LANGUAGE_PAIRS, ตัว parse สำหรับตรวจรูปแบบ)
+DICTIONARY_FILES = {
+    'dictionary': ('dictionary_path', parse_dictionary_file),
+    'phrases': ('phrase_path', parse_phrase_file),
+    'vocab': ('vocab_path', None),
+}
+
+SOURCE_KEYS = ('vocab_path', 'dictionary_path', 'phrase_path')
+
+# แคชผลแปลของทุกคู่ภาษาใน process นี้ (และไฟล์ SQLite ที่แชร์ระหว่าง process ถ้าตั้งค่าไว้)
+translation_cache = TranslationCache(
+    max_size=Config.TRANSLATION_CACHE_SIZE,
+    ttl=Config.TRANSLATION_CACHE_TTL,
+    sqlite_path=Config.TRANSLATION_CACHE_SQLITE_PATH
+)
+
+_translators = {}
+_source_mtimes = {}
+_lock = threading.Lock()
+_reload_locks = {pair: threading.Lock() for pair in LANGUAGE_PAIRS}
+_watcher = None
+
+
+def _source_paths(paths):
+    return [paths[key] for key in SOURCE_KEYS if paths.get(key)]
+
+
+def _current_mtimes(paths):
+    return tuple(os.path.getmtime(path) if os.path.exists(path) else None for path in _source_paths(paths))
+
+
+def dictionary_version(paths):
+    """เวอร์ชัน = sha256 ของเนื้อหาไฟล์ต้นฉบับ ทุก worker จึงได้ค่าเดียวกันสำหรับไฟล์ชุดเดียวกัน"""
+    digest = hashlib.sha256()
+    for path in _source_paths(paths):
+        digest.update(os.path.basename(path).encode('utf-8'))
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        digest.update(b'\0')
+    return digest.hexdigest()[:12]
+
+
+def _build_translator(pair):
+    paths = LANGUAGE_PAIRS[pair]
+    mtimes = _current_mtimes(paths)
+    translator = Translator(
+        version=dictionary_version(paths),
+        language_pair=pair,
+        cache=translation_cache,
+        unknown_words_capacity=Config.UNKNOWN_WORDS_CAPACITY,
+        fuzzy_mode=Config.TRANSLATOR_FUZZY_MODE,
+        fuzzy_max_distance=Config.TRANSLATOR_FUZZY_MAX_DISTANCE,
+        fuzzy_time_limit=Config.TRANSLATOR_FUZZY_TIME_LIMIT_MS / 1000,
+        **paths
+    )
+    return translator, mtimes
+
+
+def get_translator(source_lang, target_lang):
+    """คืน Translator ตัวเดียวของ process สำหรับคู่ภาษานี้ (สร้างเมื่อใช้ครั้งแรก)"""
+    pair = (source_lang, target_lang)
+    if pair not in LANGUAGE_PAIRS:
+        raise ValueError('Unsupported language pair')
+
+    translator = _translators.get(pair)
+    if translator is None:
+        with _lock:
+            translator = _translators.get(pair)
+            if translator is None:
+                translator, mtimes = _build_translator(pair)
+                _translators[pair] = translator
+                _source_mtimes[pair] = mtimes
+    return translator
+
+
+def get_translator_for_source(source_lang):
+    for pair in LANGUAGE_PAIRS:
+        if pair[0] == source_lang:
+            return get_translator(*pair)
+    raise ValueError('Unsupported language')
+
+
+def loaded_translators():
+    return list(_translators.values())
+
+
+def warm_translators():
+    for pair in LANGUAGE_PAIRS:
+        get_translator(*pair)
+
+
+def _install(pair, translator, mtimes):
+    """สลับ Translator ของคู่ภาษาเป็นตัวใหม่ คืนตัวเดิม (ถ้ามี)"""
+    with _lock:
+        previous = _translators.get(pair)
+        if previous is not None:
+            translator.unknown_words.merge(previous.unknown_words.drain())
+        _translators[pair] = translator
+        _source_mtimes[pair] = mtimes
+    return previous
+
+
+def sync_translator(source_lang, target_lang, version):
+    """ใช้ใน process ลูก: ตามเวอร์ชันพจนานุกรมของ process หลักโดยไม่คอมไพล์หรือเขียนไฟล์เอง
+
+    process หลักคอมไพล์ไฟล์ mmap ไว้แล้วตอน reload จึงแค่เปิดไฟล์ที่มีอยู่ โหลดใหม่เฉพาะเมื่อไฟล์ต้นฉบับ
+    เปลี่ยนไปจากที่ instance ปัจจุบันใช้ ถ้าเวอร์ชันยังไม่ตรงเพราะ process หลักยังไม่ reload ก็ใช้ตัวเดิมต่อ
+    """
+    translator = get_translator(source_lang, target_lang)
+    if version is None or translator.version == version:
+        return translator
+
+    pair = (source_lang, target_lang)
+    with _reload_locks[pair]:
+        translator = _translators[pair]
+        if translator.version == version or _current_mtimes(LANGUAGE_PAIRS[pair]) == _source_mtimes.get(pair):
+            return translator
+        translator, mtimes = _build_translator(pair)
+        _install(pair, translator, mtimes)
+    logger.info(f"Dictionary {source_lang}->{target_lang} synced to version {translator.version}")
+    return translator
+
+
+def reload_translator(source_lang, target_lang):
+    """สร้าง Translator จากไฟล์ปัจจุบันใน thread ที่เรียก แล้วสลับแทนตัวเดิม
+
+    request ที่ถือ instance เดิมอยู่จะใช้เวอร์ชันเดิมจนจบ แคชผลแปลถูกลบเฉพาะของเวอร์ชันเดิม
+    ส่วนคู่ภาษาอื่นไม่ได้รับผลกระทบ
+    """
+    pair = (source_lang, target_lang)
+    if pair not in LANGUAGE_PAIRS:
+        raise ValueError('Unsupported language pair')
+
+    paths = LANGUAGE_PAIRS[pair]
+    with _reload_locks[pair]:
+        # คอมไพล์ไฟล์ mmap ใหม่ก่อน ถ้าไฟล์ต้นฉบับมีบรรทัดผิดรูปแบบ Translator จะอ่านไฟล์ข้อความแทน
+        sections, errors = build_sections(paths)
+        if errors:
+            logger.warning(f"Dictionary {pair} has {len(errors)} invalid lines, skipping compiled artifact")
+        elif paths.get('compiled_path'):
+            write_compiled_dictionary(paths['compiled_path'], sections)
+
+        translator, mtimes = _build_translator(pair)
+        previous = _install(pair, translator, mtimes)
+
+        # ผลแปลของเวอร์ชันเก่าใช้ไม่ได้อีก ลบเฉพาะของคู่ภาษานี้ คู่อื่นยังใช้แคชต่อได้
+        if previous is not None and previous.version != translator.version:
+            translation_cache.invalidate(source_lang, target_lang, previous.version)
+
+    logger.info(f"Dictionary {source_lang}->{target_lang} reloaded, version {translator.version}")
+    return translator
+
+
+def reload_in_background(source_lang, target_lang):
+    def run():
+        try:
+            reload_translator(source_lang, target_lang)
+        except Exception as e:
+            logger.error(f"Dictionary reload {source_lang}->{target_lang} failed: {str(e)}")
+
+    thread = threading.Thread(target=run, name=f"dictionary-reload-{source_lang}-{target_lang}", daemon=True)
+    thread.start()
+    return thread
+
+
+def check_for_changes():
+    """โหลดใหม่เฉพาะคู่ภาษาที่โหลดแล้วและไฟล์ต้นฉบับมี mtime เปลี่ยน"""
+    for pair in list(_translators):
+        if _current_mtimes(LANGUAGE_PAIRS[pair]) != _source_mtimes.get(pair):
+            try:
+                reload_translator(*pair)
+            except Exception as e:
+                logger.error(f"Dictionary reload {pair} failed: {str(e)}")
+
+
+def start_dictionary_watcher(interval):
+    """ตรวจไฟล์พจนานุกรมเป็นระยะ ทุก worker จึงได้เวอร์ชันใหม่เมื่อไฟล์ถูกแก้หรืออัปโหลดผ่าน worker อื่น"""
+    global _watcher
+    if interval <= 0 or _watcher is not None:
+        return _watcher
+
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.wait(interval):
+            check_for_changes()
+
+    _watcher = threading.Thread(target=run, name="dictionary-watcher", daemon=True)
+    _watcher.stop_event = stop_event
+    _watcher.start()
+    return _watcher
+
+
+def install_dictionary_file(source_lang, target_lang, kind, data):
+    """ตรวจไฟล์ที่อัปโหลดแล้วเขียนทับไฟล์ต้นฉบับแบบ atomic
+
+    คืนรายการ (เลขบรรทัด, บรรทัด) ที่ผิดรูปแบบ ถ้ามีจะไม่เขียนทับไฟล์เดิม
+    """
+    pair = (source_lang, target_lang)
+    if pair not in LANGUAGE_PAIRS:
+        raise ValueError('Unsupported language pair')
+    if kind not in DICTIONARY_FILES:
+        raise ValueError(f'Unknown dictionary file: {kind}')
+    key, parser = DICTIONARY_FILES[kind]
+    target_path = LANGUAGE_PAIRS[pair].get(key)
+    if not target_path:
+        raise ValueError(f'{kind} is not used for {source_lang}->{target_lang}')
+
+    temp_path = f"{target_path}.{os.getpid()}.upload"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    try:
+        if parser:
+            _, errors = parser(temp_path)
+        else:
+            parse_vocabulary_file(temp_path)
+            errors = []
+    except UnicodeDecodeError:
+        errors = [(0, 'File is not valid UTF-8')]
+
+    if errors:
+        os.remove(temp_path)
+        return errors
+    os.replace(temp_path, target_path)
+    return []
+
+
+def describe_dictionaries():
+    versions = []
+    for pair, paths in LANGUAGE_PAIRS.items():
+        translator = _translators.get(pair)
+        versions.append({
+            'source_lang': pair[0],
+            'target_lang': pair[1],
+            'loaded': translator is not None,
+            'version': translator.version if translator else None,
+            'file_version': dictionary_version(paths),
+            'entries': len(translator.word_translation) if translator and translator.word_translation else 0
+        })
+    return versions
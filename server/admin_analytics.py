@@ -14,6 +14,7 @@ import logging
 from sqlalchemy.exc import SQLAlchemyError
 from concurrent.futures import ThreadPoolExecutor
 from celery import Celery
+from ModelASR.translator_registry import translation_cache
 
 admin_analytics_bp = Blueprint('admin_analytics', __name__)
 cache = Cache(config={'CACHE_TYPE': 'simple'})
@@ -60,7 +61,8 @@ def get_audio_statistics():
         AudioAnalytics.source,
         AudioAnalytics.rating,
         func.count(AudioRecord.id).label('count'),
-        func.avg(AudioAnalytics.duration).label('avg_duration')
+        func.avg(AudioAnalytics.duration).label('avg_duration'),
+        func.avg(AudioAnalytics.silence_ratio).label('avg_silence_ratio')
     ).join(AudioAnalytics)
     
     if start_date:
@@ -79,7 +81,8 @@ def get_audio_statistics():
         'source': result.source.value,
         'rating': result.rating.value,
         'count': result.count,
-        'avg_duration': float(result.avg_duration) if result.avg_duration else 0
+        'avg_duration': float(result.avg_duration) if result.avg_duration else 0,
+        'avg_silence_ratio': float(result.avg_silence_ratio) if result.avg_silence_ratio is not None else None
     } for result in results])
 
 @admin_analytics_bp.route('/translation_trend', methods=['GET'])
@@ -248,6 +251,14 @@ def get_content_analysis():
         'word_frequency': [{'word': word, 'count': count} for word, count in word_freq]
     })
 
+@admin_analytics_bp.route('/translation_cache', methods=['GET'])
+@jwt_required()
+@admin_required
+@handle_errors
+def get_translation_cache_stats():
+    # สถิติของ process ที่รับ request นี้ (ชั้น SQLite ใช้ร่วมกันทุก worker)
+    return jsonify(translation_cache.stats())
+
 def invalidate_analytics_cache():
     cache.delete_memoized(get_audio_statistics)
     cache.delete_memoized(get_translation_trend)
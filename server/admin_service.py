@@ -6,6 +6,11 @@ from models import (
     RatingEnum, SourceEnum, TranslationLog
 )
 from sqlalchemy import asc, desc, func
+from ModelASR.translator_registry import (
+    DICTIONARY_FILES, install_dictionary_file, reload_in_background, describe_dictionaries
+)
+from audio_storage import audio_storage
+from transcription_service import transcription_cache
 import os
 
 admin_user_bp = Blueprint('admin_user', __name__)
@@ -218,7 +223,7 @@ def get_audio_records():
             query = query.filter(AudioRecord.transcription.ilike(f'%{transcription_query}%'))
 
         # Handle sorting
-        if sort_by in ['duration', 'language', 'rating', 'source']:
+        if sort_by in ['duration', 'language', 'rating', 'source', 'peak', 'silence_ratio']:
             order_column = getattr(AudioAnalytics, sort_by)
         elif hasattr(AudioRecord, sort_by):
             order_column = getattr(AudioRecord, sort_by)
@@ -243,7 +248,10 @@ def get_audio_records():
                     'duration': audio.analytics.duration,
                     'language': audio.analytics.language,
                     'rating': audio.analytics.rating.value,
-                    'source': audio.analytics.source.value
+                    'source': audio.analytics.source.value,
+                    'peak': audio.analytics.peak,
+                    'silence_ratio': audio.analytics.silence_ratio,
+                    'waveform_peaks': audio_dict['analytics']['waveform_peaks']
                 })
             audio_records.append(audio_dict)
 
@@ -264,14 +272,15 @@ def delete_audio_record(hashed_id):
     audio_record = AudioRecord.query.filter_by(hashed_id=hashed_id).first_or_404()
     
     try:
-        # Delete the associated file
-        audio_path = os.path.join(current_app.root_path, audio_record.audio_url)
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-        
+        blob = (audio_record.audio_url, audio_record.audio_hash)
+
         # Delete the database record
         db.session.delete(audio_record)
         db.session.commit()
+        transcription_cache.discard([audio_record.audio_hash])
+
+        # Delete the associated file (ถ้าไม่มี record อื่นใช้ไฟล์เดียวกัน)
+        audio_storage.release([blob])
         return jsonify({'message': 'Audio record deleted successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -293,7 +302,11 @@ def get_audio_record_details(hashed_id):
             'duration': audio_record.analytics.duration,
             'source': audio_record.analytics.source.value if audio_record.analytics.source else None,
             'rating': audio_record.analytics.rating.value if audio_record.analytics.rating else None,
-            'language': audio_record.analytics.language
+            'language': audio_record.analytics.language,
+            'rms': audio_record.analytics.rms,
+            'peak': audio_record.analytics.peak,
+            'silence_ratio': audio_record.analytics.silence_ratio,
+            'waveform_peaks': audio_dict['analytics']['waveform_peaks']
         })
     
     return jsonify(audio_dict), 200
@@ -304,12 +317,34 @@ def stream_audio(hashed_id):
     is_admin()
     audio_record = AudioRecord.query.filter_by(hashed_id=hashed_id).first_or_404()
     
-    audio_path = os.path.join(current_app.root_path, audio_record.audio_url)
-    
-    if not os.path.exists(audio_path):
+    audio_url = audio_record.audio_url
+    # ETag ผูกกับ hash ของเสียงและ format ที่เก็บ (ไฟล์ที่ย้ายไป archive แล้วเป็น FLAC/Opus)
+    etag = f"{audio_record.audio_hash}-{os.path.splitext(audio_url or '')[1].lstrip('.')}"
+    if audio_url and request.args.get('preview') == '1':
+        try:
+            audio_url = audio_storage.preview(audio_url, audio_record.audio_hash)
+            etag = f"{audio_record.audio_hash}-preview"
+        except Exception as e:
+            current_app.logger.error(f"Audio preview error: {str(e)}")
+
+    audio_path = audio_storage.resolve(audio_url) if audio_url else None
+    if not audio_path or not os.path.exists(audio_path):
         return jsonify({'error': 'Audio file not found'}), 404
-    
-    return send_file(audio_path, mimetype='audio/wav')
+
+    # conditional=True: รองรับ Range (206) และ If-None-Match/If-Range กับ ETag
+    # player จึง seek ได้โดยไม่ต้องโหลดทั้งไฟล์ใหม่ (USE_X_SENDFILE ให้ web server ส่งไฟล์แทน)
+    response = send_file(
+        audio_path,
+        mimetype=audio_storage.mimetype(audio_url),
+        conditional=True,
+        etag=etag,
+        max_age=current_app.config['AUDIO_STREAM_MAX_AGE']
+    )
+    # เนื้อหาของ hash หนึ่งไม่เปลี่ยน แต่เป็นข้อมูลผู้ใช้ ห้าม proxy กลางทาง cache
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
 
 @admin_user_bp.route('/audio-records/stats', methods=['GET'])
 @jwt_required()
@@ -326,6 +361,35 @@ def get_audio_source_counts():
     source_counts = AudioAnalytics.count_sources()
     return jsonify(source_counts)
 
+@admin_user_bp.route('/dictionaries', methods=['GET'])
+@jwt_required()
+def get_dictionaries():
+    is_admin()
+    return jsonify({'dictionaries': describe_dictionaries()}), 200
+
+@admin_user_bp.route('/dictionaries/<string:source_lang>/<string:target_lang>', methods=['POST'])
+@jwt_required()
+def upload_dictionary(source_lang, target_lang):
+    is_admin()
+    uploads = {kind: request.files[kind] for kind in DICTIONARY_FILES if kind in request.files}
+    if not uploads:
+        return jsonify({'error': f"No file provided, expected one of: {', '.join(DICTIONARY_FILES)}"}), 400
+
+    try:
+        for kind, file in uploads.items():
+            errors = install_dictionary_file(source_lang, target_lang, kind, file.read())
+            if errors:
+                return jsonify({
+                    'error': f'Invalid {kind} file',
+                    'invalid_lines': [{'line': line_number, 'text': line} for line_number, line in errors[:100]]
+                }), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # สร้างพจนานุกรมและ tokenizer ใหม่ใน background แล้วสลับแทนตัวเดิม (worker อื่นจะเห็นจาก mtime)
+    reload_in_background(source_lang, target_lang)
+    return jsonify({'message': 'Dictionary upload accepted, reloading in background'}), 202
+
 @admin_user_bp.errorhandler(404)
 def file_not_found(error):
     return jsonify({'error': 'File not found'}), 404
@@ -0,0 +1,272 @@
+"""ที่เก็บไฟล์เสียงแบบ content-addressed
+
+ตั้งชื่อไฟล์ตาม sha256 ของเนื้อเสียง และแบ่งโฟลเดอร์ย่อยสองชั้นจากตัวอักษรต้นของ hash
+(``uploads/audio/ab/cd/abcd....wav``) แต่ละโฟลเดอร์จึงมีไฟล์ไม่มากแม้จะมีเป็นล้านไฟล์
+ไฟล์เดียวกันเก็บครั้งเดียว และลบเมื่อไม่มี AudioRecord ใดอ้างถึง hash นั้นแล้ว
+
+เสียงที่เก็บเกิน ``archive_after_days`` วันจะถูกย้ายไป archive (``uploads/archive/ab/cd/...``)
+โดยบีบอัดเป็น FLAC (lossless) สำหรับคลิปที่ผู้ใช้กด LIKE ซึ่งใช้ฝึกโมเดลต่อ
+และ Opus (lossy) สำหรับคลิปอื่น ``audio_hash`` ยังเป็น hash ของ WAV เดิม
+
+preview (Opus bitrate ต่ำสำหรับ player ของ admin) สร้างเมื่อถูกขอครั้งแรกและเก็บไว้ใน ``preview_root``
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import soundfile as sf
+from config import Config
+from ModelASR.audio_decode import resample
+
+logger = logging.getLogger(__name__)
+
+# จำนวน parameter ต่อ IN (...) ไม่ให้เกินขีดจำกัดของ SQLite
+QUERY_CHUNK_SIZE = 500
+HASH_LOCK_STRIPES = 64
+
+# format -> (format ของ libsndfile, subtype, นามสกุลไฟล์)
+ARCHIVE_FORMATS = {
+    'flac': ('FLAC', 'PCM_16', '.flac'),
+    'opus': ('OGG', 'OPUS', '.opus'),
+}
+
+# sample rate ที่ libsndfile เข้ารหัส Opus ได้ ไฟล์เก่าที่เก็บ 44.1/22.05 kHz ต้อง resample ก่อน
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+MIME_TYPES = {
+    '.wav': 'audio/wav',
+    '.flac': 'audio/flac',
+    '.opus': 'audio/ogg',
+}
+
+
+def opus_supported():
+    # libsndfile ก่อน 1.0.29 เขียน Opus ไม่ได้
+    return 'OPUS' in sf.available_subtypes('OGG')
+
+
+def opus_input(samples, sample_rate, target_rate):
+    """คืน (samples, sample rate) ที่เขียนเป็น Opus ได้ resample เป็น ``target_rate`` ถ้า rate เดิมใช้ไม่ได้"""
+    if sample_rate in OPUS_SAMPLE_RATES:
+        return samples, sample_rate
+    return resample(samples, sample_rate, target_rate), target_rate
+
+
+class AudioStorage:
+    def __init__(self, root, archive_root=None, preview_root=None, extension='.wav'):
+        self.root = root
+        self.archive_root = archive_root
+        self.preview_root = preview_root
+        self.extension = extension
+        # กันไม่ให้ put/archive กับ release ของ hash เดียวกันสลับกันใน process นี้
+        self.lock = threading.Lock()
+        # lock ต่อ hash (แบ่งเป็นช่องตาม hash) ให้ save_audio_record ถือตั้งแต่ put จน commit record
+        self.hash_locks = [threading.RLock() for _ in range(HASH_LOCK_STRIPES)]
+
+    def hash_lock(self, audio_hash):
+        return self.hash_locks[hash(audio_hash) % len(self.hash_locks)]
+
+    def relative_path(self, audio_hash, root=None, extension=None):
+        """path ที่เก็บใน AudioRecord.audio_url (สัมพัทธ์กับโฟลเดอร์ที่รันเซิร์ฟเวอร์ เหมือนไฟล์เดิม)"""
+        return os.path.join(root or self.root, audio_hash[:2], audio_hash[2:4],
+                            audio_hash + (extension or self.extension))
+
+    @staticmethod
+    def resolve(audio_url):
+        return os.path.join(os.getcwd(), audio_url)
+
+    @staticmethod
+    def mimetype(audio_url):
+        return MIME_TYPES.get(os.path.splitext(audio_url)[1].lower(), 'application/octet-stream')
+
+    def read(self, audio_url):
+        """คืน (samples float32, sample rate) อ่านได้ทั้ง WAV, FLAC และ Opus"""
+        return sf.read(self.resolve(audio_url), dtype='float32')
+
+    def _write_atomic(self, path, write):
+        # เขียนไฟล์ชั่วคราวในโฟลเดอร์เดียวกันแล้ว rename ผู้อ่านจะไม่เห็นไฟล์ที่เขียนไม่ครบ
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def put(self, audio_hash, audio_file):
+        """เขียน blob ถ้ายังไม่มี แล้วคืน audio_url ``audio_file`` เป็น file-like object"""
+        audio_url = self.relative_path(audio_hash)
+        path = self.resolve(audio_url)
+        with self.lock:
+            if os.path.exists(path):
+                return audio_url
+
+            def write(f):
+                audio_file.seek(0)
+                shutil.copyfileobj(audio_file, f)
+
+            self._write_atomic(path, write)
+        return audio_url
+
+    def archive(self, audio_url, audio_hash, audio_format):
+        """เขียนสำเนาบีบอัดของ blob ลง archive แล้วคืน audio_url ใหม่ (ยังไม่ลบไฟล์เดิม)"""
+        sf_format, subtype, extension = ARCHIVE_FORMATS[audio_format]
+        archived_url = self.relative_path(audio_hash, root=self.archive_root, extension=extension)
+        path = self.resolve(archived_url)
+        samples, sample_rate = self.read(audio_url)
+        if subtype == 'OPUS':
+            # 48 kHz คือ rate ภายในของ Opus ไม่เสีย bandwidth ของไฟล์ 44.1 kHz เดิม
+            samples, sample_rate = opus_input(samples, sample_rate, 48000)
+        with self.lock:
+            if not os.path.exists(path):
+                self._write_atomic(path, lambda f: sf.write(f, samples, sample_rate, format=sf_format, subtype=subtype))
+        return archived_url
+
+    def preview(self, audio_url, audio_hash):
+        """คืน audio_url ของ preview (Opus ประมาณ 10 kbps) สร้างจาก blob ถ้ายังไม่มี"""
+        preview_url = self.relative_path(audio_hash, root=self.preview_root, extension='.opus')
+        path = self.resolve(preview_url)
+        if not os.path.exists(path):
+            # preview bitrate ต่ำ 16 kHz พอสำหรับเสียงพูด
+            samples, sample_rate = opus_input(*self.read(audio_url), 16000)
+            with self.lock:
+                if not os.path.exists(path):
+                    self._write_atomic(path, lambda f: sf.write(
+                        f, samples, sample_rate, format='OGG', subtype='OPUS', compression_level=1.0))
+        return preview_url
+
+    def remove(self, audio_url):
+        path = self.resolve(audio_url)
+        with self.lock:
+            if not os.path.exists(path):
+                return False
+            os.remove(path)
+            self._remove_empty_shards(os.path.dirname(path))
+        return True
+
+    def release(self, entries):
+        """ลบไฟล์ของ (audio_url, audio_hash) ที่ไม่มี AudioRecord อ้างถึงแล้ว
+
+        เรียกหลัง commit การลบ record คืนจำนวนไฟล์ที่ลบ
+        """
+        from models import AudioRecord
+
+        entries = [(audio_url, audio_hash) for audio_url, audio_hash in entries if audio_url]
+        hashes = list({audio_hash for _, audio_hash in entries})
+        referenced = set()
+        for start in range(0, len(hashes), QUERY_CHUNK_SIZE):
+            chunk = hashes[start:start + QUERY_CHUNK_SIZE]
+            referenced.update(row.audio_hash for row in AudioRecord.query.with_entities(
+                AudioRecord.audio_hash).filter(AudioRecord.audio_hash.in_(chunk)))
+
+        removed = 0
+        for audio_url, audio_hash in entries:
+            if audio_hash in referenced:
+                continue
+            # ตรวจซ้ำภายใต้ lock ของ hash เผื่อมี save_audio_record ของไฟล์เดียวกัน commit ไปหลังการค้นรอบแรก
+            with self.hash_lock(audio_hash), self.lock:
+                if AudioRecord.query.with_entities(AudioRecord.id).filter_by(audio_hash=audio_hash).first():
+                    continue
+                path = self.resolve(audio_url)
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+                    self._remove_empty_shards(os.path.dirname(path))
+                if self.preview_root:
+                    preview_path = self.resolve(self.relative_path(audio_hash, root=self.preview_root, extension='.opus'))
+                    if os.path.exists(preview_path):
+                        os.remove(preview_path)
+                        self._remove_empty_shards(os.path.dirname(preview_path))
+        return removed
+
+    def _remove_empty_shards(self, directory):
+        for root in (self.root, self.archive_root, self.preview_root):
+            if not root:
+                continue
+            root = os.path.abspath(self.resolve(root))
+            while os.path.abspath(directory).startswith(root + os.sep):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    return
+                directory = os.path.dirname(directory)
+
+
+audio_storage = AudioStorage(
+    Config.UPLOAD_FOLDERURL,
+    archive_root=Config.AUDIO_ARCHIVE_FOLDER,
+    preview_root=Config.AUDIO_PREVIEW_FOLDER
+)
+
+
+def archive_format(rating):
+    from models import RatingEnum
+
+    if rating == RatingEnum.LIKE or not Config.AUDIO_ARCHIVE_OPUS or not opus_supported():
+        return 'flac'
+    return 'opus'
+
+
+def archive_old_audio(older_than_days, batch_size=100):
+    """ย้ายเสียงที่เก่ากว่า ``older_than_days`` วันไป archive อ่านจากฐานข้อมูลทีละ ``batch_size`` แถว
+
+    ต้องเรียกภายใน app context คืนจำนวนไฟล์ที่ย้าย
+    """
+    from models import db, AudioRecord, AudioAnalytics
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    query = AudioRecord.query.outerjoin(AudioAnalytics).filter(
+        AudioRecord.created_at <= cutoff,
+        AudioRecord.audio_url.isnot(None)
+    )
+    if audio_storage.archive_root:
+        query = query.filter(~AudioRecord.audio_url.startswith(audio_storage.archive_root))
+
+    archived = 0
+    last_id = 0
+    while True:
+        # ไล่ตาม id แทน offset แถวที่ย้ายไม่สำเร็จ (ไฟล์หาย/เสีย) จึงไม่บัง batch ถัดไป
+        records = query.filter(AudioRecord.id > last_id).order_by(AudioRecord.id).limit(batch_size).all()
+        if not records:
+            return archived
+        for record in records:
+            last_id = record.id
+            old_url = record.audio_url
+            if not os.path.exists(audio_storage.resolve(old_url)):
+                continue
+            rating = record.analytics.rating if record.analytics else None
+            try:
+                record.audio_url = audio_storage.archive(old_url, record.audio_hash, archive_format(rating))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Audio archive failed for record {last_id}: {str(e)}")
+                continue
+            # ลบ WAV หลัง commit แล้วเท่านั้น ถ้า commit ไม่สำเร็จไฟล์เดิมยังใช้ได้
+            audio_storage.remove(old_url)
+            archived += 1
+
+
+def start_audio_archiver(app, interval, older_than_days, batch_size=100):
+    """ย้ายเสียงเก่าไป archive เป็นระยะใน background"""
+    def run():
+        while True:
+            time.sleep(interval)
+            # ข้อผิดพลาดรอบหนึ่ง (ฐานข้อมูลล็อก ดิสก์เต็ม ฯลฯ) ต้องไม่ทำให้ thread หยุดถาวร
+            try:
+                with app.app_context():
+                    archived = archive_old_audio(older_than_days, batch_size)
+            except Exception:
+                logger.exception("Audio archive pass failed")
+                continue
+            if archived:
+                logger.info(f"Archived {archived} audio files")
+
+    thread = threading.Thread(target=run, name="audio-archiver", daemon=True)
+    thread.start()
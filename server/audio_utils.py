@@ -1,10 +1,9 @@
 from datetime import datetime, timedelta
 import hashlib
+import json
 import os
-from werkzeug.utils import secure_filename
-import tempfile
-import shutil
-import librosa
+import numpy as np
+from config import Config
 
 def calculate_expiration_date(source, rating):
     from models import SourceEnum, RatingEnum
@@ -28,67 +27,73 @@ def calculate_expiration_date(source, rating):
 def generate_audio_hash(audio_content):
     return hashlib.sha256(audio_content).hexdigest()
 
-def save_audio_file(audio_file, user_prefix, count):
-    filename = secure_filename(f"{user_prefix}_{count}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.wav")
-    upload_folder = os.path.join(os.getcwd(), 'uploads', 'audio')
-    os.makedirs(upload_folder, exist_ok=True)
-    file_path = os.path.join(upload_folder, filename)
-    
-    if isinstance(audio_file, str):  # If audio_file is a file path
-        shutil.copy(audio_file, file_path)
-    else:  # If audio_file is a file-like object
-        with open(file_path, 'wb') as f:
-            audio_file.seek(0)
-            shutil.copyfileobj(audio_file, f)
-    
-    return file_path
-
-def save_audio_record(user_id, audio_file, transcription, duration, language, source):
+def save_audio_record(user_id, audio_file, transcription, duration, language, source, model_version=None, audio_hash=None,
+                      metadata=None):
     from models import AudioRecord, AudioAnalytics, db, RatingEnum, SourceEnum
-    
-    file_path = save_audio_file(audio_file, 'u' if user_id != 'guest' else 'g', AudioRecord.query.count() + 1)
-    
-    with open(file_path, 'rb') as audio_content:
-        audio_hash = generate_audio_hash(audio_content.read())
-    
-    existing_record = AudioRecord.query.filter_by(audio_hash=audio_hash).first()
-    if existing_record:
-        os.remove(file_path)  # Remove the duplicate file
-        return existing_record.id, existing_record.hashed_id, "existing"
+    from audio_storage import audio_storage
 
-    try:
-        new_record = AudioRecord.create(
-            user_id=user_id,
-            audio_url=os.path.relpath(file_path, os.getcwd()),
-            transcription=transcription,
-            time=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-            audio_hash=audio_hash
-        )
+    if audio_hash is None:
+        audio_file.seek(0)
+        audio_hash = generate_audio_hash(audio_file.read())
+
+    # ถือ lock ของ hash ตั้งแต่ตรวจไฟล์ซ้ำจน commit record release() ของไฟล์เดียวกันจึงลบ blob ระหว่างนั้นไม่ได้
+    with audio_storage.hash_lock(audio_hash):
+        # ตรวจไฟล์ซ้ำก่อนเขียน ไฟล์ที่เคยเก็บแล้วไม่ต้องเขียนดิสก์อีก
+        existing_record = AudioRecord.query.filter_by(audio_hash=audio_hash).first()
+        if existing_record:
+            changed = False
+            # ถอดใหม่ด้วยโมเดลเวอร์ชันอื่น (ภาษาเดิม) ให้เก็บผลล่าสุดไว้ใช้เป็นแคช
+            if (model_version and existing_record.model_version != model_version
+                    and existing_record.analytics and existing_record.analytics.language == language):
+                existing_record.transcription = transcription
+                existing_record.model_version = model_version
+                changed = True
+            # record ที่บันทึกก่อนมีการเก็บ metadata ตอน ingest
+            if metadata and existing_record.analytics and existing_record.analytics.waveform_peaks is None:
+                for key, value in metadata.items():
+                    setattr(existing_record.analytics, key, value)
+                changed = True
+            if changed:
+                db.session.commit()
+            return existing_record.id, existing_record.hashed_id, "existing"
+
+        audio_url = audio_storage.put(audio_hash, audio_file)
+
+        try:
+            new_record = AudioRecord.create(
+                user_id=user_id,
+                audio_url=audio_url,
+                transcription=transcription,
+                time=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                audio_hash=audio_hash,
+                model_version=model_version
+            )
         
-        # ตรวจสอบว่า source เป็น SourceEnum หรือไม่ ถ้าไม่ใช่ให้แปลงเป็น enum
-        source_enum = source if isinstance(source, SourceEnum) else SourceEnum(source)
+            # ตรวจสอบว่า source เป็น SourceEnum หรือไม่ ถ้าไม่ใช่ให้แปลงเป็น enum
+            source_enum = source if isinstance(source, SourceEnum) else SourceEnum(source)
         
-        new_analytics = AudioAnalytics(
-            audio_record_id=new_record.id,
-            user_id=user_id,
-            rating=RatingEnum.UNKNOWN,
-            language=language,
-            duration=duration,
-            source=source_enum
-        )
+            new_analytics = AudioAnalytics(
+                audio_record_id=new_record.id,
+                user_id=user_id,
+                rating=RatingEnum.UNKNOWN,
+                language=language,
+                duration=duration,
+                source=source_enum,
+                **(metadata or {})
+            )
         
-        # Set expiration date with the correct arguments
-        new_record.expiration_date = calculate_expiration_date(source_enum, RatingEnum.UNKNOWN)
+            # Set expiration date with the correct arguments
+            new_record.expiration_date = calculate_expiration_date(source_enum, RatingEnum.UNKNOWN)
         
-        db.session.add(new_record)
-        db.session.add(new_analytics)
-        db.session.commit()
-        return new_record.id, new_record.hashed_id, "new"
-    except Exception as e:
-        db.session.rollback()
-        os.remove(file_path)  # Remove the file if database operation fails
-        print(f"Error in save_audio_record: {str(e)}")
-        raise e
+            db.session.add(new_record)
+            db.session.add(new_analytics)
+            db.session.commit()
+            return new_record.id, new_record.hashed_id, "new"
+        except Exception as e:
+            db.session.rollback()
+            audio_storage.release([(audio_url, audio_hash)])  # Remove the file if database operation fails
+            print(f"Error in save_audio_record: {str(e)}")
+            raise e
 
 def update_audio_rating(identifier, rating):
     from models import AudioRecord, AudioAnalytics, db, RatingEnum
@@ -120,14 +125,18 @@ def update_audio_rating(identifier, rating):
 
 def cleanup_expired_records():
     from models import AudioRecord, db
+    from audio_storage import audio_storage
+    from transcription_service import transcription_cache
     
     try:
         expired_records = AudioRecord.query.filter(AudioRecord.expiration_date <= datetime.utcnow()).all()
+        blobs = [(record.audio_url, record.audio_hash) for record in expired_records]
         for record in expired_records:
-            if record.audio_url and os.path.exists(record.audio_url):
-                os.remove(record.audio_url)
             db.session.delete(record)
         db.session.commit()
+        transcription_cache.discard(audio_hash for _, audio_hash in blobs)
+        # ลบไฟล์หลัง commit เฉพาะไฟล์ที่ไม่มี record อื่นอ้างถึงแล้ว
+        audio_storage.release(blobs)
         return len(expired_records), "Expired records cleaned up successfully"
     except Exception as e:
         db.session.rollback()
@@ -158,10 +167,37 @@ def get_audio_records(user_id, page=1, per_page=10):
     except Exception as e:
         return None, str(e)
 
-def create_temp_file(file):
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    file.save(temp_file.name)
-    return temp_file.name
+def compute_audio_metadata(samples, sample_rate=16000, peaks=None, silence_threshold_db=None):
+    """คำนวณข้อมูลสรุปของเสียงจาก samples ที่ถอดแล้ว (float32 mono) สำหรับเก็บใน AudioAnalytics
+
+    คืน dict ของ rms, peak, silence_ratio (สัดส่วนเฟรม 20 ms ที่เบากว่า threshold)
+    และ waveform_peaks (JSON ของค่า |sample| สูงสุดในแต่ละช่วง ใช้วาด waveform ย่อ)
+    """
+    peaks = peaks or Config.AUDIO_WAVEFORM_PEAKS
+    if silence_threshold_db is None:
+        silence_threshold_db = Config.AUDIO_SILENCE_THRESHOLD_DB
+    samples = np.asarray(samples, dtype=np.float32)
+    if not len(samples):
+        return {'rms': 0.0, 'peak': 0.0, 'silence_ratio': 1.0, 'waveform_peaks': '[]'}
+
+    magnitude = np.abs(samples)
+    buckets = min(peaks, len(samples))
+    bounds = np.linspace(0, len(samples), buckets + 1).astype(np.int64)[:-1]
+    waveform = np.maximum.reduceat(magnitude, bounds)
+
+    frame = max(int(sample_rate * 0.02), 1)
+    frames = len(samples) // frame
+    frame_rms = np.sqrt(np.mean(np.square(samples[:frames * frame].reshape(frames, frame)), axis=1))
+    if len(samples) % frame:
+        # เฟรมท้ายที่ไม่ครบ 20 ms (หรือทั้งคลิปถ้าสั้นกว่าหนึ่งเฟรม) นับเป็นอีกหนึ่งเฟรม
+        tail_rms = np.sqrt(np.mean(np.square(samples[frames * frame:])))
+        frame_rms = np.append(frame_rms, tail_rms)
+    silence_ratio = float(np.mean(frame_rms < 10 ** (silence_threshold_db / 20)))
 
-def get_audio_duration(file_path):
-    return librosa.get_duration(path=file_path)
\ No newline at end of file
+    return {
+        'rms': round(float(np.sqrt(np.mean(np.square(samples)))), 6),
+        'peak': round(float(magnitude.max()), 6),
+        'silence_ratio': round(silence_ratio, 4),
+        # ปัดบน float64 ค่า float32 ที่ปัดแล้วแปลงเป็น JSON จะกลายเป็นทศนิยมยาว (0.38999998569488525)
+        'waveform_peaks': json.dumps(np.round(waveform.astype(np.float64), 3).tolist(), separators=(',', ':'))
+    }
\ No newline at end of file
@@ -1,5 +1,6 @@
 from datetime import timedelta
 import secrets
+import shutil
 import os
 
 class Config:
@@ -18,7 +19,92 @@ class Config:
     # File upload
     UPLOAD_FOLDER = 'uploads'
     UPLOAD_FOLDERURL = 'uploads/audio'
-    
+    # ขนาดสูงสุดต่อไฟล์ ตรวจระหว่างรับ body (upload_stream) เกินแล้วตอบ 413 ทันที
+    MAX_UPLOAD_FILE_SIZE = int(os.environ.get('MAX_UPLOAD_FILE_SIZE', 10 * 1024 * 1024))
+    # เสียงที่เก็บเกิน AUDIO_ARCHIVE_AFTER_DAYS วันย้ายไป AUDIO_ARCHIVE_FOLDER แบบบีบอัด:
+    # คลิปที่ได้ LIKE เป็น FLAC (lossless) คลิปอื่นเป็น Opus (AUDIO_ARCHIVE_OPUS=0 = FLAC ทั้งหมด)
+    # ตรวจทุก AUDIO_ARCHIVE_INTERVAL วินาที (0 = ปิด)
+    AUDIO_ARCHIVE_FOLDER = os.environ.get('AUDIO_ARCHIVE_FOLDER', 'uploads/archive')
+    AUDIO_ARCHIVE_AFTER_DAYS = float(os.environ.get('AUDIO_ARCHIVE_AFTER_DAYS', 7))
+    AUDIO_ARCHIVE_OPUS = os.environ.get('AUDIO_ARCHIVE_OPUS', '1') == '1'
+    AUDIO_ARCHIVE_INTERVAL = float(os.environ.get('AUDIO_ARCHIVE_INTERVAL', 3600))
+    # เล่นเสียงในหน้า admin: preview Opus bitrate ต่ำ (?preview=1) เก็บไว้ที่ AUDIO_PREVIEW_FOLDER
+    # ไฟล์ของ hash หนึ่งไม่เปลี่ยน จึงให้ browser cache ได้นาน AUDIO_STREAM_MAX_AGE วินาที
+    # USE_X_SENDFILE=1 ให้ web server หน้าบ้านส่งไฟล์เอง (Flask ใส่ header X-Sendfile แทนการอ่านไฟล์)
+    AUDIO_PREVIEW_FOLDER = os.environ.get('AUDIO_PREVIEW_FOLDER', 'uploads/preview')
+    AUDIO_STREAM_MAX_AGE = int(os.environ.get('AUDIO_STREAM_MAX_AGE', 365 * 24 * 3600))
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '0') == '1'
+    # metadata ที่คำนวณตอนบันทึกเสียง: จำนวนจุดของ waveform ย่อ และระดับ (dBFS) ที่นับว่าเงียบ
+    AUDIO_WAVEFORM_PEAKS = int(os.environ.get('AUDIO_WAVEFORM_PEAKS', 100))
+    AUDIO_SILENCE_THRESHOLD_DB = float(os.environ.get('AUDIO_SILENCE_THRESHOLD_DB', -40))
+
+    # Audio decoding: ถอดไฟล์ใน process ก่อน ใช้ ffmpeg (ผ่าน pipe) เป็นทางสำรองเท่านั้น
+    FFMPEG_PATH = os.environ.get('FFMPEG_PATH') or shutil.which('ffmpeg') or 'ffmpeg'
+    FFMPEG_MAX_WORKERS = int(os.environ.get('FFMPEG_MAX_WORKERS', 2))
+
+    # สร้าง Translator (พจนานุกรม + tokenizer) ของทุกคู่ภาษาใน background ตอนเปิดเซิร์ฟเวอร์
+    TRANSLATOR_PREWARM = os.environ.get('TRANSLATOR_PREWARM', '1') == '1'
+    # ตรวจไฟล์พจนานุกรมทุกกี่วินาที ถ้าเปลี่ยนจะโหลดเวอร์ชันใหม่โดยไม่ต้องรีสตาร์ท (0 = ปิด)
+    DICTIONARY_WATCH_INTERVAL = float(os.environ.get('DICTIONARY_WATCH_INTERVAL', 10))
+    # แคชผลแปลประโยค (ใช้ร่วมกันทุกคู่ภาษา) TTL เป็นวินาที 0 = ไม่หมดอายุ
+    # ตั้ง TRANSLATION_CACHE_SQLITE_PATH เพื่อแชร์แคชระหว่าง worker process ผ่านไฟล์ SQLite
+    TRANSLATION_CACHE_SIZE = int(os.environ.get('TRANSLATION_CACHE_SIZE', 10000))
+    TRANSLATION_CACHE_TTL = float(os.environ.get('TRANSLATION_CACHE_TTL', 86400))
+    TRANSLATION_CACHE_SQLITE_PATH = os.environ.get('TRANSLATION_CACHE_SQLITE_PATH') or None
+    # คำที่ไม่รู้จัก: เก็บในหน่วยความจำไม่เกิน UNKNOWN_WORDS_CAPACITY คำต่อคู่ภาษา flush ลงตาราง
+    # unknown_word_stats ทุก UNKNOWN_WORDS_FLUSH_INTERVAL วินาที และเก็บในตารางไม่เกิน UNKNOWN_WORDS_DB_LIMIT คำ
+    UNKNOWN_WORDS_CAPACITY = int(os.environ.get('UNKNOWN_WORDS_CAPACITY', 1000))
+    UNKNOWN_WORDS_FLUSH_INTERVAL = float(os.environ.get('UNKNOWN_WORDS_FLUSH_INTERVAL', 60))
+    UNKNOWN_WORDS_DB_LIMIT = int(os.environ.get('UNKNOWN_WORDS_DB_LIMIT', 10000))
+    # คำที่ไม่พบในพจนานุกรม: 'off', 'suggest' (ส่งคำแนะนำกลับใน /translate) หรือ 'auto' (ใช้คำที่ใกล้ที่สุด)
+    TRANSLATOR_FUZZY_MODE = os.environ.get('TRANSLATOR_FUZZY_MODE', 'suggest')
+    TRANSLATOR_FUZZY_MAX_DISTANCE = int(os.environ.get('TRANSLATOR_FUZZY_MAX_DISTANCE', 1))
+    TRANSLATOR_FUZZY_TIME_LIMIT_MS = float(os.environ.get('TRANSLATOR_FUZZY_TIME_LIMIT_MS', 2))
+    # จำนวนข้อความสูงสุดต่อคำขอ /translate/batch หรือ event translate_batch
+    TRANSLATE_BATCH_MAX_ITEMS = int(os.environ.get('TRANSLATE_BATCH_MAX_ITEMS', 200))
+    # แปลขณะพิมพ์ (Socket.IO): บันทึก TranslationLog เมื่อผู้ใช้หยุดพิมพ์ครบกี่วินาที
+    LIVE_TRANSLATION_LOG_DELAY = float(os.environ.get('LIVE_TRANSLATION_LOG_DELAY', 2.0))
+    # /translate/document แปลบน process pool (0 = จำนวน CPU) ส่งผลกลับทีละก้อน
+    TRANSLATE_DOCUMENT_WORKERS = int(os.environ.get('TRANSLATE_DOCUMENT_WORKERS', 0))
+    TRANSLATE_DOCUMENT_CHUNK_CHARS = int(os.environ.get('TRANSLATE_DOCUMENT_CHUNK_CHARS', 4000))
+    TRANSLATE_DOCUMENT_MAX_BYTES = int(os.environ.get('TRANSLATE_DOCUMENT_MAX_BYTES', 2 * 1024 * 1024))
+
+    # แคชผลถอดเสียง (LRU ในหน่วยความจำ ต่อด้วยตาราง audio_record)
+    TRANSCRIPTION_CACHE_SIZE = int(os.environ.get('TRANSCRIPTION_CACHE_SIZE', 1024))
+
+    # งานถอดเสียงแบบ async (POST /api/transcribe/jobs): จำนวน worker, ความยาวคิวสูงสุด
+    # และเวลาที่เก็บผลไว้ให้ดึงหลังงานเสร็จ (วินาที)
+    TRANSCRIPTION_JOB_WORKERS = int(os.environ.get('TRANSCRIPTION_JOB_WORKERS', 2))
+    TRANSCRIPTION_JOB_QUEUE_SIZE = int(os.environ.get('TRANSCRIPTION_JOB_QUEUE_SIZE', 100))
+    TRANSCRIPTION_JOB_RESULT_TTL = int(os.environ.get('TRANSCRIPTION_JOB_RESULT_TTL', 3600))
+
+    # ASR micro-batching: รวมคำขอถอดเสียงภายในหน้าต่างเวลานี้ให้เป็น forward pass เดียว
+    ASR_BATCH_WINDOW_MS = int(os.environ.get('ASR_BATCH_WINDOW_MS', 30))
+    ASR_MAX_BATCH_SIZE = int(os.environ.get('ASR_MAX_BATCH_SIZE', 8))
+
+    # ASR model loading: โหลดเมื่อใช้ครั้งแรก, prewarm ภาษาที่ระบุ (เช่น "th,km") ใน background
+    # และปลดโมเดลที่ไม่ได้ใช้เกิน ASR_MODEL_IDLE_SECONDS วินาที (0 = ไม่ปลด)
+    ASR_PREWARM_LANGUAGES = [lang.strip() for lang in os.environ.get('ASR_PREWARM_LANGUAGES', '').split(',') if lang.strip()]
+    ASR_MODEL_IDLE_SECONDS = int(os.environ.get('ASR_MODEL_IDLE_SECONDS', 0))
+
+    # เสียงที่ยาวกว่า ASR_CHUNK_SECONDS จะถูกถอดทีละหน้าต่าง โดยมี context ซ้อนกันข้างละ ASR_CHUNK_STRIDE_SECONDS
+    ASR_CHUNK_SECONDS = float(os.environ.get('ASR_CHUNK_SECONDS', 20))
+    ASR_CHUNK_STRIDE_SECONDS = float(os.environ.get('ASR_CHUNK_STRIDE_SECONDS', 2.5))
+
+    # Real-time mic ผ่าน Socket.IO (namespace /speech): หน้าต่างสั้นกว่าไฟล์อัปโหลด
+    # และส่ง partial_transcript ทุกครั้งที่มีเสียงใหม่สะสมครบ ASR_STREAM_PARTIAL_INTERVAL วินาที
+    ASR_STREAM_CHUNK_SECONDS = float(os.environ.get('ASR_STREAM_CHUNK_SECONDS', 8))
+    ASR_STREAM_STRIDE_SECONDS = float(os.environ.get('ASR_STREAM_STRIDE_SECONDS', 1))
+    ASR_STREAM_PARTIAL_INTERVAL = float(os.environ.get('ASR_STREAM_PARTIAL_INTERVAL', 0.5))
+    # ความยาวสูงสุดของหนึ่งสตรีม (วินาที) เกินแล้วตอบ transcription_error ไม่รับเฟรมต่อ
+    ASR_STREAM_MAX_SECONDS = float(os.environ.get('ASR_STREAM_MAX_SECONDS', 600))
+
+    # ASR precision: 'fp32' หรือ 'int8' (dynamic quantization บน Linear สำหรับเครื่อง CPU)
+    # โมเดล int8 ที่ quantize แล้วจะถูกเก็บไว้ใน ASR_QUANTIZED_CACHE_DIR เพื่อไม่ต้องทำใหม่ทุกครั้งที่เปิด
+    ASR_PRECISION = os.environ.get('ASR_PRECISION', 'fp32')
+    ASR_QUANTIZED_CACHE_DIR = os.environ.get('ASR_QUANTIZED_CACHE_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'ModelASR', 'cache'
+    )
     
     # JWT blacklist
     JWT_BLACKLIST_ENABLED = False
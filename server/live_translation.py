@@ -0,0 +1,163 @@
+import threading
+from collections import namedtuple
+from models import db, TranslationLog
+from ModelASR.translator_registry import get_translator
+
+# segment หนึ่งของข้อความที่กำลังพิมพ์ พร้อมช่องว่างที่ตามหลังและคำแปลของ segment
+LiveSegment = namedtuple('LiveSegment', ['text', 'separator', 'translation'])
+
+
+class EditError(Exception):
+    pass
+
+
+class LiveTranslationSession:
+    """สถานะแปลขณะพิมพ์ของหนึ่ง connection
+
+    เก็บข้อความเป็นรายการ segment (ตาม ``Translator.segment_text``) เมื่อได้รับการแก้ไข
+    (offset, deleted, inserted) จะตัดคำและแปลใหม่เฉพาะ segment ที่ได้รับผลกระทบ
+    แล้วคืน diff ระดับ segment ให้ client นำไปแทนที่ในผลแปลเดิม
+    """
+
+    def __init__(self, app, source_lang, target_lang, text='', log_delay=2.0, user_id=None):
+        self.app = app
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.translator = get_translator(source_lang, target_lang)
+        self.log_delay = log_delay
+        self.user_id = user_id
+        self.lock = threading.Lock()
+        self.log_timer = None
+        self.dirty = False
+        self.revision = 0
+        self.segments = self._translate_segments(text)
+
+    @property
+    def text(self):
+        return ''.join(segment.text + segment.separator for segment in self.segments)
+
+    @property
+    def translation(self):
+        return ''.join(segment.translation + segment.separator for segment in self.segments)
+
+    def _translate_segments(self, text, previous=()):
+        # segment ที่ข้อความไม่เปลี่ยนใช้คำแปลเดิม ไม่ต้องตัดคำ/ค้นแคชอีก
+        known = {segment.text: segment.translation for segment in previous}
+        segments = []
+        for segment, separator in self.translator.segment_text(text):
+            if segment in known:
+                translation = known[segment]
+            else:
+                translation = self.translator.translate_sentence(segment) if segment else ''
+            segments.append(LiveSegment(segment, separator, translation))
+        return segments
+
+    def snapshot(self):
+        return {
+            'revision': self.revision,
+            'segments': [segment.translation + segment.separator for segment in self.segments],
+            'dictionary_version': self.translator.version
+        }
+
+    def apply_edit(self, offset, deleted, inserted):
+        """แก้ข้อความแล้วคืน diff: แทน segment ช่วง [start, start + deleted) ด้วย inserted
+
+        ถ้าพจนานุกรมถูกโหลดเวอร์ชันใหม่ระหว่างนั้น จะแปลใหม่ทั้งหมดและคืน ``reset``
+        """
+        with self.lock:
+            length = sum(len(segment.text) + len(segment.separator) for segment in self.segments)
+            if not isinstance(offset, int) or not isinstance(deleted, int) or not isinstance(inserted, str):
+                raise EditError('Invalid edit')
+            if offset < 0 or deleted < 0 or offset + deleted > length:
+                raise EditError('Edit is out of range, please resync')
+
+            self.revision += 1
+            self._schedule_log()
+
+            translator = get_translator(self.source_lang, self.target_lang)
+            if translator is not self.translator:
+                text = self.text
+                self.translator = translator
+                self.segments = self._translate_segments(text[:offset] + inserted + text[offset + deleted:])
+                return dict(self.snapshot(), reset=True)
+
+            # หา segment แรกและสุดท้ายที่ถูกแก้ แล้วขยายไปข้างละหนึ่ง segment
+            # เผื่อวลีหลายคำที่ต่อกับ segment ข้างเคียงหลังแก้ไข
+            first = last = None
+            position = 0
+            for index, segment in enumerate(self.segments):
+                end = position + len(segment.text) + len(segment.separator)
+                if first is None and offset <= end:
+                    first = index
+                if offset + deleted <= end:
+                    last = index
+                    break
+                position = end
+            if first is None:
+                first = last = len(self.segments) - 1
+            first = max(first - 1, 0)
+            last = min(last + 1, len(self.segments) - 1)
+
+            start_position = sum(len(s.text) + len(s.separator) for s in self.segments[:first])
+            old = self.segments[first:last + 1]
+            region = ''.join(segment.text + segment.separator for segment in old)
+            local_offset = offset - start_position
+            region = region[:local_offset] + inserted + region[local_offset + deleted:]
+
+            new = self._translate_segments(region, previous=old)
+            if last < len(self.segments) - 1 and len(new) > 1 and new[-1] == ('', '', ''):
+                # region ที่ลงท้ายด้วยช่องว่างได้ segment ว่างท้ายสุด ซึ่งมีเฉพาะตอนจบข้อความทั้งหมด
+                new.pop()
+
+            # ตัดส่วนที่เหมือนเดิมทั้งหัวและท้ายออก ส่งเฉพาะ segment ที่เปลี่ยนจริง
+            head = 0
+            while head < min(len(old), len(new)) and old[head] == new[head]:
+                head += 1
+            tail = 0
+            while tail < min(len(old), len(new)) - head and old[-1 - tail] == new[-1 - tail]:
+                tail += 1
+
+            self.segments[first:last + 1] = new
+            changed = new[head:len(new) - tail]
+            return {
+                'revision': self.revision,
+                'start': first + head,
+                'deleted': len(old) - head - tail,
+                'inserted': [segment.translation + segment.separator for segment in changed],
+                'dictionary_version': self.translator.version
+            }
+
+    def _schedule_log(self):
+        # บันทึก TranslationLog แถวเดียวเมื่อผู้ใช้หยุดพิมพ์ แทนการบันทึกทุกครั้งที่กดแป้น
+        self.dirty = True
+        if self.log_timer is not None:
+            self.log_timer.cancel()
+        self.log_timer = threading.Timer(self.log_delay, self.flush_log)
+        self.log_timer.daemon = True
+        self.log_timer.start()
+
+    def flush_log(self):
+        with self.lock:
+            if self.log_timer is not None:
+                self.log_timer.cancel()
+                self.log_timer = None
+            if not self.dirty:
+                return
+            self.dirty = False
+            text = self.text
+            translation = self.translation
+
+        if not text.strip():
+            return
+        with self.app.app_context():
+            try:
+                TranslationLog.log_translation(
+                    original_text=text,
+                    translated_text=translation,
+                    source_language=self.source_lang,
+                    target_language=self.target_lang,
+                    user_id=self.user_id
+                )
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Live translation log error: {str(e)}")
@@ -1,7 +1,7 @@
 from flask import Flask
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
-from flask_migrate import Migrate
+from flask_migrate import Migrate, upgrade
 from flask_jwt_extended import JWTManager
 from flask_login import LoginManager
 from flask_principal import Principal
@@ -10,9 +10,14 @@ from flask_mail import Mail
 from config import Config
 from models import db, User
 import os
+import multiprocessing
 from translation_socket import setup_translation_socket
+from speech_socket import setup_speech_socket
+from upload_stream import UploadRequest
 
 app = Flask(__name__)
+# ตรวจขนาด/คำนวณ hash ของไฟล์เสียงที่อัปโหลดระหว่างรับ body (เฉพาะ AUDIO_UPLOAD_ENDPOINTS)
+app.request_class = UploadRequest
 CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization"]}}, supports_credentials=True)
 app.config.from_object(Config)
 bcrypt = Bcrypt(app)
@@ -29,6 +34,36 @@ mail = Mail(app)
 os.makedirs(app.config['UPLOAD_FOLDERURL'], exist_ok=True)
 
 setup_translation_socket(socketio, app)
+setup_speech_socket(socketio, app)
+
+from transcription_jobs import job_manager
+job_manager.init_app(app, socketio)
+
+# process ลูกของ document pool (spawn) import main.py ซ้ำ ไม่ต้องเริ่มงานเบื้องหลังใน process นั้น
+if multiprocessing.parent_process() is None:
+    # เริ่ม process pool ก่อน thread อื่น เพื่อให้ fork ได้อย่างปลอดภัย
+    from translation_service import document_pool
+    document_pool.start()
+
+    if app.config['TRANSLATOR_PREWARM']:
+        from threading import Thread
+        from ModelASR.translator_registry import warm_translators
+        Thread(target=warm_translators, name="translator-prewarm", daemon=True).start()
+
+    if app.config['DICTIONARY_WATCH_INTERVAL'] > 0:
+        from ModelASR.translator_registry import start_dictionary_watcher
+        start_dictionary_watcher(app.config['DICTIONARY_WATCH_INTERVAL'])
+
+    from unknown_words_service import start_unknown_words_flusher
+    start_unknown_words_flusher(app, app.config['UNKNOWN_WORDS_FLUSH_INTERVAL'])
+
+    if app.config['AUDIO_ARCHIVE_INTERVAL'] > 0:
+        from audio_storage import start_audio_archiver
+        start_audio_archiver(app, app.config['AUDIO_ARCHIVE_INTERVAL'], app.config['AUDIO_ARCHIVE_AFTER_DAYS'])
+
+    if app.config['ASR_PREWARM_LANGUAGES']:
+        from ModelASR.modelWav import model_registry
+        model_registry.prewarm(app.config['ASR_PREWARM_LANGUAGES'])
 
 # Import blueprints
 from routes_admin import admin_bp
@@ -54,5 +89,7 @@ def load_user(user_id):
 
 if __name__ == "__main__":
     with app.app_context():
+        # เพิ่มคอลัมน์/ตารางใหม่ให้ฐานข้อมูลเดิมตาม migrations ก่อน (db.create_all ไม่แก้ตารางที่มีอยู่)
+        upgrade()
         db.create_all()
     socketio.run(app,host="0.0.0.0", debug=True, port=8080)
\ No newline at end of file
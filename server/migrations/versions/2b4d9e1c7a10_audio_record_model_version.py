@@ -0,0 +1,30 @@
+"""audio_record.model_version
+
+เวอร์ชันโมเดลที่ใช้ถอดเสียง (คีย์ของแคชผลถอดเสียง)
+
+Revision ID: 2b4d9e1c7a10
+Revises: 8f3a1c2d4b50
+Create Date: 2026-10-18 15:00:01.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b4d9e1c7a10'
+down_revision = '8f3a1c2d4b50'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ฐานข้อมูลที่สร้างด้วย db.create_all() หลังเพิ่มคอลัมน์นี้มีอยู่แล้ว
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('audio_record')}
+    if 'model_version' not in columns:
+        op.add_column('audio_record', sa.Column('model_version', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('audio_record') as batch_op:
+        batch_op.drop_column('model_version')
@@ -0,0 +1,42 @@
+"""unknown_word_stats
+
+ยอดนับคำที่ไม่รู้จักที่ flush จาก Space-Saving sketch ของแต่ละ worker
+
+Revision ID: 5c7e2a9f1d34
+Revises: 2b4d9e1c7a10
+Create Date: 2026-10-18 15:30:02.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c7e2a9f1d34'
+down_revision = '2b4d9e1c7a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ฐานข้อมูลที่สร้างด้วย db.create_all() หลังเพิ่มตารางนี้มีอยู่แล้ว
+    if sa.inspect(op.get_bind()).has_table('unknown_word_stats'):
+        return
+    op.create_table(
+        'unknown_word_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source_language', sa.String(length=10), nullable=False),
+        sa.Column('target_language', sa.String(length=10), nullable=False),
+        sa.Column('word', sa.String(length=255), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('source_language', 'target_language', 'word', name='uq_unknown_word_stat')
+    )
+    op.create_index('ix_unknown_word_stats_count', 'unknown_word_stats', ['count'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_unknown_word_stats_count', table_name='unknown_word_stats')
+    op.drop_table('unknown_word_stats')
@@ -0,0 +1,146 @@
+"""baseline schema
+
+ตารางตามฐานข้อมูลเดิมก่อนมี migrations (instance/WebAppDB.sqlite3)
+สร้างเฉพาะตารางที่ยังไม่มี ฐานข้อมูลเดิมจึง upgrade ต่อได้โดยไม่ต้อง stamp
+
+Revision ID: 8f3a1c2d4b50
+Revises: 
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3a1c2d4b50'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'user' not in existing:
+        op.create_table(
+            'user',
+            sa.Column('user_id', sa.String(length=32), nullable=False),
+            sa.Column('username', sa.String(length=50), nullable=False),
+            sa.Column('email', sa.String(length=100), nullable=False),
+            sa.Column('password', sa.String(length=60), nullable=False),
+            sa.Column('gender', sa.String(length=10), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=False),
+            sa.Column('birth_date', sa.Date(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('reset_token', sa.String(length=100), nullable=True),
+            sa.Column('reset_token_expires', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('user_id'),
+            sa.UniqueConstraint('user_id'),
+            sa.UniqueConstraint('username'),
+            sa.UniqueConstraint('email')
+        )
+
+    if 'admin' not in existing:
+        op.create_table(
+            'admin',
+            sa.Column('admin_id', sa.Integer(), nullable=False),
+            sa.Column('admin_name', sa.String(length=32), nullable=False),
+            sa.Column('email', sa.String(length=100), nullable=False),
+            sa.Column('password_hash', sa.String(length=128), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('admin_id'),
+            sa.UniqueConstraint('email')
+        )
+
+    if 'token_blacklist' not in existing:
+        op.create_table(
+            'token_blacklist',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('jti', sa.String(length=36), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('jti')
+        )
+
+    if 'audio_record' not in existing:
+        op.create_table(
+            'audio_record',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('hashed_id', sa.String(length=8), nullable=False),
+            sa.Column('audio_hash', sa.String(length=64), nullable=False),
+            sa.Column('user_id', sa.String(length=32), nullable=True),
+            sa.Column('audio_url', sa.String(length=200), nullable=True),
+            sa.Column('transcription', sa.Text(), nullable=True),
+            sa.Column('time', sa.String(length=20), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('expiration_date', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_audio_record_hashed_id', 'audio_record', ['hashed_id'], unique=True)
+        op.create_index('ix_audio_record_audio_hash', 'audio_record', ['audio_hash'], unique=True)
+
+    if 'profile' not in existing:
+        op.create_table(
+            'profile',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.String(length=32), nullable=False),
+            sa.Column('firstname', sa.String(length=50), nullable=True),
+            sa.Column('lastname', sa.String(length=50), nullable=True),
+            sa.Column('country', sa.String(length=50), nullable=True),
+            sa.Column('state', sa.String(length=50), nullable=True),
+            sa.Column('phone_number', sa.String(length=15), nullable=True),
+            sa.Column('last_login', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.user_id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'translation_logs' not in existing:
+        op.create_table(
+            'translation_logs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('original_text', sa.Text(), nullable=False),
+            sa.Column('translated_text', sa.Text(), nullable=False),
+            sa.Column('source_language', sa.String(length=10), nullable=False),
+            sa.Column('target_language', sa.String(length=10), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.String(length=32), nullable=True),
+            sa.Column('session_id', sa.String(length=36), nullable=True),
+            sa.Column('count', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.user_id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'audio_analytics' not in existing:
+        op.create_table(
+            'audio_analytics',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('audio_record_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.String(length=32), nullable=True),
+            sa.Column('rating', sa.Enum('UNKNOWN', 'LIKE', 'DISLIKE', name='ratingenum'), nullable=True),
+            sa.Column('language', sa.String(length=10), nullable=True),
+            sa.Column('duration', sa.Integer(), nullable=True),
+            sa.Column('source', sa.Enum('MICROPHONE', 'UPLOAD', name='sourceenum'), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['audio_record_id'], ['audio_record.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('audio_record_id')
+        )
+
+
+def downgrade():
+    op.drop_table('audio_analytics')
+    op.drop_table('translation_logs')
+    op.drop_table('profile')
+    op.drop_index('ix_audio_record_audio_hash', table_name='audio_record')
+    op.drop_index('ix_audio_record_hashed_id', table_name='audio_record')
+    op.drop_table('audio_record')
+    op.drop_table('token_blacklist')
+    op.drop_table('admin')
+    op.drop_table('user')
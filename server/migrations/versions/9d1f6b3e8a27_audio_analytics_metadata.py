@@ -0,0 +1,39 @@
+"""audio_analytics level metadata
+
+ระดับเสียง (rms/peak) สัดส่วนช่วงเงียบ และ waveform peaks ที่คำนวณตอน ingest
+
+Revision ID: 9d1f6b3e8a27
+Revises: 5c7e2a9f1d34
+Create Date: 2026-10-18 16:00:03.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d1f6b3e8a27'
+down_revision = '5c7e2a9f1d34'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    ('rms', sa.Float),
+    ('peak', sa.Float),
+    ('silence_ratio', sa.Float),
+    ('waveform_peaks', sa.Text),
+)
+
+
+def upgrade():
+    # ฐานข้อมูลที่สร้างด้วย db.create_all() หลังเพิ่มคอลัมน์เหล่านี้มีอยู่แล้ว
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('audio_analytics')}
+    for name, column_type in COLUMNS:
+        if name not in existing:
+            op.add_column('audio_analytics', sa.Column(name, column_type(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('audio_analytics') as batch_op:
+        for name, _ in reversed(COLUMNS):
+            batch_op.drop_column(name)
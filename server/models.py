@@ -8,6 +8,7 @@ from wtforms.validators import DataRequired, Length
 from flask_bcrypt import Bcrypt
 from datetime import datetime, timedelta
 import enum
+import json
 from audio_utils import calculate_expiration_date
 import hashlib
 
@@ -74,6 +75,7 @@ class AudioRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     hashed_id = db.Column(db.String(8), unique=True, index=True, nullable=False)
     audio_hash = db.Column(db.String(64), unique=True, index=True, nullable=False)
+    model_version = db.Column(db.String(100), nullable=True)
     user_id = db.Column(db.String(32), db.ForeignKey('user.user_id', ondelete='SET NULL'), nullable=True)
     audio_url = db.Column(db.String(200))
     transcription = db.Column(db.Text)
@@ -124,6 +126,7 @@ class AudioRecord(db.Model):
             'created_at': self.created_at.isoformat(),
             'expiration_date': self.expiration_date.isoformat(),
             'audio_hash': self.audio_hash,
+            'model_version': self.model_version,
             'analytics': self.analytics.to_dict() if self.analytics else None
         }
 
@@ -145,6 +148,11 @@ class AudioAnalytics(db.Model):
     duration = db.Column(db.Integer)
     source = db.Column(db.Enum(SourceEnum), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # คำนวณตอนบันทึก (audio_utils.compute_audio_metadata) ไม่ต้องเปิดไฟล์เสียงเพื่อแสดงผล
+    rms = db.Column(db.Float)
+    peak = db.Column(db.Float)
+    silence_ratio = db.Column(db.Float)
+    waveform_peaks = db.Column(db.Text)  # JSON array
 
     user = db.relationship('User', backref=db.backref('audio_analytics', lazy=True))
     audio_record = db.relationship('AudioRecord', back_populates='analytics', single_parent=True)
@@ -158,7 +166,11 @@ class AudioAnalytics(db.Model):
             'language': self.language,
             'duration': self.duration,
             'source': self.source.value,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at.isoformat(),
+            'rms': self.rms,
+            'peak': self.peak,
+            'silence_ratio': self.silence_ratio,
+            'waveform_peaks': json.loads(self.waveform_peaks) if self.waveform_peaks else None
         }
 
     def delete(self):
@@ -316,6 +328,19 @@ class TranslationLog(db.Model):
             db.session.commit()
             return new_log
 
+    @classmethod
+    def bulk_log(cls, rows, user_id=None, session_id=None):
+        # บันทึกหลายแถวใน INSERT/commit เดียว rows เป็น dict ที่มี original_text, translated_text,
+        # source_language, target_language และ count (ถ้ามี)
+        if not rows:
+            return
+        timestamp = datetime.utcnow()
+        db.session.bulk_insert_mappings(cls, [
+            dict({'user_id': user_id, 'session_id': session_id, 'timestamp': timestamp, 'count': 1}, **row)
+            for row in rows
+        ])
+        db.session.commit()
+
     @classmethod
     def get_translation_statistics(cls, start_date=None, end_date=None, user_id=None):
         query = db.session.query(
@@ -334,8 +359,35 @@ class TranslationLog(db.Model):
 
         return query.group_by(cls.source_language, cls.target_language).all()
 
+class UnknownWordStat(db.Model):
+    __tablename__ = 'unknown_word_stats'
+    __table_args__ = (
+        db.UniqueConstraint('source_language', 'target_language', 'word', name='uq_unknown_word_stat'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    source_language = db.Column(db.String(10), nullable=False)
+    target_language = db.Column(db.String(10), nullable=False)
+    word = db.Column(db.String(255), nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False, index=True)
+    # จำนวนที่อาจนับเกินจริง (จาก Space-Saving sketch ของแต่ละ worker)
+    error = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UnknownWordStat {self.word}: {self.count}>'
+
+    def to_dict(self):
+        return {
+            'word': self.word,
+            'count': self.count,
+            'error': self.error,
+            'source_language': self.source_language,
+            'target_language': self.target_language,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
 # Add this function to your existing code
 def log_translation(original_text, translated_text, source_language, target_language, user_id=None, session_id=None):
     TranslationLog.log_translation(
         original_text, translated_text, source_language, target_language, user_id, session_id
-    )
\ No newline at end of file
+    )
@@ -1,33 +1,51 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 from models import db, AudioRecord, SourceEnum, RatingEnum, TranslationLog
 from datetime import datetime
-import tempfile
 from flask_cors import CORS
-from ModelASR.modelWav import AudioTranscriber, AudioTranscriberMic, convert_to_wav
-from ModelASR.Translator import Translator
-from audio_utils import save_audio_record, update_audio_rating, cleanup_expired_records, get_audio_records, create_temp_file, get_audio_duration
+from ModelASR.translator_registry import get_translator
+from unknown_words_service import get_unknown_words_report, save_unknown_words_report
+from audio_utils import update_audio_rating, cleanup_expired_records, get_audio_records
+from transcription_service import transcribe_and_save, normalize_language
+from transcription_jobs import job_manager, QueueFullError
+from upload_stream import read_upload
+from translation_service import parse_batch_items, translate_batch, BatchTranslationError, document_pool
+from config import Config
 
 service_bp = Blueprint('service', __name__)
 CORS(service_bp)
 
 ALLOWED_EXTENSIONS = {'webm', 'wav', 'mp3'}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+DOCUMENT_EXTENSIONS = {'txt', 'csv'}
+MAX_FILE_SIZE = Config.MAX_UPLOAD_FILE_SIZE
 
-base_dir = os.path.dirname(os.path.abspath(__file__))
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# สำหรับภาษาไทย
-thai_dictionary_path = os.path.join(base_dir, 'ModelASR', 'data', 'THtoKM.txt')
-thai_translator = Translator(vocab_path=None, dictionary_path=thai_dictionary_path)
+def allowed_mime_type(content_type):
+    return content_type in ['audio/wav', 'audio/x-wav', 'audio/mpeg', 'audio/webm']
 
-# สำหรับคำเมือง
-km_vocab_path = os.path.join(base_dir, 'ModelASR', 'data', 'KMcutting.txt')
-km_dictionary_path = os.path.join(base_dir, 'ModelASR', 'data', 'KMtoTH.txt')
-km_translator = Translator(vocab_path=km_vocab_path, dictionary_path=km_dictionary_path)
+def validate_upload(file):
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    # UploadRequest ตรวจขนาดแล้วระหว่างรับ body (file.content_length ของ multipart มักเป็น 0)
+    # ตรงนี้วัดจาก stream จริงเผื่อกรณีที่ไฟล์ไม่ได้มาทาง UploadRequest
+    file.stream.seek(0, os.SEEK_END)
+    size = file.stream.tell()
+    file.stream.seek(0)
+    if size > MAX_FILE_SIZE:
+        return jsonify({'error': 'File size exceeds the maximum limit'}), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'File type not allowed'}), 400
+
+    # ตรวจสอบ MIME type
+    if not allowed_mime_type(file.content_type):
+        return jsonify({'error': 'Invalid file type'}), 400
+
+    return None
 
 @service_bp.route('/transcribe', methods=['POST'])
 def transcribe():
@@ -35,66 +53,27 @@ def transcribe():
         return jsonify({'error': 'No file part'}), 400
 
     file = request.files['file']
-    language = request.form.get('language', 'th')
+    # แปลงภาษา
+    language = normalize_language(request.form.get('language', 'th'))
     user_id = request.form.get('user_id', 'guest')
 
-    # แปลงภาษา
-    if language == 'ไทย':
-        language = 'th'
-    elif language == 'คำเมือง':
-        language = 'km'
+    error = validate_upload(file)
+    if error:
+        return error
 
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
+    try:
+        current_app.logger.info(f"Processing file: {file.filename}, Language: {language}, User ID: {user_id}")
 
-    if file.content_length > MAX_FILE_SIZE:
-        return jsonify({'error': 'File size exceeds the maximum limit'}), 400
+        audio_bytes, raw_hash, samples = read_upload(file)
+        result = transcribe_and_save(audio_bytes, language, user_id, SourceEnum.UPLOAD, raw_hash=raw_hash, samples=samples)
 
-    if file and allowed_file(file.filename):
-        try:
-            # ตรวจสอบ MIME type
-            if file.content_type not in ['audio/wav', 'audio/x-wav', 'audio/mpeg', 'audio/webm']:
-                return jsonify({'error': 'Invalid file type'}), 400
-
-            current_app.logger.info(f"Processing file: {file.filename}, Language: {language}, User ID: {user_id}")
-
-            temp_file_path = create_temp_file(file)
-            wav_file_path = convert_to_wav(temp_file_path)
-            
-            transcriber = AudioTranscriber()
-            transcript = transcriber.transcribe_audio(wav_file_path, language)
-
-            # บันทึกข้อมูลเสียง
-            duration = get_audio_duration(wav_file_path)
-            with open(wav_file_path, 'rb') as audio_file:
-                record_id, hashed_id, status = save_audio_record(
-                    user_id=user_id,
-                    audio_file=audio_file,
-                    transcription=transcript,
-                    duration=int(duration),
-                    language=language,
-                    source=SourceEnum.UPLOAD
-                )
-
-            current_app.logger.info(f"Transcription completed. Record ID: {record_id}, Hashed ID: {hashed_id}")
-
-            return jsonify({
-                'transcription': transcript,
-                'record_id': record_id,
-                'hashed_id': hashed_id,
-                'status': status
-            })
-
-        except Exception as e:
-            current_app.logger.error(f"Transcription error: {str(e)}")
-            return jsonify({'error': 'Transcription failed', 'details': str(e)}), 500
-        finally:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-            if os.path.exists(wav_file_path):
-                os.remove(wav_file_path)
-    else:
-        return jsonify({'error': 'File type not allowed'}), 400
+        current_app.logger.info(f"Transcription completed. Record ID: {result['record_id']}, Hashed ID: {result['hashed_id']}")
+
+        return jsonify(result)
+
+    except Exception as e:
+        current_app.logger.error(f"Transcription error: {str(e)}")
+        return jsonify({'error': 'Transcription failed', 'details': str(e)}), 500
 
 @service_bp.route('/transcribe_Mic', methods=['POST'])
 def transcribe_mic():
@@ -102,50 +81,58 @@ def transcribe_mic():
         return jsonify({'error': 'No audio file provided'}), 400
 
     audio_file = request.files['audio_file']
-    language = request.form.get('language', 'ไทย')
+    language = normalize_language(request.form.get('language', 'ไทย'))
     user_id = request.form.get('user_id', 'guest')
 
-    if language == 'ไทย':
-        language = 'th'
-    elif language == 'คำเมือง':
-        language = 'km'
-
     if audio_file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
     try:
-        temp_file_path = create_temp_file(audio_file)
-        wav_file_path = convert_to_wav(temp_file_path)
-
-        transcriber = AudioTranscriberMic()
-        transcript = transcriber.transcribe_audio_from_microphone(wav_file_path, language)
-
-        # บันทึกข้อมูลเสียง
-        duration = get_audio_duration(wav_file_path)
-        record_id, hashed_id, status = save_audio_record(
-            user_id=user_id,
-            audio_file=wav_file_path,  # ส่ง file path แทน file object
-            transcription=transcript,
-            duration=int(duration),
-            language=language,
-            source=SourceEnum.MICROPHONE  # ใช้ string แทน enum
-        )
+        audio_bytes, raw_hash, samples = read_upload(audio_file)
+        result = transcribe_and_save(audio_bytes, language, user_id, SourceEnum.MICROPHONE, raw_hash=raw_hash, samples=samples)
         
-        print(f"Audio record saved. ID: {record_id}, Hashed ID: {hashed_id}, Status: {status}")
+        print(f"Audio record saved. ID: {result['record_id']}, Hashed ID: {result['hashed_id']}, Status: {result['status']}")
 
         return jsonify({
-            'transcription': transcript,
-            'record_id': record_id,
-            'hashed_id': hashed_id
+            'transcription': result['transcription'],
+            'record_id': result['record_id'],
+            'hashed_id': result['hashed_id']
         })
     except Exception as e:
         current_app.logger.error(f"Microphone transcription error: {str(e)}")
         return jsonify({'error': 'Transcription failed', 'details': str(e)}), 500
-    finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-        if os.path.exists(wav_file_path):
-            os.remove(wav_file_path)
+
+@service_bp.route('/transcribe/jobs', methods=['POST'])
+def submit_transcription_job():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+
+    file = request.files['file']
+    language = normalize_language(request.form.get('language', 'th'))
+    user_id = request.form.get('user_id', 'guest')
+    socket_id = request.form.get('socket_id')
+    source = SourceEnum.MICROPHONE if request.form.get('source') == 'microphone' else SourceEnum.UPLOAD
+
+    error = validate_upload(file)
+    if error:
+        return error
+
+    try:
+        # อ่านไฟล์ใน request thread แล้วส่งงานหนักทั้งหมดให้ worker pool
+        audio_bytes, raw_hash, samples = read_upload(file)
+        job = job_manager.submit(audio_bytes, language, user_id, source, socket_id=socket_id,
+                                 raw_hash=raw_hash, samples=samples)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429
+
+    return jsonify(job_manager.describe(job)), 202
+
+@service_bp.route('/transcribe/jobs/<string:job_id>', methods=['GET'])
+def get_transcription_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_manager.describe(job))
 
 @service_bp.route('/translate', methods=['POST'])
 def translate():
@@ -161,13 +148,14 @@ def translate():
         return jsonify({'error': 'No text provided'}), 400
 
     try:
-        if source_lang == 'th' and target_lang == 'km':
-            translation = thai_translator.translate_text(text)
-        elif source_lang == 'km' and target_lang == 'th':
-            translation = km_translator.translate_text(text)
-        else:
+        try:
+            translator = get_translator(source_lang, target_lang)
+        except ValueError:
             return jsonify({'error': 'Unsupported language pair'}), 400
 
+        unknown_words = []
+        translation = translator.translate_text(text, unknown_words)
+
         # บันทึกลงฐานข้อมูล
         log_entry = TranslationLog(
             original_text=text,
@@ -181,8 +169,11 @@ def translate():
         response = {
             'translation': translation,
             'source_lang': source_lang,
-            'target_lang': target_lang
+            'target_lang': target_lang,
+            'dictionary_version': translator.version
         }
+        if translator.fuzzy_mode == 'suggest' and unknown_words:
+            response['suggestions'] = translator.suggest_corrections(unknown_words)
 
         # Log successful translation
         current_app.logger.info(f"Successful translation: {source_lang} to {target_lang}")
@@ -193,14 +184,77 @@ def translate():
         current_app.logger.error(error_message)
         return jsonify({'error': 'Translation failed', 'details': str(e)}), 500
 
+@service_bp.route('/translate/batch', methods=['POST'])
+def translate_batch_route():
+    try:
+        items = parse_batch_items(request.get_json(silent=True))
+    except BatchTranslationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        results = translate_batch(items)
+        current_app.logger.info(f"Successful batch translation: {len(items)} items")
+        return jsonify({'results': results})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Batch translation error: {str(e)}")
+        return jsonify({'error': 'Translation failed', 'details': str(e)}), 500
+
+@service_bp.route('/translate/document', methods=['POST'])
+def translate_document():
+    # รับได้ทั้ง JSON {'text': ...} และ multipart ที่มีไฟล์ .txt/.csv ในฟิลด์ 'file'
+    if 'file' in request.files:
+        file = request.files['file']
+        if file.filename == '' or file.filename.rsplit('.', 1)[-1].lower() not in DOCUMENT_EXTENSIONS:
+            return jsonify({'error': 'Only .txt and .csv files are supported'}), 400
+        data = file.read(Config.TRANSLATE_DOCUMENT_MAX_BYTES + 1)
+        options = request.form
+    else:
+        options = request.get_json(silent=True) or {}
+        data = (options.get('text') or '').encode('utf-8')
+
+    if not data:
+        return jsonify({'error': 'No text provided'}), 400
+    if len(data) > Config.TRANSLATE_DOCUMENT_MAX_BYTES:
+        return jsonify({'error': 'Document size exceeds the maximum limit'}), 413
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Document must be UTF-8 encoded'}), 400
+
+    source_lang = options.get('source_lang', 'th')
+    target_lang = options.get('target_lang', 'km')
+    try:
+        translator = get_translator(source_lang, target_lang)
+    except ValueError:
+        return jsonify({'error': 'Unsupported language pair'}), 400
+
+    def generate():
+        translated = []
+        for chunk in document_pool.translate(translator, text):
+            translated.append(chunk)
+            yield chunk
+
+        log_entry = TranslationLog(
+            original_text=text,
+            translated_text=''.join(translated),
+            source_language=source_lang,
+            target_language=target_lang
+        )
+        db.session.add(log_entry)
+        db.session.commit()
+        current_app.logger.info(f"Successful document translation: {source_lang} to {target_lang}, {len(text)} characters")
+
+    response = Response(stream_with_context(generate()), mimetype='text/plain; charset=utf-8')
+    response.headers['X-Dictionary-Version'] = translator.version
+    return response
+
 @service_bp.route('/unknown_words_report', methods=['GET'])
 def unknown_words_report():
     source_lang = request.args.get('source_lang', 'th')
-    if source_lang == 'th':
-        report = thai_translator.get_unknown_word_report()
-    elif source_lang == 'km':
-        report = km_translator.get_unknown_word_report()
-    else:
+    try:
+        report = get_unknown_words_report(source_lang, top_n=request.args.get('top_n', 10, type=int))
+    except ValueError:
         return jsonify({'error': 'Unsupported language'}), 400
     
     return jsonify({'unknown_words': report})
@@ -211,11 +265,9 @@ def save_unknown_words_report():
     source_lang = data.get('source_lang', 'th')
     file_path = data.get('file_path', f'unknown_words_{source_lang}.csv')
     
-    if source_lang == 'th':
-        thai_translator.save_unknown_word_report(file_path)
-    elif source_lang == 'km':
-        km_translator.save_unknown_word_report(file_path)
-    else:
+    try:
+        save_unknown_words_report(source_lang, file_path)
+    except ValueError:
         return jsonify({'error': 'Unsupported language'}), 400
     
     return jsonify({'message': f'Report saved to {file_path}'})
@@ -289,6 +341,10 @@ def cleanup_records():
 def not_found_error(error):
     return jsonify({'error': 'Not found'}), 404
 
+@service_bp.errorhandler(413)
+def request_entity_too_large(error):
+    return jsonify({'error': 'File size exceeds the maximum limit'}), 413
+
 @service_bp.errorhandler(500)
 def internal_error(error):
     current_app.logger.error(f"Internal server error: {str(error)}")
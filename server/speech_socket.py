@@ -0,0 +1,177 @@
+from flask import request
+from flask_socketio import emit
+import io
+import threading
+import numpy as np
+from ModelASR.modelWav import AudioTranscriber, get_model_version
+from ModelASR.audio_decode import encode_wav, StreamingResampler, TARGET_SAMPLE_RATE
+from models import SourceEnum
+from audio_utils import save_audio_record, compute_audio_metadata
+from config import Config
+
+try:
+    import opuslib
+except ImportError:  # Opus เป็นตัวเลือกเสริม ถ้าไม่มี client ต้องส่ง PCM
+    opuslib = None
+
+SPEECH_NAMESPACE = '/speech'
+SUPPORTED_ENCODINGS = ('pcm16', 'float32', 'opus')
+
+
+class SpeechSession:
+    def __init__(self, language, sample_rate=16000, encoding='pcm16', user_id='guest'):
+        if encoding not in SUPPORTED_ENCODINGS:
+            raise ValueError(f"Unsupported encoding: {encoding}. Use one of {SUPPORTED_ENCODINGS}.")
+        if encoding == 'opus' and opuslib is None:
+            raise ValueError("Opus frames require the 'opuslib' package; send pcm16 or float32 instead")
+
+        self.language = language
+        # บันทึกพร้อม record ให้แคชผลถอดเสียงใช้ซ้ำได้ (และตรวจภาษาตั้งแต่เริ่มสตรีม)
+        self.model_version = get_model_version(language)
+        self.sample_rate = int(sample_rate)
+        self.encoding = encoding
+        self.user_id = user_id
+        self.transcriber = AudioTranscriber(
+            chunk_seconds=Config.ASR_STREAM_CHUNK_SECONDS,
+            stride_seconds=Config.ASR_STREAM_STRIDE_SECONDS
+        )
+        self.decoder = self.transcriber.create_chunked_decoder(language)
+        self.opus_decoder = opuslib.Decoder(self.sample_rate, 1) if encoding == 'opus' else None
+        self.resampler = StreamingResampler(self.sample_rate)
+        self.max_samples = int(Config.ASR_STREAM_MAX_SECONDS * TARGET_SAMPLE_RATE)
+        self.samples = []
+        self.total_samples = 0
+        self.pending_samples = 0
+        self.last_partial = ''
+        self.lock = threading.Lock()
+
+    def decode_frame(self, frame):
+        if self.encoding == 'opus':
+            # เฟรม Opus ยาวได้สูงสุด 120 ms
+            frame = self.opus_decoder.decode(bytes(frame), self.sample_rate * 120 // 1000)
+            samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32768.0
+        elif self.encoding == 'pcm16':
+            samples = np.frombuffer(bytes(frame), dtype=np.int16).astype(np.float32) / 32768.0
+        else:
+            samples = np.frombuffer(bytes(frame), dtype=np.float32)
+        return self.resampler.feed(samples)
+
+    def _append(self, samples):
+        if self.total_samples + len(samples) > self.max_samples:
+            raise ValueError(f"Stream exceeds the maximum length of {Config.ASR_STREAM_MAX_SECONDS:g} seconds")
+        self.samples.append(samples)
+        self.total_samples += len(samples)
+        self.decoder.feed(samples)
+
+    def add_frame(self, frame):
+        """เพิ่มเฟรมเสียงและคืนข้อความชั่วคราว (None ถ้ายังไม่ถึงรอบที่ต้องถอดใหม่)"""
+        samples = self.decode_frame(frame)
+        if not len(samples):
+            return None
+        self._append(samples)
+        self.pending_samples += len(samples)
+
+        # ไม่ถอดเสียงใหม่ทุกเฟรม รอให้มีเสียงใหม่สะสมพอก่อน
+        if self.pending_samples < Config.ASR_STREAM_PARTIAL_INTERVAL * TARGET_SAMPLE_RATE:
+            return None
+        self.pending_samples = 0
+        partial = self.transcriber.clean_transcription(self.decoder.partial_text())
+        if partial == self.last_partial:
+            return None
+        self.last_partial = partial
+        return partial
+
+    def finish(self):
+        remaining = self.resampler.flush()
+        if len(remaining):
+            # ตัดส่วนที่เกินความยาวสูงสุดของสตรีม
+            self._append(remaining[:max(self.max_samples - self.total_samples, 0)])
+        return self.transcriber.clean_transcription(self.decoder.finish())
+
+    def to_wav(self):
+        audio = np.concatenate(self.samples) if self.samples else np.zeros(0, dtype=np.float32)
+        return io.BytesIO(encode_wav(audio)), len(audio) / TARGET_SAMPLE_RATE, compute_audio_metadata(audio, TARGET_SAMPLE_RATE)
+
+
+def setup_speech_socket(socketio, app):
+    sessions = {}
+
+    @socketio.on('disconnect', namespace=SPEECH_NAMESPACE)
+    def handle_disconnect():
+        sessions.pop(request.sid, None)
+
+    @socketio.on('start_transcription', namespace=SPEECH_NAMESPACE)
+    def handle_start_transcription(data):
+        language = data.get('language', 'th')
+        if language == 'ไทย':
+            language = 'th'
+        elif language == 'คำเมือง':
+            language = 'km'
+
+        try:
+            sessions[request.sid] = SpeechSession(
+                language,
+                sample_rate=data.get('sample_rate', 16000),
+                encoding=data.get('encoding', 'pcm16'),
+                user_id=data.get('user_id', 'guest')
+            )
+        except Exception as e:
+            app.logger.error(f"Speech stream start error: {str(e)}")
+            emit('transcription_error', {'message': str(e)})
+            return
+
+        emit('transcription_started', {'language': language})
+
+    @socketio.on('audio_frame', namespace=SPEECH_NAMESPACE)
+    def handle_audio_frame(data):
+        session = sessions.get(request.sid)
+        if session is None:
+            emit('transcription_error', {'message': 'Stream not started'})
+            return
+
+        frame = data.get('audio') if isinstance(data, dict) else data
+        try:
+            with session.lock:
+                partial = session.add_frame(frame)
+        except Exception as e:
+            app.logger.error(f"Speech stream error: {str(e)}")
+            emit('transcription_error', {'message': str(e)})
+            return
+
+        if partial is not None:
+            emit('partial_transcript', {'text': partial})
+
+    @socketio.on('stop_transcription', namespace=SPEECH_NAMESPACE)
+    def handle_stop_transcription(data=None):
+        session = sessions.pop(request.sid, None)
+        if session is None:
+            emit('transcription_error', {'message': 'Stream not started'})
+            return
+
+        try:
+            with session.lock:
+                transcript = session.finish()
+                wav_file, duration, metadata = session.to_wav()
+
+            record_id, hashed_id = None, None
+            if duration > 0:
+                with app.app_context():
+                    record_id, hashed_id, status = save_audio_record(
+                        user_id=session.user_id,
+                        audio_file=wav_file,
+                        transcription=transcript,
+                        duration=int(duration),
+                        language=session.language,
+                        source=SourceEnum.MICROPHONE,
+                        model_version=session.model_version,
+                        metadata=metadata
+                    )
+
+            emit('final_transcript', {
+                'text': transcript,
+                'record_id': record_id,
+                'hashed_id': hashed_id
+            })
+        except Exception as e:
+            app.logger.error(f"Speech stream finish error: {str(e)}")
+            emit('transcription_error', {'message': str(e)})
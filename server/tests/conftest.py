@@ -0,0 +1,5 @@
+import os
+import sys
+
+# โมดูลของเซิร์ฟเวอร์ import กันแบบ top-level (config, audio_storage, ...) ต้องรันจากโฟลเดอร์ server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,32 @@
+import json
+import numpy as np
+from audio_utils import compute_audio_metadata
+
+
+def test_waveform_peaks_are_compact():
+    rng = np.random.default_rng(0)
+    samples = (rng.uniform(-1, 1, 16000) * 0.8).astype(np.float32)
+
+    metadata = compute_audio_metadata(samples, 16000, peaks=100)
+
+    peaks = json.loads(metadata['waveform_peaks'])
+    assert len(peaks) == 100
+    # ทศนิยมไม่เกิน 3 ตำแหน่ง ("0.39" ไม่ใช่ "0.38999998569488525")
+    assert all(len(repr(value).split('.')[-1]) <= 3 for value in peaks)
+    assert len(metadata['waveform_peaks']) < 700
+
+
+def test_silence_ratio_of_clip_shorter_than_one_frame():
+    # 10 ms ที่ 16 kHz สั้นกว่าเฟรม 20 ms
+    loud = np.full(160, 0.5, dtype=np.float32)
+    quiet = np.zeros(160, dtype=np.float32)
+
+    assert compute_audio_metadata(loud, 16000)['silence_ratio'] == 0.0
+    assert compute_audio_metadata(quiet, 16000)['silence_ratio'] == 1.0
+
+
+def test_silence_ratio_counts_partial_tail_frame():
+    # เงียบ 2 เฟรมเต็ม แล้วตามด้วยเสียงดัง 10 ms
+    samples = np.concatenate([np.zeros(640, dtype=np.float32), np.full(160, 0.5, dtype=np.float32)])
+
+    assert compute_audio_metadata(samples, 16000)['silence_ratio'] == round(2 / 3, 4)
@@ -0,0 +1,44 @@
+import io
+import numpy as np
+import pytest
+import soundfile as sf
+from audio_storage import AudioStorage, opus_supported
+
+pytestmark = pytest.mark.skipif(not opus_supported(), reason="libsndfile ไม่รองรับการเขียน Opus")
+
+
+def make_storage(tmp_path):
+    return AudioStorage(str(tmp_path / 'audio'), archive_root=str(tmp_path / 'archive'),
+                        preview_root=str(tmp_path / 'preview'))
+
+
+def put_tone(storage, sample_rate, seconds=1.0):
+    # ไฟล์ WAV แบบที่ระบบเดิมเก็บไว้ก่อนแปลงเป็น 16 kHz ตอน ingest
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    buffer = io.BytesIO()
+    sf.write(buffer, (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), sample_rate, format='WAV')
+    audio_hash = f"{sample_rate:064x}"
+    return storage.put(audio_hash, buffer), audio_hash
+
+
+def test_archive_opus_resamples_44k_wav(tmp_path):
+    storage = make_storage(tmp_path)
+    audio_url, audio_hash = put_tone(storage, 44100)
+
+    archived_url = storage.archive(audio_url, audio_hash, 'opus')
+
+    samples, sample_rate = storage.read(archived_url)
+    assert archived_url.endswith('.opus')
+    assert sample_rate == 48000
+    assert abs(len(samples) / sample_rate - 1.0) < 0.05
+
+
+def test_preview_resamples_22k_wav(tmp_path):
+    storage = make_storage(tmp_path)
+    audio_url, audio_hash = put_tone(storage, 22050)
+
+    preview_url = storage.preview(audio_url, audio_hash)
+
+    samples, sample_rate = storage.read(preview_url)
+    assert sample_rate == 16000
+    assert abs(len(samples) / sample_rate - 1.0) < 0.05
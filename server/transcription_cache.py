@@ -0,0 +1,103 @@
+from collections import OrderedDict
+import threading
+
+
+class TranscriptionCache:
+    """แคชผลถอดเสียงตาม (hash ของเสียงที่ normalize แล้ว, ภาษา, เวอร์ชันโมเดล)
+
+    ชั้นแรกเป็น LRU ในหน่วยความจำ ถ้าไม่เจอจะค้นจากตาราง ``audio_record``
+    (ซึ่งเก็บ ``audio_hash`` และ ``model_version`` ของทุกไฟล์ที่เคยถอดแล้ว)
+    ต้องเรียกภายใน app context เมื่อใช้ชั้นฐานข้อมูล
+
+    เก็บ alias จาก hash ของไฟล์ดิบที่อัปโหลดไปยัง hash ของเสียงที่ normalize แล้วด้วย
+    ไฟล์เดิมที่ส่งซ้ำจึงหาผลในแคชได้โดยไม่ต้องถอดไฟล์ใหม่
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.aliases = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.alias_hits = 0
+
+    def get(self, audio_hash, language, model_version):
+        key = (audio_hash, language, model_version)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        result = self._lookup_record(audio_hash, language, model_version)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.db_hits += 1
+        self.put(audio_hash, language, model_version, result)
+        return result
+
+    def put(self, audio_hash, language, model_version, result):
+        key = (audio_hash, language, model_version)
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def resolve_alias(self, raw_hash):
+        with self.lock:
+            audio_hash = self.aliases.get(raw_hash)
+            if audio_hash is not None:
+                self.aliases.move_to_end(raw_hash)
+                self.alias_hits += 1
+            return audio_hash
+
+    def add_alias(self, raw_hash, audio_hash):
+        with self.lock:
+            self.aliases[raw_hash] = audio_hash
+            self.aliases.move_to_end(raw_hash)
+            while len(self.aliases) > self.max_size:
+                self.aliases.popitem(last=False)
+
+    def discard(self, audio_hashes):
+        """ลบผลของเสียงที่ record ถูกลบไปแล้ว ไม่ให้แคชคืน record_id ที่ไม่มีอยู่"""
+        audio_hashes = set(audio_hashes)
+        with self.lock:
+            for key in [key for key in self.entries if key[0] in audio_hashes]:
+                del self.entries[key]
+            for raw_hash in [raw for raw, audio_hash in self.aliases.items() if audio_hash in audio_hashes]:
+                del self.aliases[raw_hash]
+
+    def _lookup_record(self, audio_hash, language, model_version):
+        from models import AudioRecord, AudioAnalytics
+
+        record = AudioRecord.query.join(AudioAnalytics).filter(
+            AudioRecord.audio_hash == audio_hash,
+            AudioRecord.model_version == model_version,
+            AudioAnalytics.language == language
+        ).first()
+        if record is None or record.transcription is None:
+            return None
+        return {
+            'transcription': record.transcription,
+            'record_id': record.id,
+            'hashed_id': record.hashed_id
+        }
+
+    def stats(self):
+        with self.lock:
+            size = len(self.entries)
+            aliases = len(self.aliases)
+        return {
+            'size': size,
+            'aliases': aliases,
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'alias_hits': self.alias_hits,
+            'db_hits': self.db_hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import datetime
+from uuid import uuid4
+import threading
+import time
+import logging
+from flask_socketio import join_room
+from config import Config
+from transcription_service import transcribe_and_save
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class TranscriptionJob:
+    def __init__(self, audio_bytes, language, user_id, source, socket_id=None, raw_hash=None, samples=None):
+        self.id = uuid4().hex
+        self.audio_bytes = audio_bytes
+        self.raw_hash = raw_hash
+        self.samples = samples
+        self.language = language
+        self.user_id = user_id
+        self.source = source
+        self.socket_id = socket_id
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+        self.finished_monotonic = None
+
+
+class TranscriptionJobManager:
+    """รันงานถอดเสียงใน worker pool ขนาดจำกัด เพื่อไม่ให้ request thread ถูกบล็อก
+
+    ใช้คิวภายใน process (``celery`` ใน admin_analytics ยังไม่มี broker ตั้งค่าไว้)
+    เมื่องานเสร็จจะส่ง event ``transcription_done`` ไปยัง room ของ job
+    และ socket ที่ระบุตอนส่งงาน (ถ้ามี)
+    """
+
+    def __init__(self, max_workers=2, max_queue=100, result_ttl=3600):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='transcribe-job')
+        self.jobs = OrderedDict()
+        self.queued = []
+        self.lock = threading.Lock()
+        self.app = None
+        self.socketio = None
+
+    def init_app(self, app, socketio):
+        self.app = app
+        self.socketio = socketio
+
+        @socketio.on('watch_transcription_job')
+        def handle_watch_transcription_job(data):
+            # ให้ client รับ transcription_done ของ job นี้ได้ แม้จะไม่ได้ส่ง socket_id ตอนสร้างงาน
+            join_room(data.get('job_id'))
+
+    def submit(self, audio_bytes, language, user_id, source, socket_id=None, raw_hash=None, samples=None):
+        with self.lock:
+            self._prune()
+            if len(self.queued) >= self.max_queue:
+                raise QueueFullError('Transcription queue is full, please retry later')
+            job = TranscriptionJob(audio_bytes, language, user_id, source, socket_id, raw_hash, samples)
+            self.jobs[job.id] = job
+            self.queued.append(job.id)
+
+        self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def queue_position(self, job):
+        with self.lock:
+            if job.id in self.queued:
+                return self.queued.index(job.id) + 1
+        return 0
+
+    def describe(self, job):
+        info = {
+            'job_id': job.id,
+            'status': job.status,
+            'queue_position': self.queue_position(job),
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None
+        }
+        if job.result is not None:
+            info['result'] = job.result
+        if job.error is not None:
+            info['error'] = job.error
+        return info
+
+    def _run(self, job):
+        with self.lock:
+            self.queued.remove(job.id)
+        job.status = 'running'
+
+        try:
+            with self.app.app_context():
+                job.result = transcribe_and_save(job.audio_bytes, job.language, job.user_id, job.source,
+                                                 raw_hash=job.raw_hash, samples=job.samples)
+            job.status = 'done'
+        except Exception as e:
+            logger.error(f"Transcription job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.audio_bytes = None
+            job.samples = None
+            job.finished_at = datetime.utcnow()
+            job.finished_monotonic = time.monotonic()
+
+        self._notify(job)
+
+    def _notify(self, job):
+        if self.socketio is None:
+            return
+        payload = self.describe(job)
+        self.socketio.emit('transcription_done', payload, to=job.id)
+        if job.socket_id:
+            self.socketio.emit('transcription_done', payload, to=job.socket_id)
+
+    def _prune(self):
+        # ลบผลของงานที่เสร็จนานเกิน result_ttl (เรียกขณะถือ lock)
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_monotonic is not None and now - job.finished_monotonic > self.result_ttl
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+
+job_manager = TranscriptionJobManager(
+    max_workers=Config.TRANSCRIPTION_JOB_WORKERS,
+    max_queue=Config.TRANSCRIPTION_JOB_QUEUE_SIZE,
+    result_ttl=Config.TRANSCRIPTION_JOB_RESULT_TTL
+)
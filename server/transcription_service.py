@@ -0,0 +1,91 @@
+import io
+from flask import current_app
+from models import SourceEnum
+from config import Config
+from ModelASR.modelWav import AudioTranscriber, AudioTranscriberMic, get_model_version
+from ModelASR.audio_decode import decode_audio_bytes, encode_wav, TARGET_SAMPLE_RATE
+from ModelASR.batch_queue import BatchTranscriptionQueue
+from audio_utils import save_audio_record, generate_audio_hash, compute_audio_metadata
+from transcription_cache import TranscriptionCache
+
+# คิวรวมคำขอถอดเสียงเป็น batch ใช้ร่วมกันทั้ง /transcribe, /transcribe_Mic และ job แบบ async
+batch_queue = BatchTranscriptionQueue(
+    AudioTranscriber(),
+    window_ms=Config.ASR_BATCH_WINDOW_MS,
+    max_batch_size=Config.ASR_MAX_BATCH_SIZE
+)
+
+transcription_cache = TranscriptionCache(max_size=Config.TRANSCRIPTION_CACHE_SIZE)
+
+
+def normalize_language(language):
+    if language == 'ไทย':
+        return 'th'
+    elif language == 'คำเมือง':
+        return 'km'
+    return language
+
+
+def transcribe_and_save(audio_bytes, language, user_id, source, raw_hash=None, samples=None):
+    """ถอดเสียง + บันทึก AudioRecord ต้องเรียกภายใน app context
+
+    ``raw_hash`` คือ sha256 ของไฟล์ดิบ และ ``samples`` คือเสียงที่ถอดไว้แล้ว (ถ้ามี)
+    ซึ่ง upload_stream คำนวณไว้ระหว่างรับไฟล์
+    คืน dict ที่มี transcription, record_id, hashed_id และ status
+    ('new', 'existing' หรือ 'cached')
+    """
+    model_version = get_model_version(language)
+
+    # ไฟล์ดิบเดิม (อัปโหลดซ้ำ/ส่งใหม่หลังเน็ตหลุด) ไม่ต้องถอดไฟล์หรือถอดเสียงอีก
+    raw_hash = raw_hash or generate_audio_hash(audio_bytes)
+    audio_hash = transcription_cache.resolve_alias(raw_hash)
+    if audio_hash is not None:
+        cached = transcription_cache.get(audio_hash, language, model_version)
+        if cached:
+            current_app.logger.info(f"Transcription cache hit (raw upload). Record ID: {cached['record_id']}")
+            return dict(cached, status='cached')
+
+    # ถอดไฟล์เป็น 16 kHz mono ในหน่วยความจำ ไม่ต้องผ่านไฟล์ชั่วคราว
+    if samples is None:
+        samples = decode_audio_bytes(audio_bytes)
+    wav_bytes = encode_wav(samples)
+
+    # ไฟล์ต่าง format แต่เสียงเดียวกันก็ใช้ผลเดิมได้
+    audio_hash = generate_audio_hash(wav_bytes)
+    transcription_cache.add_alias(raw_hash, audio_hash)
+    cached = transcription_cache.get(audio_hash, language, model_version)
+    if cached:
+        current_app.logger.info(f"Transcription cache hit. Record ID: {cached['record_id']}")
+        return dict(cached, status='cached')
+
+    failed = False
+    if source == SourceEnum.MICROPHONE:
+        transcriber = AudioTranscriberMic(batch_queue=batch_queue)
+        transcript = transcriber.transcribe_waveform_from_microphone(samples, language)
+        failed = transcriber.last_error is not None
+    else:
+        transcriber = AudioTranscriber(batch_queue=batch_queue)
+        transcript = transcriber.transcribe_waveform(samples, language)
+
+    # บันทึกข้อมูลเสียง พร้อม metadata ที่คำนวณจาก samples ที่ถอดแล้ว
+    duration = len(samples) / TARGET_SAMPLE_RATE
+    record_id, hashed_id, status = save_audio_record(
+        user_id=user_id,
+        audio_file=io.BytesIO(wav_bytes),
+        transcription=transcript,
+        duration=int(duration),
+        language=language,
+        source=source,
+        model_version=None if failed else model_version,
+        audio_hash=audio_hash,
+        metadata=compute_audio_metadata(samples, TARGET_SAMPLE_RATE)
+    )
+
+    result = {
+        'transcription': transcript,
+        'record_id': record_id,
+        'hashed_id': hashed_id
+    }
+    if not failed:
+        transcription_cache.put(audio_hash, language, model_version, result)
+    return dict(result, status=status)
@@ -0,0 +1,99 @@
+from models import TranslationLog
+from config import Config
+from ModelASR.translator_registry import get_translator
+from ModelASR.document_pool import DocumentTranslationPool
+
+document_pool = DocumentTranslationPool(
+    max_workers=Config.TRANSLATE_DOCUMENT_WORKERS,
+    chunk_chars=Config.TRANSLATE_DOCUMENT_CHUNK_CHARS
+)
+
+
+class BatchTranslationError(Exception):
+    pass
+
+
+def parse_batch_items(data):
+    """แปลง payload เป็น [(text, source_lang, target_lang)]
+
+    ``items`` เป็นรายการสตริง หรือ dict ที่มี text/source_lang/target_lang
+    ถ้า item ไม่ระบุภาษาจะใช้ source_lang/target_lang ระดับบนสุด (ค่าเริ่มต้น th -> km)
+    """
+    if not isinstance(data, dict):
+        raise BatchTranslationError('Invalid JSON')
+
+    items = data.get('items', data.get('texts'))
+    if not isinstance(items, list) or not items:
+        raise BatchTranslationError('No items provided')
+    if len(items) > Config.TRANSLATE_BATCH_MAX_ITEMS:
+        raise BatchTranslationError(f'Too many items, maximum is {Config.TRANSLATE_BATCH_MAX_ITEMS}')
+
+    default_source = data.get('source_lang', 'th')
+    default_target = data.get('target_lang', 'km')
+    parsed = []
+    for item in items:
+        if isinstance(item, str):
+            parsed.append((item, default_source, default_target))
+        elif isinstance(item, dict):
+            parsed.append((
+                item.get('text'),
+                item.get('source_lang', default_source),
+                item.get('target_lang', default_target)
+            ))
+        else:
+            parsed.append((None, default_source, default_target))
+    return parsed
+
+
+def translate_batch(items, user_id=None, session_id=None):
+    """แปลหลายข้อความในครั้งเดียว ต้องเรียกภายใน app context
+
+    ข้อความซ้ำ (คู่ภาษาเดียวกัน) แปลครั้งเดียว และบันทึก TranslationLog ทุกแถวใน commit เดียว
+    คืนผลลัพธ์เรียงตาม items โดย item ที่ผิดพลาดจะมี ``error`` แทน ``translation``
+    """
+    translators = {}
+    translations = {}
+    counts = {}
+    results = []
+
+    for text, source_lang, target_lang in items:
+        if not isinstance(text, str) or not text:
+            results.append({'error': 'No text provided'})
+            continue
+
+        pair = (source_lang, target_lang)
+        if pair not in translators:
+            try:
+                # ใช้ Translator ตัวเดียวต่อคู่ภาษาตลอด batch ผลทั้งหมดจึงมาจากพจนานุกรมเวอร์ชันเดียวกัน
+                translators[pair] = get_translator(source_lang, target_lang)
+            except ValueError:
+                translators[pair] = None
+        translator = translators[pair]
+        if translator is None:
+            results.append({'error': 'Unsupported language pair', 'source_lang': source_lang, 'target_lang': target_lang})
+            continue
+
+        key = (source_lang, target_lang, text)
+        if key not in translations:
+            translations[key] = translator.translate_text(text)
+        counts[key] = counts.get(key, 0) + 1
+
+        results.append({
+            'translation': translations[key],
+            'source_lang': source_lang,
+            'target_lang': target_lang,
+            'dictionary_version': translator.version
+        })
+
+    TranslationLog.bulk_log([
+        {
+            'original_text': text,
+            'translated_text': translations[(source_lang, target_lang, text)],
+            'source_language': source_lang,
+            'target_language': target_lang,
+            'count': count
+        }
+        for (source_lang, target_lang, text), count in counts.items()
+    ], user_id=user_id, session_id=session_id)
+
+    return results
@@ -1,19 +1,15 @@
+from flask import request
 from flask_socketio import SocketIO, emit
-from ModelASR.Translator import Translator
+from ModelASR.translator_registry import get_translator
+from unknown_words_service import get_unknown_words_report, save_unknown_words_report
 from models import db, TranslationLog
-import os
+from translation_service import parse_batch_items, translate_batch, BatchTranslationError
+from live_translation import LiveTranslationSession, EditError
+from config import Config
 
 def setup_translation_socket(socketio, app):
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-
-    # สำหรับภาษาไทย
-    thai_dictionary_path = os.path.join(base_dir, 'ModelASR', 'data', 'THtoKM.txt')
-    thai_translator = Translator(vocab_path=None, dictionary_path=thai_dictionary_path)
-
-    # สำหรับคำเมือง
-    km_vocab_path = os.path.join(base_dir, 'ModelASR', 'data', 'KMcutting.txt')
-    km_dictionary_path = os.path.join(base_dir, 'ModelASR', 'data', 'KMtoTH.txt')
-    km_translator = Translator(vocab_path=km_vocab_path, dictionary_path=km_dictionary_path)
+    # สถานะแปลขณะพิมพ์ของแต่ละ connection (key = sid)
+    live_sessions = {}
 
     @socketio.on('connect')
     def handle_connect():
@@ -21,6 +17,9 @@ def setup_translation_socket(socketio, app):
 
     @socketio.on('disconnect')
     def handle_disconnect():
+        session = live_sessions.pop(request.sid, None)
+        if session:
+            session.flush_log()
         print('Client disconnected')
 
     @socketio.on('translate')
@@ -30,12 +29,9 @@ def setup_translation_socket(socketio, app):
         target_lang = data['target_lang']
 
         try:
-            if source_lang == 'th' and target_lang == 'km':
-                translation = thai_translator.translate_text(text)
-            elif source_lang == 'km' and target_lang == 'th':
-                translation = km_translator.translate_text(text)
-            else:
-                raise ValueError('Unsupported language pair')
+            translator = get_translator(source_lang, target_lang)
+            unknown_words = []
+            translation = translator.translate_text(text, unknown_words)
 
             # บันทึกลงฐานข้อมูล
             with app.app_context():
@@ -48,25 +44,90 @@ def setup_translation_socket(socketio, app):
                 db.session.add(log_entry)
                 db.session.commit()
 
-            emit('translation_result', {
+            result = {
                 'type': 'translation',
                 'text': translation,
                 'source_lang': source_lang,
-                'target_lang': target_lang
-            })
+                'target_lang': target_lang,
+                'dictionary_version': translator.version
+            }
+            if translator.fuzzy_mode == 'suggest' and unknown_words:
+                result['suggestions'] = translator.suggest_corrections(unknown_words)
+            emit('translation_result', result)
 
         except Exception as e:
             app.logger.error(f"Translation error: {str(e)}")
             emit('translation_result', {'type': 'error', 'message': str(e)})
 
+    @socketio.on('start_live_translation')
+    def handle_start_live_translation(data):
+        previous = live_sessions.pop(request.sid, None)
+        if previous:
+            previous.flush_log()
+
+        try:
+            session = LiveTranslationSession(
+                app,
+                data.get('source_lang', 'th'),
+                data.get('target_lang', 'km'),
+                text=data.get('text') or '',
+                log_delay=Config.LIVE_TRANSLATION_LOG_DELAY
+            )
+        except ValueError:
+            emit('live_translation', {'type': 'error', 'message': 'Unsupported language pair'})
+            return
+
+        live_sessions[request.sid] = session
+        emit('live_translation', dict(session.snapshot(), type='reset'))
+
+    @socketio.on('live_edit')
+    def handle_live_edit(data):
+        session = live_sessions.get(request.sid)
+        if session is None:
+            emit('live_translation', {'type': 'error', 'message': 'No live translation session, send start_live_translation first'})
+            return
+
+        # รับได้ทั้ง edit เดียว หรือหลาย edit ที่ client รวมมาใน 'edits' (เรียงตามลำดับที่เกิด)
+        edits = data.get('edits') or [data]
+        try:
+            for edit in edits:
+                diff = session.apply_edit(edit.get('offset'), edit.get('deleted', 0), edit.get('inserted', ''))
+                emit('live_translation', dict(diff, type='reset' if diff.pop('reset', False) else 'diff'))
+        except EditError as e:
+            emit('live_translation', dict(session.snapshot(), type='error', message=str(e)))
+        except Exception as e:
+            app.logger.error(f"Live translation error: {str(e)}")
+            emit('live_translation', {'type': 'error', 'message': str(e)})
+
+    @socketio.on('stop_live_translation')
+    def handle_stop_live_translation(data=None):
+        session = live_sessions.pop(request.sid, None)
+        if session:
+            session.flush_log()
+            emit('live_translation', {'type': 'stopped', 'translation': session.translation})
+
+    @socketio.on('translate_batch')
+    def handle_translate_batch(data):
+        try:
+            items = parse_batch_items(data)
+            with app.app_context():
+                results = translate_batch(items)
+
+            emit('translation_batch_result', {'type': 'translation_batch', 'results': results})
+
+        except BatchTranslationError as e:
+            emit('translation_batch_result', {'type': 'error', 'message': str(e)})
+        except Exception as e:
+            app.logger.error(f"Batch translation error: {str(e)}")
+            emit('translation_batch_result', {'type': 'error', 'message': str(e)})
+
     @socketio.on('unknown_words_report')
     def handle_unknown_words_report(data):
         source_lang = data.get('source_lang', 'th')
-        if source_lang == 'th':
-            report = thai_translator.get_unknown_word_report()
-        elif source_lang == 'km':
-            report = km_translator.get_unknown_word_report()
-        else:
+        try:
+            with app.app_context():
+                report = get_unknown_words_report(source_lang)
+        except ValueError:
             emit('report_result', {'error': 'Unsupported language'})
             return
 
@@ -77,11 +138,10 @@ def setup_translation_socket(socketio, app):
         source_lang = data.get('source_lang', 'th')
         file_path = data.get('file_path', f'unknown_words_{source_lang}.csv')
 
-        if source_lang == 'th':
-            thai_translator.save_unknown_word_report(file_path)
-        elif source_lang == 'km':
-            km_translator.save_unknown_word_report(file_path)
-        else:
+        try:
+            with app.app_context():
+                save_unknown_words_report(source_lang, file_path)
+        except ValueError:
             emit('save_report_result', {'error': 'Unsupported language'})
             return
 
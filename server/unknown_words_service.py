@@ -0,0 +1,148 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from models import db, UnknownWordStat
+from config import Config
+from ModelASR.translator_registry import get_translator_for_source, loaded_translators
+
+logger = logging.getLogger(__name__)
+
+# จำนวน parameter ต่อ IN (...) ไม่ให้เกินขีดจำกัดของ SQLite
+QUERY_CHUNK_SIZE = 500
+# แถวต่อ INSERT หนึ่งคำสั่ง (6 parameter ต่อแถว)
+UPSERT_CHUNK_SIZE = 100
+
+
+def _chunks(items, size=QUERY_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _stored_counts(source_lang, target_lang, words):
+    rows = {}
+    for chunk in _chunks(list(words)):
+        for row in UnknownWordStat.query.filter(
+            UnknownWordStat.source_language == source_lang,
+            UnknownWordStat.target_language == target_lang,
+            UnknownWordStat.word.in_(chunk)
+        ):
+            rows[row.word] = row
+    return rows
+
+
+def _prune(source_lang, target_lang, limit):
+    # เก็บเฉพาะ limit คำที่นับได้มากที่สุดต่อคู่ภาษา ตารางจึงมีขนาดคงที่เหมือน sketch
+    stale_ids = [row.id for row in db.session.query(UnknownWordStat.id).filter(
+        UnknownWordStat.source_language == source_lang,
+        UnknownWordStat.target_language == target_lang
+    ).order_by(UnknownWordStat.count.desc(), UnknownWordStat.id).offset(limit)]
+    for chunk in _chunks(stale_ids):
+        UnknownWordStat.query.filter(UnknownWordStat.id.in_(chunk)).delete(synchronize_session=False)
+
+
+def _upsert_counts(source_lang, target_lang, items):
+    """บวกยอดนับในฐานข้อมูลด้วย INSERT ... ON CONFLICT DO UPDATE
+
+    การบวกทำฝั่ง SQL (count = count + excluded.count) flush จากหลาย worker พร้อมกันจึงไม่ทับยอดกัน
+    """
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    totals = {}
+    for word, count, error in items:
+        # คำที่ตัดเหลือ 255 ตัวอักษรแล้วซ้ำกันต้องรวมก่อน INSERT เดียวกันห้ามชน key ซ้ำ
+        total = totals.setdefault(word[:255], [0, 0])
+        total[0] += count
+        total[1] += error
+
+    now = datetime.utcnow()
+    rows = [
+        {'source_language': source_lang, 'target_language': target_lang, 'word': word,
+         'count': count, 'error': error, 'updated_at': now}
+        for word, (count, error) in totals.items()
+    ]
+    for chunk in _chunks(rows, UPSERT_CHUNK_SIZE):
+        statement = insert(UnknownWordStat).values(chunk)
+        statement = statement.on_conflict_do_update(
+            index_elements=['source_language', 'target_language', 'word'],
+            set_={
+                'count': UnknownWordStat.count + statement.excluded.count,
+                'error': UnknownWordStat.error + statement.excluded.error,
+                'updated_at': statement.excluded.updated_at,
+            }
+        )
+        db.session.execute(statement)
+
+
+def flush_unknown_words():
+    """ย้ายยอดนับของทุก Translator ใน process นี้ลงตาราง unknown_word_stats ต้องเรียกภายใน app context"""
+    for translator in loaded_translators():
+        items = translator.unknown_words.drain()
+        if not items:
+            continue
+        source_lang, target_lang = translator.language_pair
+        try:
+            _upsert_counts(source_lang, target_lang, items)
+            _prune(source_lang, target_lang, Config.UNKNOWN_WORDS_DB_LIMIT)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # คืนยอดนับกลับเข้า sketch เพื่อ flush ใหม่รอบหน้า
+            translator.unknown_words.merge(items)
+            logger.error(f"Unknown words flush failed for {source_lang}->{target_lang}: {str(e)}")
+
+
+def get_unknown_words_report(source_lang, top_n=10):
+    """รวมยอดในฐานข้อมูล (ทุก worker) กับยอดที่ยังไม่ได้ flush ของ process นี้
+
+    คืน [(word, count)] เรียงจากมากไปน้อย ``top_n=None`` คืนทุกคำ
+    ต้องเรียกภายใน app context และ raise ValueError ถ้าไม่รองรับภาษา
+    """
+    translator = get_translator_for_source(source_lang)
+    source_lang, target_lang = translator.language_pair
+    pending = {word: count for word, count, _ in translator.unknown_words.items()}
+
+    query = UnknownWordStat.query.filter_by(source_language=source_lang, target_language=target_lang)
+    query = query.order_by(UnknownWordStat.count.desc())
+    if top_n is not None:
+        query = query.limit(top_n)
+    totals = {row.word: row.count for row in query}
+
+    # คำที่ยังค้างใน sketch อาจติดอันดับได้แม้ยอดในฐานข้อมูลจะไม่อยู่ใน top_n
+    for word, row in _stored_counts(source_lang, target_lang, [word for word in pending if word not in totals]).items():
+        totals[word] = row.count
+    for word, count in pending.items():
+        totals[word] = totals.get(word, 0) + count
+
+    report = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return report if top_n is None else report[:top_n]
+
+
+def save_unknown_words_report(source_lang, file_path):
+    report = get_unknown_words_report(source_lang, top_n=None)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        for word, count in report:
+            f.write(f"{word},{count}\n")
+    return len(report)
+
+
+def start_unknown_words_flusher(app, interval):
+    """flush เป็นระยะใน background และอีกครั้งตอนปิด process"""
+    def flush():
+        with app.app_context():
+            flush_unknown_words()
+
+    if interval > 0:
+        def run():
+            while True:
+                time.sleep(interval)
+                flush()
+
+        thread = threading.Thread(target=run, name="unknown-words-flusher", daemon=True)
+        thread.start()
+
+    atexit.register(flush)
@@ -0,0 +1,87 @@
+"""รับไฟล์อัปโหลดแบบ streaming
+
+Werkzeug เขียนไฟล์ใน multipart ลง stream ที่ได้จาก ``Request._get_file_stream`` ทีละก้อนระหว่างรับ body
+จึงตรวจขนาด คำนวณ sha256 และส่งข้อมูลให้ตัวถอดเสียงได้ตั้งแต่ตอนนั้น ไม่ต้องรอรับครบแล้วอ่านซ้ำ
+"""
+import hashlib
+import io
+import logging
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+from config import Config
+from ModelASR.audio_decode import AudioDecodeError, ffmpeg_pool, prefers_streaming_decode
+
+logger = logging.getLogger(__name__)
+
+
+class UploadStream(io.BytesIO):
+    """เก็บไฟล์อัปโหลดในหน่วยความจำ (ไม่ลงดิสก์) พร้อมขนาดและ sha256 ของข้อมูลดิบ
+
+    ถ้าเกิน ``max_size`` จะหยุดรับทันทีด้วย 413 แทนที่จะรับจนครบก่อน
+    """
+
+    def __init__(self, max_size, decoder=None):
+        super().__init__()
+        self.max_size = max_size
+        self.size = 0
+        self.hash = hashlib.sha256()
+        self.decoder = decoder
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            self._abort_decode()
+            raise RequestEntityTooLarge('File size exceeds the maximum limit')
+        self.hash.update(data)
+        if self.decoder is not None:
+            self.decoder.feed(data)
+        return super().write(data)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+    def decoded_samples(self):
+        """คืน samples ที่ถอดระหว่างอัปโหลด หรือ None ถ้าไม่ได้ถอดล่วงหน้าหรือถอดไม่สำเร็จ"""
+        decoder, self.decoder = self.decoder, None
+        if decoder is None:
+            return None
+        try:
+            return decoder.finish()
+        except AudioDecodeError as e:
+            logger.warning(f"Streaming decode failed, decoding after upload instead: {e}")
+            return None
+
+    def _abort_decode(self):
+        decoder, self.decoder = self.decoder, None
+        if decoder is not None:
+            decoder.abort()
+
+    def close(self):
+        # request จบโดยไม่ได้ใช้ผลถอด (ไฟล์ไม่ผ่านการตรวจ ฯลฯ) ต้องคืน slot ของ ffmpeg
+        self._abort_decode()
+        super().close()
+
+
+# endpoint ที่รับไฟล์เสียง ไฟล์อื่น (เอกสาร พจนานุกรม ฯลฯ) ใช้ stream ปกติของ Werkzeug (ไฟล์ชั่วคราว ไม่จำกัดขนาด)
+AUDIO_UPLOAD_ENDPOINTS = {
+    'service.transcribe',
+    'service.transcribe_mic',
+    'service.submit_transcription_job',
+}
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint not in AUDIO_UPLOAD_ENDPOINTS:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        decoder = ffmpeg_pool.open_stream() if prefers_streaming_decode(filename) else None
+        return UploadStream(Config.MAX_UPLOAD_FILE_SIZE, decoder)
+
+
+def read_upload(file):
+    """คืน (bytes, sha256 ของไฟล์ดิบ, samples ที่ถอดแล้วหรือ None) ของ FileStorage"""
+    stream = file.stream
+    if isinstance(stream, UploadStream):
+        return stream.getvalue(), stream.hexdigest(), stream.decoded_samples()
+    data = file.read()
+    return data, hashlib.sha256(data).hexdigest(), None